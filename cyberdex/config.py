@@ -0,0 +1,24 @@
+"""
+CyberDex - Config
+Shared display and battle tuning constants.
+"""
+
+# ==========================================================
+# DISPLAY
+# ==========================================================
+
+SCREEN_WIDTH = 1280
+SCREEN_HEIGHT = 720
+
+COLOR_WHITE = (255, 255, 255)
+
+# ==========================================================
+# BATTLE
+# ==========================================================
+
+# Seconds of the swipe into a battle, then of the intro flash
+BATTLE_TRANSITION_DURATION = 0.6
+BATTLE_FLASH_DURATION = 0.3
+
+# HP per second the displayed bars move toward the real value
+HP_BAR_ANIMATION_SPEED = 120
@@ -4,6 +4,7 @@ Defines all battle abilities and combat logic.
 """
 
 import random
+from collections import namedtuple
 
 
 class Ability:
@@ -39,7 +40,8 @@ class Ability:
     def calculate_damage(self,
                          attacker,
                          defender,
-                         command_bonus=None):
+                         command_bonus=None,
+                         rng=random):
         """
         Calculates final damage including:
         - Base formula
@@ -47,13 +49,15 @@ class Ability:
         - Type bonus
         - Corruption overclock
         - Command multiplier
+
+        :param rng: Source of randomness (random module or random.Random)
         """
 
         # Base damage formula
         base = ((attacker.attack / defender.defense) * self.power)
 
         # Random variance
-        variance = random.uniform(0.9, 1.1)
+        variance = rng.uniform(0.9, 1.1)
         base *= variance
 
         # Critical hit
@@ -61,7 +65,7 @@ class Ability:
         if command_bonus:
             crit_chance += command_bonus.get("crit_boost", 0)
 
-        is_critical = random.random() < crit_chance
+        is_critical = rng.random() < crit_chance
         if is_critical:
             base *= 1.5
 
@@ -83,7 +87,7 @@ class Ability:
     # STATUS APPLICATION
     # ==========================================================
 
-    def try_apply_status(self, defender, command_bonus=None):
+    def try_apply_status(self, defender, command_bonus=None, rng=random):
         if not self.status_effect:
             return False
 
@@ -92,7 +96,7 @@ class Ability:
         if command_bonus:
             chance += command_bonus.get("status_boost", 0)
 
-        if random.random() < chance:
+        if rng.random() < chance:
             defender.status = self.status_effect
             return True
 
@@ -152,6 +156,143 @@ ABILITY_DATABASE = {
 }
 
 
+# ==========================================================
+# REGISTRY
+# ==========================================================
+
+# Display-name hints that pick an ability's command keyword category
+# (see CommandBonusSystem.type_keywords)
+COMMAND_CATEGORY_HINTS = (
+    ("ai", ("data", "pulse")),
+    ("worm", ("packet", "storm")),
+    ("malware", ("corrupt", "inject")),
+    ("ransomware", ("encrypt", "lock")),
+)
+
+
+def infer_command_category(ability_name):
+    name = ability_name.lower()
+
+    for category, hints in COMMAND_CATEGORY_HINTS:
+        for hint in hints:
+            if hint in name:
+                return category
+
+    return None
+
+
+AbilityRecord = namedtuple("AbilityRecord", [
+    "id",
+    "key",
+    "name",
+    "ability_type",
+    "command_category",
+    "ability",
+])
+
+
+class AbilityRegistry:
+    """
+    Interns abilities into immutable records with integer ids and a
+    single alias index (keys, display names and their case variants).
+
+    register() is the only supported way to add or replace an ability
+    after import; edits made straight to the database dict are not seen.
+    version goes up on every change so derived tables (ability_batch)
+    know when to rebuild.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.records = []
+        self.version = 0
+        self._aliases = {}
+        self._by_key = {}
+
+        for key, ability in database.items():
+            self._intern(key, ability)
+
+    @staticmethod
+    def _make_record(ability_id, key, ability):
+        return AbilityRecord(
+            id=ability_id,
+            key=key,
+            name=ability.name,
+            ability_type=ability.ability_type,
+            command_category=infer_command_category(ability.name),
+            ability=ability,
+        )
+
+    def _add_aliases(self, record):
+        name = record.name
+        for alias in (record.key, record.key.upper(),
+                      name, name.lower(), name.upper(), name.replace(" ", "_")):
+            self._aliases.setdefault(alias, record)
+
+    def _intern(self, key, ability):
+        record = self._make_record(len(self.records), key, ability)
+        self.records.append(record)
+        self._by_key[key] = record
+        self._add_aliases(record)
+        self.version += 1
+        return record
+
+    def register(self, key, ability, replace=False):
+        """
+        Adds an ability to the database and interns it.
+
+        :param replace: Swap out an already registered key's ability
+                        (it keeps its id) instead of raising ValueError
+        :return: AbilityRecord
+        """
+        old = self._by_key.get(key)
+        if old is None:
+            self.database[key] = ability
+            return self._intern(key, ability)
+
+        if not replace:
+            raise ValueError(f"Ability {key!r} is already registered")
+
+        record = self._make_record(old.id, key, ability)
+        self.database[key] = ability
+        self.records[old.id] = record
+        self._by_key[key] = record
+
+        # The display name may have changed; rebuild the aliases in id
+        # order so earlier abilities keep their spellings
+        self._aliases = {}
+        for each in self.records:
+            self._add_aliases(each)
+
+        self.version += 1
+        return record
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, name):
+        """Returns the AbilityRecord for any accepted spelling, or None."""
+        record = self._aliases.get(name)
+        if record is None:
+            # Uncommon spelling: same normalization get_ability always used
+            record = self._aliases.get(name.lower().replace(" ", "_"))
+        return record
+
+    def get_id(self, name):
+        record = self.lookup(name)
+        return record.id if record else None
+
+    def by_id(self, ability_id):
+        return self.records[ability_id]
+
+    def command_category(self, name):
+        record = self.lookup(name)
+        return record.command_category if record else None
+
+
+ABILITY_REGISTRY = AbilityRegistry(ABILITY_DATABASE)
+
+
 # ==========================================================
 # HELPER
 # ==========================================================
@@ -163,6 +304,5 @@ def get_ability(name):
         "data_pulse"
         "Data Pulse"
     """
-    key = name.lower().replace(" ", "_")
-    return ABILITY_DATABASE.get(key)
-
+    record = ABILITY_REGISTRY.lookup(name)
+    return record.ability if record else None
@@ -0,0 +1,152 @@
+"""
+CyberDex - Batched Ability Math
+Vectorized counterparts of Ability.calculate_damage and
+Ability.try_apply_status for balance runs over millions of hits.
+Requires numpy.
+"""
+
+import numpy as np
+
+from data.ability import ABILITY_REGISTRY
+
+
+# ==========================================================
+# ID TABLES
+# ==========================================================
+
+TYPE_NAMES = ["ai", "worm", "malware", "ransomware", "spyware"]
+TYPE_IDS = {name: i for i, name in enumerate(TYPE_NAMES)}
+
+# Ids match ABILITY_REGISTRY record ids. Code reading these directly
+# calls refresh_tables() first. The key list and id dict are updated in
+# place; the arrays are rebuilt, so read them through the module
+# (ability_batch.POWER) rather than importing them by name
+ABILITY_KEYS = []
+ABILITY_IDS = {}
+
+POWER = CRIT_RATE = ABILITY_TYPE = None
+STATUS_CHANCE = HAS_STATUS = STATUS_EFFECT = None
+
+# ABILITY_REGISTRY.version the tables were built from
+_tables_version = None
+
+
+def refresh_tables():
+    """
+    Rebuilds the per-ability tables if abilities were registered or
+    replaced since they were built. The batch functions call this first;
+    it is one version compare when nothing changed.
+    """
+    global _tables_version, POWER, CRIT_RATE, ABILITY_TYPE
+    global STATUS_CHANCE, HAS_STATUS, STATUS_EFFECT
+
+    if _tables_version == ABILITY_REGISTRY.version:
+        return
+
+    records = ABILITY_REGISTRY.records
+    abilities = [record.ability for record in records]
+
+    ABILITY_KEYS[:] = [record.key for record in records]
+    ABILITY_IDS.clear()
+    ABILITY_IDS.update((record.key, record.id) for record in records)
+
+    POWER = np.array([a.power for a in abilities], dtype=np.float64)
+    CRIT_RATE = np.array([a.crit_rate for a in abilities], dtype=np.float64)
+    ABILITY_TYPE = np.array([TYPE_IDS.get(a.ability_type, -1) for a in abilities])
+    STATUS_CHANCE = np.array([a.status_chance for a in abilities], dtype=np.float64)
+    HAS_STATUS = np.array([bool(a.status_effect) for a in abilities])
+    STATUS_EFFECT = np.array([a.status_effect or "" for a in abilities], dtype=object)
+
+    _tables_version = ABILITY_REGISTRY.version
+
+
+refresh_tables()
+
+
+def type_ids(type_names):
+    """Maps virus type strings to TYPE_IDS (-1 for unknown types)."""
+    return np.array([TYPE_IDS.get(name, -1) for name in type_names])
+
+
+# ==========================================================
+# DAMAGE
+# ==========================================================
+
+def calculate_damage_batch(ability_ids,
+                           attacker_attack,
+                           defender_defense,
+                           attacker_types,
+                           overclocked=None,
+                           damage_multiplier=None,
+                           crit_boost=None,
+                           rng=None):
+    """
+    Same formula as Ability.calculate_damage, one hit per array element.
+
+    :param ability_ids: ABILITY_IDS per hit
+    :param attacker_attack: Attacker attack stat per hit
+    :param defender_defense: Defender defense stat per hit
+    :param attacker_types: TYPE_IDS of the attacker per hit
+    :param overclocked: Bool per hit (attacker.is_overclocked())
+    :param damage_multiplier: Command bonus damage multiplier per hit
+    :param crit_boost: Command bonus crit boost per hit
+    :param rng: numpy Generator; draws one variance and one crit roll
+                per hit, in that order
+    :return: (damage int64 array, is_critical bool array)
+    """
+    refresh_tables()
+    if rng is None:
+        rng = np.random.default_rng()
+
+    ability_ids = np.asarray(ability_ids)
+    n = len(ability_ids)
+
+    base = (np.asarray(attacker_attack, dtype=np.float64)
+            / np.asarray(defender_defense, dtype=np.float64)) * POWER[ability_ids]
+
+    variance = 0.9 + (1.1 - 0.9) * rng.random(n)
+    base *= variance
+
+    crit_chance = CRIT_RATE[ability_ids]
+    if crit_boost is not None:
+        crit_chance = crit_chance + crit_boost
+
+    is_critical = rng.random(n) < crit_chance
+    base = np.where(is_critical, base * 1.5, base)
+
+    same_type = np.asarray(attacker_types) == ABILITY_TYPE[ability_ids]
+    base = np.where(same_type, base * 1.2, base)
+
+    if overclocked is not None:
+        base = np.where(overclocked, base * 1.25, base)
+
+    if damage_multiplier is not None:
+        base = base * damage_multiplier
+
+    return base.astype(np.int64), is_critical
+
+
+# ==========================================================
+# STATUS
+# ==========================================================
+
+def try_apply_status_batch(ability_ids, status_boost=None, rng=None):
+    """
+    Vectorized Ability.try_apply_status. Draws one roll per element
+    (the scalar path skips the roll for abilities without a status).
+
+    :return: (applied bool array, status name per element or "")
+    """
+    refresh_tables()
+    if rng is None:
+        rng = np.random.default_rng()
+
+    ability_ids = np.asarray(ability_ids)
+
+    chance = STATUS_CHANCE[ability_ids]
+    if status_boost is not None:
+        chance = chance + status_boost
+
+    applied = HAS_STATUS[ability_ids] & (rng.random(len(ability_ids)) < chance)
+    return applied, np.where(applied, STATUS_EFFECT[ability_ids], "")
+
@@ -0,0 +1,47 @@
+"""
+CyberDex - Encounters
+Wild viruses that roam infected zones and the roll that picks one.
+"""
+
+import random
+from bisect import bisect
+from itertools import accumulate
+
+from data.virus import Virus
+
+
+# ==========================================================
+# WILD VIRUS TABLE
+# ==========================================================
+
+# name, virus_type, tier, (min level, max level), abilities, weight
+WILD_VIRUSES = (
+    ("Pinglet", "worm", 1, (2, 5), ("lag_spike", "packet_storm"), 40),
+    ("Botling", "ai", 1, (2, 5), ("data_pulse", "lag_spike"), 30),
+    ("Rotkit", "malware", 1, (3, 6), ("corrupt_burst", "data_pulse"), 20),
+    ("Lockjaw", "ransomware", 2, (5, 8), ("overheat_injection", "corrupt_burst"), 10),
+)
+
+_CUMULATIVE_WEIGHTS = list(accumulate(entry[5] for entry in WILD_VIRUSES))
+
+
+# ==========================================================
+# HELPER
+# ==========================================================
+
+def roll_wild_virus(rng=random, level_bonus=0):
+    """
+    Picks a wild virus by weight and builds it at a random level.
+
+    :param rng: random.Random-like source (default: module random)
+    :param level_bonus: Added to the rolled level (e.g. for harder zones)
+    :return: Virus at full HP with its abilities set
+    """
+    pick = rng.random() * _CUMULATIVE_WEIGHTS[-1]
+    name, virus_type, tier, (low, high), abilities, _ = WILD_VIRUSES[
+        bisect(_CUMULATIVE_WEIGHTS, pick)
+    ]
+
+    virus = Virus(name, virus_type, tier, level=rng.randint(low, high) + level_bonus)
+    virus.abilities = list(abilities)
+    return virus
@@ -3,16 +3,103 @@ CyberDex - Virus Entity
 Full RPG creature system.
 """
 
+import copy
 import math
+from bisect import bisect_right
+
+BASE_MAX_HP = 100
+BASE_ATTACK = 20
+BASE_DEFENSE = 15
+BASE_SPEED = 10
+
+
+# ===============================
+# EXPERIENCE TABLE
+# ===============================
+
+# Indexed by level (index 0 unused):
+#   _EXP_TO_NEXT[level] - EXP needed to go from level to level + 1
+#   _EXP_TOTAL[level]   - EXP needed to go from level 1 to level
+_EXP_TO_NEXT = [0]
+_EXP_TOTAL = [0]
+
+
+def _extend_exp_table(max_level):
+    while len(_EXP_TO_NEXT) <= max_level:
+        level = len(_EXP_TO_NEXT)
+        _EXP_TOTAL.append(_EXP_TOTAL[-1] + _EXP_TO_NEXT[-1])
+        _EXP_TO_NEXT.append(int(50 * math.pow(level, 1.3)))
+
+
+_extend_exp_table(100)
+
+
+def exp_needed_for_level(level):
+    if level >= len(_EXP_TO_NEXT):
+        _extend_exp_table(level)
+    return _EXP_TO_NEXT[level]
+
+
+def total_exp_for_level(level):
+    """Cumulative EXP from level 1 to the start of level."""
+    if level >= len(_EXP_TOTAL):
+        _extend_exp_table(level)
+    return _EXP_TOTAL[level]
+
+
+def level_for_total_exp(total):
+    """
+    Returns (level, leftover exp) reached with total EXP earned since
+    level 1. Same result as repeatedly subtracting the per-level EXP.
+    """
+    while _EXP_TOTAL[-1] <= total:
+        _extend_exp_table(len(_EXP_TO_NEXT) * 2)
+
+    level = bisect_right(_EXP_TOTAL, total) - 1
+    return level, total - _EXP_TOTAL[level]
+
+
+def cumulative_exp_table(max_total):
+    """
+    The cumulative EXP table (index = level), grown so it covers
+    max_total. For batched lookups across many rows at once; treat it
+    as read-only.
+    """
+    level_for_total_exp(max_total)
+    return _EXP_TOTAL
+
+
+def scale_stat(base, level):
+    return int(base + (level * 2.5))
+
+
+# Fields written by Virus.to_dict. Methods that change one mark the
+# virus dirty; code assigning them directly must call mark_dirty().
+# In-place edits of the abilities list are found by the save journal
+SAVED_FIELDS = frozenset((
+    "name", "virus_type", "tier", "level", "exp",
+    "current_hp", "corruption", "abilities",
+))
 
 
 class Virus:
+    __slots__ = (
+        "name", "virus_type", "tier",
+        "level", "exp", "exp_to_next",
+        "base_max_hp", "base_attack", "base_defense", "base_speed",
+        "max_hp", "attack", "defense", "speed",
+        "current_hp", "status",
+        "corruption", "max_corruption",
+        "abilities",
+        "_dirty",
+    )
+
     def __init__(self, name, virus_type, tier,
                  level=1,
-                 max_hp=100,
-                 attack=20,
-                 defense=15,
-                 speed=10):
+                 max_hp=BASE_MAX_HP,
+                 attack=BASE_ATTACK,
+                 defense=BASE_DEFENSE,
+                 speed=BASE_SPEED):
 
         self.name = name
         self.virus_type = virus_type
@@ -44,15 +131,33 @@ class Virus:
         # Abilities (list of ability names)
         self.abilities = []
 
+        # Never saved yet
+        self._dirty = True
+
+    # ===============================
+    # DIRTY TRACKING
+    # ===============================
+
+    def is_dirty(self):
+        """True if a saved field changed since the last save."""
+        return self._dirty
+
+    def mark_dirty(self):
+        """Call after assigning a saved field directly."""
+        self._dirty = True
+
+    def clear_dirty(self):
+        self._dirty = False
+
     # ===============================
     # STAT SCALING
     # ===============================
 
     def _scale_stat(self, base):
-        return int(base + (self.level * 2.5))
+        return scale_stat(base, self.level)
 
     def _calculate_exp_needed(self):
-        return int(50 * math.pow(self.level, 1.3))
+        return exp_needed_for_level(self.level)
 
     # ===============================
     # DAMAGE
@@ -61,11 +166,13 @@ class Virus:
     def take_damage(self, amount):
         self.current_hp = max(0, self.current_hp - amount)
         self.add_corruption(amount * 0.3)
+        self._dirty = True
 
     def heal_full(self):
         self.current_hp = self.max_hp
         self.status = None
         self.corruption = 0
+        self._dirty = True
 
     def is_fainted(self):
         return self.current_hp <= 0
@@ -76,15 +183,17 @@ class Virus:
 
     def gain_exp(self, amount):
         self.exp += amount
-        leveled_up = False
+        self._dirty = True
 
-        while self.exp >= self.exp_to_next:
-            self.exp -= self.exp_to_next
-            self.level += 1
-            leveled_up = True
-            self._level_up()
+        if self.exp < self.exp_to_next:
+            return False
 
-        return leveled_up
+        # Jump straight to the final level and rescale once
+        self.level, self.exp = level_for_total_exp(
+            total_exp_for_level(self.level) + self.exp
+        )
+        self._level_up()
+        return True
 
     def _level_up(self):
         self.exp_to_next = self._calculate_exp_needed()
@@ -104,6 +213,7 @@ class Virus:
         self.corruption += amount
         if self.corruption > self.max_corruption:
             self.corruption = self.max_corruption
+        self._dirty = True
 
     def is_overclocked(self):
         return self.corruption >= self.max_corruption
@@ -136,14 +246,131 @@ class Virus:
 
     @staticmethod
     def from_dict(data):
-        virus = Virus(
-            data["name"],
-            data["virus_type"],
-            data["tier"],
-            level=data["level"]
-        )
+        """
+        Rebuilds a saved virus with default base stats, computing each
+        scaled stat once. The result is not dirty.
+        """
+        virus = Virus.__new__(Virus)
+        level = data["level"]
+
+        virus.name = data["name"]
+        virus.virus_type = data["virus_type"]
+        virus.tier = data["tier"]
+        virus.level = level
         virus.exp = data["exp"]
+        virus.exp_to_next = exp_needed_for_level(level)
+
+        virus.base_max_hp = BASE_MAX_HP
+        virus.base_attack = BASE_ATTACK
+        virus.base_defense = BASE_DEFENSE
+        virus.base_speed = BASE_SPEED
+
+        virus.max_hp = scale_stat(BASE_MAX_HP, level)
+        virus.attack = scale_stat(BASE_ATTACK, level)
+        virus.defense = scale_stat(BASE_DEFENSE, level)
+        virus.speed = scale_stat(BASE_SPEED, level)
+
         virus.current_hp = data["current_hp"]
+        virus.status = None
         virus.corruption = data["corruption"]
+        virus.max_corruption = 100
         virus.abilities = data["abilities"]
+        virus._dirty = False
         return virus
+
+
+# ===============================
+# LAZY LOADING
+# ===============================
+
+def _unpickle_virus(virus):
+    return virus
+
+
+class LazyVirus:
+    """
+    Stand-in for a saved virus that builds the real Virus on first use.
+
+    Saved fields are read straight from the save dict; anything else
+    (stats, methods, assignments) materializes the Virus and delegates
+    to it from then on. to_dict and the dirty flags never materialize.
+    """
+    __slots__ = ("_data", "_virus")
+
+    def __init__(self, data):
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "_virus", None)
+
+    def materialize(self):
+        virus = self._virus
+        if virus is None:
+            virus = Virus.from_dict(self._data)
+            object.__setattr__(self, "_virus", virus)
+        return virus
+
+    @property
+    def is_materialized(self):
+        return self._virus is not None
+
+    def __getattr__(self, name):
+        # Only reached for the slots themselves when they are unset (an
+        # instance made by copy/pickle without __init__)
+        if name in LazyVirus.__slots__:
+            raise AttributeError(name)
+
+        virus = self._virus
+        if virus is None:
+            if name in SAVED_FIELDS:
+                return self._data[name]
+            virus = self.materialize()
+        return getattr(virus, name)
+
+    def __setattr__(self, name, value):
+        virus = self.materialize()
+        setattr(virus, name, value)
+        if name in SAVED_FIELDS:
+            virus.mark_dirty()
+
+    # Copies and pickles are real Viruses; the proxy is only a load-time shortcut
+    def __copy__(self):
+        return copy.copy(self.materialize())
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.materialize(), memo)
+
+    def __reduce__(self):
+        # Pickles the Virus itself; unpickling hands it straight back
+        return _unpickle_virus, (self.materialize(),)
+
+    def __repr__(self):
+        return f"LazyVirus({self._data['name']!r}, level={self._data['level']})"
+
+    def to_dict(self):
+        if self._virus is None:
+            return self._data
+        return self._virus.to_dict()
+
+    def is_dirty(self):
+        return self._virus is not None and self._virus.is_dirty()
+
+    def clear_dirty(self):
+        if self._virus is not None:
+            self._virus.clear_dirty()
+
+
+# ===============================
+# BATCH HELPERS
+# ===============================
+
+def gain_exp_batch(viruses, amounts):
+    """
+    Grants EXP to many Virus objects. Each object has to be updated on
+    its own; for a whole storage box use VirusStore.gain_exp, which
+    works on the columns.
+
+    :param amounts: One amount per virus, or a single amount for all
+    :return: List of leveled_up flags
+    """
+    if isinstance(amounts, (int, float)):
+        return [virus.gain_exp(amounts) for virus in viruses]
+    return [virus.gain_exp(amount) for virus, amount in zip(viruses, amounts)]
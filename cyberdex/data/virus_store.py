@@ -0,0 +1,293 @@
+"""
+CyberDex - Virus Store
+Columnar storage box for large virus collections.
+
+Stored viruses live as rows in typed arrays (the same fields Virus.to_dict
+saves); names, types, tiers and ability lists are interned. A Virus object
+is only built when a row is read or taken out of the box.
+
+A box is not a list of viruses: get() builds a detached copy of a row,
+so changes to it only reach the box through set(). There is no
+indexing or iteration, so that a store[i] edit cannot be silently lost.
+"""
+
+from array import array
+
+from data.virus import Virus, BASE_MAX_HP, scale_stat, cumulative_exp_table
+
+
+class _InternTable:
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def intern(self, value):
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self._ids[value] = value_id
+        return value_id
+
+
+class VirusStore:
+
+    # Change log for journaled saves; None until track_changes()
+    _changes = None
+
+    def __init__(self):
+        self.names = _InternTable()
+        self.types = _InternTable()
+        self.tiers = _InternTable()
+        self.ability_sets = _InternTable()
+
+        self.name_id = array("I")
+        self.type_id = array("I")
+        self.tier_id = array("I")
+        self.abilities_id = array("I")
+        self.level = array("H")
+        # EXP is whole points; corruption grows fractionally (take_damage)
+        self.exp = array("q")
+        self.current_hp = array("i")
+        self.corruption = array("d")
+
+    def _columns(self):
+        return (self.name_id, self.type_id, self.tier_id, self.abilities_id,
+                self.level, self.exp, self.current_hp, self.corruption)
+
+    def copy(self):
+        """
+        Independent copy of the rows (one memcpy per column). Change
+        tracking is not copied.
+        """
+        store = VirusStore()
+        for name in ("names", "types", "tiers", "ability_sets"):
+            source, target = getattr(self, name), getattr(store, name)
+            target.values = list(source.values)
+            target._ids = dict(source._ids)
+
+        for name in ("name_id", "type_id", "tier_id", "abilities_id",
+                     "level", "exp", "current_hp", "corruption"):
+            setattr(store, name, getattr(self, name)[:])
+
+        return store
+
+    def __len__(self):
+        return len(self.level)
+
+    # ==========================================================
+    # ADD
+    # ==========================================================
+
+    def append(self, virus):
+        self.append_dict(virus.to_dict())
+
+    def extend(self, viruses):
+        for virus in viruses:
+            self.append(virus)
+
+    def append_dict(self, data):
+        """Adds a row from a Virus.to_dict() style dict."""
+        self.name_id.append(self.names.intern(data["name"]))
+        self.type_id.append(self.types.intern(data["virus_type"]))
+        self.tier_id.append(self.tiers.intern(data["tier"]))
+        self.abilities_id.append(self.ability_sets.intern(tuple(data["abilities"])))
+        self.level.append(data["level"])
+        # int(): saves written while exp was a float column hold e.g. 3.0
+        self.exp.append(int(data["exp"]))
+        self.current_hp.append(data["current_hp"])
+        self.corruption.append(data["corruption"])
+
+        if self._changes is not None:
+            self._changes.append(("append", self.row(len(self) - 1)))
+
+    @classmethod
+    def from_dicts(cls, rows):
+        store = cls()
+        for data in rows:
+            store.append_dict(data)
+        return store
+
+    @classmethod
+    def deferred(cls, loader, length=None):
+        """
+        Returns a store whose rows are filled by loader(store) the first
+        time anything on it is used.
+
+        :param length: Row count, if known, so len() does not load
+        """
+        return _DeferredVirusStore(loader, length)
+
+    @property
+    def is_loaded(self):
+        return True
+
+    # ==========================================================
+    # READ
+    # ==========================================================
+
+    def row(self, index):
+        """Returns the Virus.to_dict() form of a row without building a Virus."""
+        return {
+            "name": self.names.values[self.name_id[index]],
+            "virus_type": self.types.values[self.type_id[index]],
+            "tier": self.tiers.values[self.tier_id[index]],
+            "level": self.level[index],
+            "exp": self.exp[index],
+            "current_hp": self.current_hp[index],
+            "corruption": self.corruption[index],
+            "abilities": list(self.ability_sets.values[self.abilities_id[index]]),
+        }
+
+    def get(self, index):
+        """
+        Builds a detached Virus for a row. The row stays in the box and
+        does not see changes to the Virus until set(index, virus).
+        """
+        return Virus.from_dict(self.row(index))
+
+    def to_dicts(self):
+        return [self.row(index) for index in range(len(self))]
+
+    # ==========================================================
+    # MODIFY
+    # ==========================================================
+
+    def set(self, index, virus):
+        data = virus.to_dict()
+        self.name_id[index] = self.names.intern(data["name"])
+        self.type_id[index] = self.types.intern(data["virus_type"])
+        self.tier_id[index] = self.tiers.intern(data["tier"])
+        self.abilities_id[index] = self.ability_sets.intern(tuple(data["abilities"]))
+        self.level[index] = data["level"]
+        self.exp[index] = int(data["exp"])
+        self.current_hp[index] = data["current_hp"]
+        self.corruption[index] = data["corruption"]
+
+        if self._changes is not None:
+            self._changes.append(("set", index, self.row(index)))
+
+    def gain_exp(self, amounts, indices=None):
+        """
+        Grants EXP to rows in place, a whole column at a time, without
+        building Virus objects. Leveled rows are healed to full like
+        Virus._level_up. Requires numpy.
+
+        :param amounts: One amount per index, or a single amount for all
+                        (whole points; fractions are dropped)
+        :param indices: Rows to update, any iterable (default: every
+                        row); a row listed twice gets both amounts
+        :return: Number of rows that leveled up
+        """
+        import numpy as np
+
+        if indices is None:
+            indices = np.arange(len(self))
+        elif not isinstance(indices, np.ndarray):
+            indices = np.fromiter(indices, dtype=np.intp)
+        if not len(indices):
+            return 0
+
+        amounts = np.broadcast_to(np.asarray(amounts).astype(np.int64), indices.shape)
+        rows, position = np.unique(indices, return_inverse=True)
+        gained = np.zeros(len(rows), dtype=np.int64)
+        np.add.at(gained, position, amounts)
+
+        # Views straight onto the array columns; writes go to the box
+        level = np.frombuffer(self.level, dtype=np.uint16)
+        exp = np.frombuffer(self.exp, dtype=np.int64)
+        current_hp = np.frombuffer(self.current_hp, dtype=np.int32)
+
+        old_level = level[rows].astype(np.int64)
+        total = np.array(cumulative_exp_table(0))[old_level] + exp[rows] + gained
+
+        # Level reached = last table entry not above the total EXP earned
+        table = np.array(cumulative_exp_table(int(total.max())))
+        new_level = np.searchsorted(table, total, side="right") - 1
+
+        level[rows] = new_level
+        exp[rows] = total - table[new_level]
+
+        leveled = new_level > old_level
+        leveled_rows = rows[leveled]
+        # Stored rows are rebuilt with default base stats (from_dict)
+        current_hp[leveled_rows] = [
+            scale_stat(BASE_MAX_HP, row_level) for row_level in new_level[leveled].tolist()
+        ]
+
+        if self._changes is not None:
+            self._changes.extend(("set", index, self.row(index)) for index in rows.tolist())
+
+        return len(leveled_rows)
+
+    def take(self, index):
+        """Removes a row from the box and returns it as a Virus."""
+        virus = self.get(index)
+        for column in self._columns():
+            column.pop(index)
+
+        if self._changes is not None:
+            self._changes.append(("pop", index))
+
+        return virus
+
+    def clear(self):
+        for column in self._columns():
+            del column[:]
+
+        if self._changes is not None:
+            self._changes.append(("clear",))
+
+    # ==========================================================
+    # CHANGE TRACKING
+    # ==========================================================
+
+    def track_changes(self):
+        """Starts recording row changes for journaled saves."""
+        self._changes = []
+
+    def drain_changes(self):
+        """
+        Returns the changes since the last drain, oldest first:
+            ("append", row) / ("set", index, row) / ("pop", index) / ("clear",)
+        """
+        changes = self._changes
+        if not changes:
+            return []
+        self._changes = []
+        return changes
+
+    # ==========================================================
+    # STATS
+    # ==========================================================
+
+    def memory_usage(self):
+        """Approximate bytes held by the row columns."""
+        return sum(column.itemsize * len(column) for column in self._columns())
+
+
+class _DeferredVirusStore(VirusStore):
+
+    def __init__(self, loader, length=None):
+        # Columns are missing until first use; see __getattr__
+        self._loader = loader
+        self._length = length
+
+    def __len__(self):
+        if self._loader is not None and self._length is not None:
+            return self._length
+        return len(self.level)
+
+    def __getattr__(self, name):
+        loader = self.__dict__.get("_loader")
+        if loader is None:
+            raise AttributeError(name)
+
+        self._loader = None
+        VirusStore.__init__(self)
+        loader(self)
+        return getattr(self, name)
+
+    @property
+    def is_loaded(self):
+        return self._loader is None
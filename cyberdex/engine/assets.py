@@ -0,0 +1,310 @@
+"""
+CyberDex - Assets
+Shared cache for images, fonts, generated surfaces and packed sprites.
+
+Every surface is converted to the display pixel format once, when it
+enters the cache, so blits stay on SDL's same-format fast path. Before
+a display exists (headless runs) surfaces are kept as created and
+converted by reconvert() once one does.
+"""
+
+import os
+
+import pygame
+
+
+def _display_ready():
+    return pygame.display.get_surface() is not None
+
+
+def _converted(surface, alpha):
+    if not _display_ready():
+        return surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+def _surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+class SpriteAtlas:
+    """
+    Small sprites packed into one surface with a shelf packer: sprites
+    fill a row left to right, and a new row starts below the tallest
+    sprite of the current one. Sprites are drawn as area blits.
+    """
+
+    def __init__(self, width=512, height=512, padding=1):
+        self.width = width
+        self.height = height
+        self.padding = padding
+
+        self.surface = _converted(pygame.Surface((width, height), pygame.SRCALPHA), True)
+        self.surface.fill((0, 0, 0, 0))
+
+        self.regions = {}
+
+        self._shelf_x = 0
+        self._shelf_y = 0
+        self._shelf_height = 0
+
+    def __contains__(self, key):
+        return key in self.regions
+
+    def allocate(self, key, size):
+        """
+        Reserves a region for a sprite.
+
+        :return: pygame.Rect inside the atlas, or None if it does not fit
+        """
+        width, height = size
+        padded_w = width + self.padding
+        padded_h = height + self.padding
+
+        if self._shelf_x + padded_w > self.width:
+            self._shelf_y += self._shelf_height
+            self._shelf_x = 0
+            self._shelf_height = 0
+
+        if padded_w > self.width or self._shelf_y + padded_h > self.height:
+            return None
+
+        rect = pygame.Rect(self._shelf_x, self._shelf_y, width, height)
+        self._shelf_x += padded_w
+        self._shelf_height = max(self._shelf_height, padded_h)
+
+        self.regions[key] = rect
+        return rect
+
+    def add(self, key, source):
+        """Copies a surface into the atlas. :return: its Rect, or None if full"""
+        rect = self.allocate(key, source.get_size())
+        if rect is not None:
+            self.surface.blit(source, rect)
+        return rect
+
+    @property
+    def used_area(self):
+        return sum(rect.width * rect.height for rect in self.regions.values())
+
+    def reconvert(self):
+        self.surface = _converted(self.surface, True)
+
+
+class AssetManager:
+    """
+    Caches by kind:
+        image       files loaded from base_path
+        generated   surfaces painted once by a draw(surface) callback
+        sprite      small generated surfaces packed into a SpriteAtlas
+        font        delegated to the game's TextCache
+
+    Sprites are returned as (surface, area) so callers blit with
+    screen.blit(surface, pos, area); a sprite that did not fit in the
+    atlas comes back as its own surface with area None.
+    """
+
+    KINDS = ("image", "generated", "sprite", "font")
+
+    def __init__(self, text_cache=None, base_path="assets", atlas_size=(512, 512)):
+        self.text_cache = text_cache
+        self.base_path = base_path
+        self.atlas_size = atlas_size
+
+        self._images = {}
+        self._generated = {}
+        self._generated_alpha = {}
+        self._sprites = {}
+
+        self.atlas = None
+
+        self.hits = dict.fromkeys(self.KINDS, 0)
+        self.misses = dict.fromkeys(self.KINDS, 0)
+
+    # ==========================================================
+    # IMAGES
+    # ==========================================================
+
+    def image(self, path, alpha=True):
+        """
+        :param path: Relative to base_path (absolute paths are used as is)
+        :param alpha: Keep per-pixel alpha (convert_alpha) or drop it
+        """
+        key = (path, alpha)
+        surface = self._images.get(key)
+        if surface is not None:
+            self.hits["image"] += 1
+            return surface
+
+        self.misses["image"] += 1
+        surface = _converted(pygame.image.load(os.path.join(self.base_path, path)), alpha)
+        self._images[key] = surface
+        return surface
+
+    # ==========================================================
+    # GENERATED SURFACES
+    # ==========================================================
+
+    def generated(self, key, size, draw, alpha=False):
+        """
+        A surface painted once by draw(surface) and shared afterwards.
+        Callers must not draw on the returned surface.
+        """
+        surface = self._generated.get(key)
+        if surface is not None:
+            self.hits["generated"] += 1
+            return surface
+
+        self.misses["generated"] += 1
+        surface = self._new_surface(size, alpha)
+        draw(surface)
+        self._generated[key] = surface
+        self._generated_alpha[key] = alpha
+        return surface
+
+    def sprite(self, key, size, draw):
+        """
+        A small generated surface packed into the atlas.
+
+        :return: (surface, area Rect or None)
+        """
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self.hits["sprite"] += 1
+            return sprite
+
+        self.misses["sprite"] += 1
+        if self.atlas is None:
+            self.atlas = SpriteAtlas(*self.atlas_size)
+
+        rect = self.atlas.allocate(key, size)
+        if rect is not None:
+            draw(self.atlas.surface.subsurface(rect))
+            sprite = (self.atlas.surface, rect)
+        else:
+            surface = self._new_surface(size, True)
+            draw(surface)
+            sprite = (surface, None)
+
+        self._sprites[key] = sprite
+        return sprite
+
+    def _new_surface(self, size, alpha):
+        if alpha:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 0))
+        else:
+            surface = pygame.Surface(size)
+        return _converted(surface, alpha)
+
+    # ==========================================================
+    # FONTS
+    # ==========================================================
+
+    def font(self, name, size):
+        if self.text_cache is None:
+            raise RuntimeError("AssetManager has no TextCache for fonts")
+
+        if (name, size) in self.text_cache._fonts:
+            self.hits["font"] += 1
+        else:
+            self.misses["font"] += 1
+        return self.text_cache.get_font(name, size)
+
+    # ==========================================================
+    # PRELOAD
+    # ==========================================================
+
+    def preload(self, images=(), generated=(), sprites=(), fonts=()):
+        """
+        Fills the caches ahead of time (e.g. behind a loading screen).
+
+        :param images: paths, or (path, alpha) pairs
+        :param generated: (key, size, draw) or (key, size, draw, alpha)
+        :param sprites: (key, size, draw)
+        :param fonts: (name, size)
+        """
+        for entry in images:
+            if isinstance(entry, str):
+                self.image(entry)
+            else:
+                self.image(*entry)
+        for entry in generated:
+            self.generated(*entry)
+        for entry in sprites:
+            self.sprite(*entry)
+        for name, size in fonts:
+            self.font(name, size)
+
+    def reconvert(self):
+        """Converts everything cached before the display was created."""
+        if not _display_ready():
+            return
+
+        for (path, alpha), surface in self._images.items():
+            self._images[path, alpha] = _converted(surface, alpha)
+
+        for key, surface in self._generated.items():
+            self._generated[key] = _converted(surface, self._generated_alpha[key])
+
+        if self.atlas is not None:
+            self.atlas.reconvert()
+
+        for key, (surface, area) in self._sprites.items():
+            if area is not None:
+                self._sprites[key] = (self.atlas.surface, area)
+            else:
+                self._sprites[key] = (_converted(surface, True), None)
+
+    # ==========================================================
+    # STATS
+    # ==========================================================
+
+    @property
+    def used_bytes(self):
+        total = sum(_surface_bytes(s) for s in self._images.values())
+        total += sum(_surface_bytes(s) for s in self._generated.values())
+        total += sum(_surface_bytes(s) for s, area in self._sprites.values() if area is None)
+        if self.atlas is not None:
+            total += _surface_bytes(self.atlas.surface)
+        return total
+
+    def stats(self):
+        """
+        :return: {"bytes": int, "atlas_fill": float, kind: {"entries",
+                  "hits", "misses", "hit_rate"}} (text included when a
+                  TextCache is attached)
+        """
+        entries = {
+            "image": len(self._images),
+            "generated": len(self._generated),
+            "sprite": len(self._sprites),
+            "font": len(self.text_cache._fonts) if self.text_cache else 0,
+        }
+
+        report = {"bytes": self.used_bytes, "atlas_fill": 0.0}
+        if self.atlas is not None:
+            report["atlas_fill"] = self.atlas.used_area / (self.atlas.width * self.atlas.height)
+
+        kinds = [(kind, entries[kind], self.hits[kind], self.misses[kind]) for kind in self.KINDS]
+        if self.text_cache is not None:
+            kinds.append(("text", len(self.text_cache._surfaces),
+                          self.text_cache.hits, self.text_cache.misses))
+
+        for kind, count, hits, misses in kinds:
+            lookups = hits + misses
+            report[kind] = {
+                "entries": count,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+        return report
+
+    def clear(self):
+        self._images.clear()
+        self._generated.clear()
+        self._generated_alpha.clear()
+        self._sprites.clear()
+        self.atlas = None
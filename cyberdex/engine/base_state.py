@@ -1,7 +1,71 @@
 class BaseState:
+    # Opt-in to the dirty-rect present path. States that set this must
+    # report what they draw through mark_dirty().
+    supports_dirty_rects = False
+
     def __init__(self, game):
         self.game = game
 
+        self._dirty_rects = []
+        self._full_redraw = True
+
+    @property
+    def state_manager(self):
+        return self.game.state_manager
+
+    def get_game_data(self):
+        return self.game.game_data
+
+    # ==========================================================
+    # LIFECYCLE
+    # ==========================================================
+
+    def enter(self, **kwargs):
+        pass
+
+    def exit(self):
+        pass
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    # ==========================================================
+    # DIRTY RECTS
+    # ==========================================================
+
+    def mark_dirty(self, rect=None):
+        """Queues a changed screen region; None means the whole screen."""
+        if rect is None:
+            self._full_redraw = True
+        elif not self._full_redraw:
+            self._dirty_rects.append(rect)
+
+    def needs_redraw(self):
+        return self._full_redraw or bool(self._dirty_rects)
+
+    def consume_dirty_rects(self):
+        """
+        Returns:
+            None  - present the whole screen
+            []    - nothing changed, skip the present
+            rects - present only these regions
+        """
+        if self._full_redraw or not self.supports_dirty_rects:
+            self._full_redraw = False
+            self._dirty_rects.clear()
+            return None
+
+        rects = self._dirty_rects
+        self._dirty_rects = []
+        return rects
+
+    # ==========================================================
+    # FRAME
+    # ==========================================================
+
     def handle_events(self, events):
         pass
 
@@ -0,0 +1,107 @@
+"""
+CyberDex - Chunk Cache
+Pre-rendered static world layer split into fixed-size chunks.
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+
+class ChunkCache:
+    """
+    Draws the static world (terrain, scenery, zones) once per chunk into
+    a cached Surface and blits only the chunks that intersect the camera.
+
+    Chunks are built on demand by draw_chunk(surface, world_rect), which
+    must paint everything static inside world_rect with world_rect's
+    top-left at (0, 0). Built chunks are kept in an LRU capped by bytes.
+    """
+
+    def __init__(self, world_width, world_height, draw_chunk,
+                 chunk_size=256, max_bytes=32 * 1024 * 1024):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.draw_chunk = draw_chunk
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+
+        self._chunks = OrderedDict()
+        self.used_bytes = 0
+
+    # ==========================================================
+    # INVALIDATION
+    # ==========================================================
+
+    def invalidate(self, world_rect=None):
+        """Drops chunks overlapping world_rect, or every chunk if None."""
+        if world_rect is None:
+            self._chunks.clear()
+            self.used_bytes = 0
+            return
+
+        for key in self._chunk_keys(pygame.Rect(world_rect)):
+            self._drop(key)
+
+    def _drop(self, key):
+        surface = self._chunks.pop(key, None)
+        if surface is not None:
+            self.used_bytes -= _surface_bytes(surface)
+
+    # ==========================================================
+    # RENDER
+    # ==========================================================
+
+    def render(self, screen, camera_rect):
+        """Blits the visible chunks; camera_rect is in world coordinates."""
+        size = self.chunk_size
+
+        for key in self._chunk_keys(camera_rect):
+            surface = self._get_chunk(key)
+            screen.blit(
+                surface,
+                (key[0] * size - camera_rect.x, key[1] * size - camera_rect.y)
+            )
+
+    def _chunk_keys(self, rect):
+        size = self.chunk_size
+        max_cx = (self.world_width - 1) // size
+        max_cy = (self.world_height - 1) // size
+
+        x0 = max(0, rect.left // size)
+        y0 = max(0, rect.top // size)
+        x1 = min(max_cx, (rect.right - 1) // size)
+        y1 = min(max_cy, (rect.bottom - 1) // size)
+
+        return [(cx, cy) for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)]
+
+    def _get_chunk(self, key):
+        surface = self._chunks.get(key)
+        if surface is not None:
+            self._chunks.move_to_end(key)
+            return surface
+
+        size = self.chunk_size
+        world_rect = pygame.Rect(key[0] * size, key[1] * size, size, size).clip(
+            pygame.Rect(0, 0, self.world_width, self.world_height)
+        )
+
+        surface = pygame.Surface(world_rect.size)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+
+        self.draw_chunk(surface, world_rect)
+
+        self._chunks[key] = surface
+        self.used_bytes += _surface_bytes(surface)
+
+        # Keep the chunk just built even if it alone exceeds the cap
+        while self.used_bytes > self.max_bytes and len(self._chunks) > 1:
+            _, evicted = self._chunks.popitem(last=False)
+            self.used_bytes -= _surface_bytes(evicted)
+
+        return surface
+
+
+def _surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
@@ -0,0 +1,264 @@
+"""
+CyberDex - Effects
+Pooled floating text, particles and screen shake for battle animation.
+
+Every pool is allocated once with a fixed capacity: live effects are
+packed at the front of parallel arrays, dead ones are swap-removed, and
+spawning past the cap is dropped. Drawing reuses one blit entry per slot
+and hands the live slice to Surface.blits, so a running animation
+creates no per-effect objects per frame.
+"""
+
+import random
+from array import array
+from itertools import islice
+
+import pygame
+
+
+class FloatingTextPool:
+    """Pre-rendered text surfaces that drift upward and expire."""
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.count = 0
+
+        self.x = array("d", [0.0]) * capacity
+        self.y = array("d", [0.0]) * capacity
+        self.vy = array("d", [0.0]) * capacity
+        self.life = array("d", [0.0]) * capacity
+        self.surfaces = [None] * capacity
+
+        # Reused [surface, [x, y]] entries for Surface.blits
+        self._blits = [[None, [0, 0]] for _ in range(capacity)]
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, surface, x, y, vy=-40.0, life=1.0):
+        """
+        :param surface: Already rendered text (e.g. from TextCache)
+        :return: False if the pool is full
+        """
+        i = self.count
+        if i == self.capacity:
+            return False
+
+        self.surfaces[i] = surface
+        self.x[i] = x
+        self.y[i] = y
+        self.vy[i] = vy
+        self.life[i] = life
+        self.count = i + 1
+        return True
+
+    def update(self, dt):
+        x, y, vy, life, surfaces = self.x, self.y, self.vy, self.life, self.surfaces
+        i = 0
+
+        while i < self.count:
+            remaining = life[i] - dt
+            if remaining > 0:
+                life[i] = remaining
+                y[i] += vy[i] * dt
+                i += 1
+                continue
+
+            # Swap-remove: move the last live slot into this one
+            last = self.count - 1
+            x[i], y[i], vy[i], life[i] = x[last], y[last], vy[last], life[last]
+            surfaces[i] = surfaces[last]
+            surfaces[last] = None
+            self.count = last
+
+    def draw(self, screen, offset_x=0, offset_y=0):
+        blits = self._blits
+        x, y, surfaces = self.x, self.y, self.surfaces
+
+        for i in range(self.count):
+            entry = blits[i]
+            entry[0] = surfaces[i]
+            pos = entry[1]
+            pos[0] = int(x[i]) + offset_x
+            pos[1] = int(y[i]) + offset_y
+
+        screen.blits(islice(blits, self.count), doreturn=False)
+
+    def clear(self):
+        for i in range(self.count):
+            self.surfaces[i] = None
+            self._blits[i][0] = None
+        self.count = 0
+
+
+class ParticleBuffer:
+    """Point particles with velocity, gravity and a lifetime."""
+
+    def __init__(self, capacity=512, gravity=300.0, size=3):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.size = size
+        self.count = 0
+
+        self.x = array("d", [0.0]) * capacity
+        self.y = array("d", [0.0]) * capacity
+        self.vx = array("d", [0.0]) * capacity
+        self.vy = array("d", [0.0]) * capacity
+        self.life = array("d", [0.0]) * capacity
+        self.sprites = [None] * capacity
+
+        # One small square surface per color, made on first use
+        self._sprite_cache = {}
+        self._blits = [[None, [0, 0]] for _ in range(capacity)]
+
+    def __len__(self):
+        return self.count
+
+    def _sprite(self, color):
+        key = tuple(color)
+        sprite = self._sprite_cache.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((self.size, self.size))
+            sprite.fill(key)
+            self._sprite_cache[key] = sprite
+        return sprite
+
+    def burst(self, x, y, count, color, speed=160.0, life=0.5, rng=random):
+        """
+        Emits up to count particles from (x, y) in random directions.
+
+        :return: Number actually emitted (limited by capacity)
+        """
+        sprite = self._sprite(color)
+        emitted = min(count, self.capacity - self.count)
+
+        for i in range(self.count, self.count + emitted):
+            self.x[i] = x
+            self.y[i] = y
+            self.vx[i] = rng.uniform(-speed, speed)
+            self.vy[i] = rng.uniform(-speed, speed * 0.25)
+            self.life[i] = life * rng.uniform(0.6, 1.0)
+            self.sprites[i] = sprite
+
+        self.count += emitted
+        return emitted
+
+    def update(self, dt):
+        x, y, vx, vy, life, sprites = self.x, self.y, self.vx, self.vy, self.life, self.sprites
+        fall = self.gravity * dt
+        i = 0
+
+        while i < self.count:
+            remaining = life[i] - dt
+            if remaining > 0:
+                life[i] = remaining
+                vy[i] += fall
+                x[i] += vx[i] * dt
+                y[i] += vy[i] * dt
+                i += 1
+                continue
+
+            last = self.count - 1
+            x[i], y[i], vx[i], vy[i], life[i] = x[last], y[last], vx[last], vy[last], life[last]
+            sprites[i] = sprites[last]
+            sprites[last] = None
+            self.count = last
+
+    def draw(self, screen, offset_x=0, offset_y=0):
+        blits = self._blits
+        x, y, sprites = self.x, self.y, self.sprites
+
+        for i in range(self.count):
+            entry = blits[i]
+            entry[0] = sprites[i]
+            pos = entry[1]
+            pos[0] = int(x[i]) + offset_x
+            pos[1] = int(y[i]) + offset_y
+
+        screen.blits(islice(blits, self.count), doreturn=False)
+
+    def clear(self):
+        for i in range(self.count):
+            self.sprites[i] = None
+            self._blits[i][0] = None
+        self.count = 0
+
+
+class ScreenShake:
+    """One reusable shake; start() restarts it instead of allocating."""
+
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.intensity = 0.0
+        self.duration = 0.0
+        self.timer = 0.0
+        self.offset_x = 0
+        self.offset_y = 0
+
+    def start(self, intensity=8.0, duration=0.3):
+        # A weaker shake does not cut a stronger one short
+        if self.timer > 0 and intensity < self.intensity:
+            return
+        self.intensity = intensity
+        self.duration = duration
+        self.timer = duration
+
+    def update(self, dt):
+        if self.timer <= 0:
+            return
+
+        self.timer -= dt
+        if self.timer <= 0:
+            self.timer = 0.0
+            self.offset_x = self.offset_y = 0
+            return
+
+        # Decays linearly over the duration
+        strength = self.intensity * (self.timer / self.duration)
+        self.offset_x = int(self.rng.uniform(-strength, strength))
+        self.offset_y = int(self.rng.uniform(-strength, strength))
+
+    def is_active(self):
+        return self.timer > 0
+
+    def stop(self):
+        self.timer = 0.0
+        self.offset_x = self.offset_y = 0
+
+
+class EffectSystem:
+    """Floating text, particles and shake behind one update/draw."""
+
+    def __init__(self, max_texts=64, max_particles=512):
+        self.texts = FloatingTextPool(max_texts)
+        self.particles = ParticleBuffer(max_particles)
+        self.shake = ScreenShake()
+
+    @property
+    def active(self):
+        return bool(self.texts.count or self.particles.count or self.shake.is_active())
+
+    def spawn_text(self, surface, x, y, vy=-40.0, life=1.0):
+        return self.texts.spawn(surface, x, y, vy, life)
+
+    def burst(self, x, y, count, color, speed=160.0, life=0.5):
+        return self.particles.burst(x, y, count, color, speed, life)
+
+    def start_shake(self, intensity=8.0, duration=0.3):
+        self.shake.start(intensity, duration)
+
+    def update(self, dt):
+        self.texts.update(dt)
+        self.particles.update(dt)
+        self.shake.update(dt)
+
+    def draw(self, screen):
+        """Draws particles, then text, both offset by the current shake."""
+        offset_x, offset_y = self.shake.offset_x, self.shake.offset_y
+        self.particles.draw(screen, offset_x, offset_y)
+        self.texts.draw(screen, offset_x, offset_y)
+
+    def clear(self):
+        self.texts.clear()
+        self.particles.clear()
+        self.shake.stop()
@@ -1,30 +1,216 @@
+import os
 import pygame
-from engine.state_manager import StateManager
+from config import SCREEN_WIDTH, SCREEN_HEIGHT
+from engine.state_manager import StateManager, FrameProfiler
+from engine.text_cache import TextCache
+from engine.assets import AssetManager
 from states.menu_state import MenuState
 
+SCREEN_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)
+TARGET_FPS = 60
+FIXED_TIMESTEP = 1 / 60
+MAX_FRAME_TIME = 0.25
+
+
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, fixed_timestep=None,
+                 profile=False, profile_overlay=False, profile_dump=None,
+                 dirty_rects=False):
+        """
+        :param headless: Run without a window (SDL dummy video driver);
+                         rendering goes to an offscreen surface.
+        :param fixed_timestep: Seconds per simulation tick. When set, run()
+                               uses an accumulator so updates happen at a
+                               fixed rate independent of the render rate.
+        :param profile: Record per-state frame timings in the StateManager
+        :param profile_overlay: Draw the timing stats on screen
+        :param profile_dump: Path (.json or .csv) written on exit
+        :param dirty_rects: Present only the regions states report as
+                            changed, and skip the present when none did
+        """
+        self.headless = headless
+        self.fixed_timestep = fixed_timestep
+        self.dirty_rects = dirty_rects
+
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
         pygame.init()
-        self.screen = pygame.display.set_mode((1280, 720))
-        pygame.display.set_caption("CyberDex: Infected Protocol")
+
+        if headless:
+            self.screen = pygame.Surface(SCREEN_SIZE)
+        else:
+            self.screen = pygame.display.set_mode(SCREEN_SIZE)
+            pygame.display.set_caption("CyberDex: Infected Protocol")
+
         self.clock = pygame.time.Clock()
         self.running = True
+        self.ticks = 0
+
+        self.profile_dump = profile_dump
+        profiler = None
+        if profile or profile_overlay or profile_dump:
+            profiler = FrameProfiler(overlay=profile_overlay)
+
+        self.text_cache = TextCache()
+
+        # Images, generated surfaces and the sprite atlas, converted to
+        # the display format once; fonts go through text_cache
+        self.assets = AssetManager(self.text_cache)
+        self.assets.preload(fonts=[(None, 28), (None, 36)])
+
+        # Shared save-style game data (team, storage, inventory, ...)
+        self.game_data = {}
+        self.save_worker = None
+
+        self.state_manager = StateManager(profiler=profiler)
+        self._register_states()
+        self.state_manager.change_state("menu")
 
-        self.state_manager = StateManager(MenuState(self))
+    def _register_states(self):
+        from states.overworld_state import OverworldState
+
+        self.state_manager.register("menu", lambda: MenuState(self))
+        self.state_manager.register("overworld", lambda: OverworldState(self))
+        self.state_manager.register("battle", self._create_battle_state)
+
+    def _create_battle_state(self):
+        # Imported lazily: the battle state pulls in all the combat systems
+        from states.battle_state import BattleState
+        return BattleState(self)
+
+    def get_save_worker(self):
+        """
+        Background saver for states: get_save_worker().save(game_data, slot).
+        Created on first use; flushed when the game exits.
+        """
+        if self.save_worker is None:
+            from systems.save_system import SaveSystem
+            from systems.save_worker import SaveWorker
+            self.save_worker = SaveWorker(SaveSystem())
+        return self.save_worker
+
+    # ==========================================================
+    # MAIN LOOP
+    # ==========================================================
 
     def run(self):
+        if self.fixed_timestep:
+            self._run_fixed_timestep(self.fixed_timestep)
+        else:
+            self._run_variable_timestep()
+
+        self._shutdown()
+
+    def _run_variable_timestep(self):
         while self.running:
-            dt = self.clock.tick(60) / 1000
-            events = pygame.event.get()
+            dt = self.clock.tick(TARGET_FPS) / 1000
+            self._step(self._poll_events(), dt)
+            self._present()
 
-            for event in events:
-                if event.type == pygame.QUIT:
-                    self.running = False
+    def _run_fixed_timestep(self, step):
+        """
+        Accumulator loop: real elapsed time is banked and consumed in
+        fixed-size simulation ticks, then one frame is rendered.
+        """
+        accumulator = 0.0
 
-            self.state_manager.handle_events(events)
-            self.state_manager.update(dt)
-            self.state_manager.render(self.screen)
+        while self.running:
+            frame_time = min(self.clock.tick(TARGET_FPS) / 1000, MAX_FRAME_TIME)
+            accumulator += frame_time
 
-            pygame.display.flip()
+            events = self._poll_events()
+
+            while accumulator >= step and self.running:
+                self._step(events, step)
+                events = []
+                accumulator -= step
+
+            self._present()
+
+    # ==========================================================
+    # HEADLESS SIMULATION
+    # ==========================================================
+
+    def run_headless(self, ticks, dt=FIXED_TIMESTEP, render_every=0, shutdown=True):
+        """
+        Runs the state logic as fast as the CPU allows with a fixed dt.
+
+        :param ticks: Number of simulation ticks to run
+        :param dt: Seconds of game time per tick
+        :param render_every: Render to the offscreen surface every N ticks
+                             (0 disables rendering entirely)
+        :param shutdown: Exit like run() afterwards (flush saves, write
+                         profile_dump, quit pygame); pass False to call
+                         run_headless again
+        :return: Number of ticks actually executed
+        """
+        profiler = self.state_manager.profiler
+        executed = 0
+
+        while executed < ticks and self.running:
+            self._step(self._poll_events(), dt)
+            executed += 1
+
+            if render_every and executed % render_every == 0:
+                self.state_manager.render(self.screen)
+            elif profiler is not None:
+                # render() closes the frame; without it every tick is one
+                profiler.end_frame(type(self.state_manager.current_state).__name__)
+
+        if shutdown:
+            self._shutdown()
+
+        return executed
+
+    # ==========================================================
+    # HELPERS
+    # ==========================================================
+
+    def _shutdown(self):
+        # Queued saves must reach the disk before the process exits
+        if self.save_worker is not None:
+            self.save_worker.close()
+
+        profiler = self.state_manager.profiler
+        if profiler and self.profile_dump:
+            profiler.dump(self.profile_dump)
 
         pygame.quit()
+
+    def _poll_events(self):
+        events = pygame.event.get()
+
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.state_manager.current_state.mark_dirty()
+
+        return events
+
+    def _step(self, events, dt):
+        self.state_manager.handle_events(events)
+        self.state_manager.update(dt)
+        self.ticks += 1
+        self.game_data["playtime"] = self.game_data.get("playtime", 0) + dt
+
+        if self.save_worker is not None:
+            self.save_worker.poll()
+
+    def _present(self):
+        self.state_manager.render(self.screen)
+
+        if self.headless:
+            return
+
+        if not self.dirty_rects:
+            pygame.display.flip()
+            return
+
+        rects = self.state_manager.consume_dirty_rects()
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
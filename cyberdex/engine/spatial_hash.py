@@ -0,0 +1,145 @@
+"""
+CyberDex - Spatial Hash
+Uniform-grid broadphase for rect collision and visibility queries.
+"""
+
+import pygame
+
+
+class SpatialHash:
+    """
+    Buckets items into square cells by their bounding rect.
+
+    Items are tracked by identity, so unhashable objects such as
+    pygame.Rect can be indexed directly. Queries return each matching
+    item once, in insertion order of the cells they are found in.
+    """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+
+        # cell -> {item_id: item}
+        self._cells = {}
+        # item_id -> (item, rect, cells)
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return id(item) in self._entries
+
+    # ==========================================================
+    # INDEXING
+    # ==========================================================
+
+    def _cells_for(self, rect):
+        size = self.cell_size
+        x0 = rect.left // size
+        y0 = rect.top // size
+        # Rects are half-open: the right/bottom edge is exclusive
+        x1 = (rect.right - 1) // size if rect.width > 0 else x0
+        y1 = (rect.bottom - 1) // size if rect.height > 0 else y0
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def insert(self, item, rect=None):
+        """
+        :param item: Object to index
+        :param rect: Bounds; defaults to the item itself (for pygame.Rect)
+        """
+        item_id = id(item)
+        if item_id in self._entries:
+            self.update(item, rect)
+            return
+
+        rect = pygame.Rect(item if rect is None else rect)
+        cells = self._cells_for(rect)
+        for cell in cells:
+            self._cells.setdefault(cell, {})[item_id] = item
+        self._entries[item_id] = (item, rect, cells)
+
+    def remove(self, item):
+        entry = self._entries.pop(id(item), None)
+        if entry is None:
+            return
+
+        for cell in entry[2]:
+            bucket = self._cells[cell]
+            del bucket[id(item)]
+            if not bucket:
+                del self._cells[cell]
+
+    def update(self, item, rect=None):
+        """Moves an item; buckets are only touched when its cells change."""
+        item_id = id(item)
+        entry = self._entries.get(item_id)
+        if entry is None:
+            self.insert(item, rect)
+            return
+
+        rect = pygame.Rect(item if rect is None else rect)
+        cells = self._cells_for(rect)
+
+        if cells != entry[2]:
+            for cell in entry[2]:
+                bucket = self._cells[cell]
+                del bucket[item_id]
+                if not bucket:
+                    del self._cells[cell]
+            for cell in cells:
+                self._cells.setdefault(cell, {})[item_id] = item
+
+        self._entries[item_id] = (item, rect, cells)
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+
+    # ==========================================================
+    # QUERIES
+    # ==========================================================
+
+    def query_rect(self, rect):
+        """Returns items whose bounds overlap rect."""
+        rect = pygame.Rect(rect)
+        found = {}
+
+        for cell in self._cells_for(rect):
+            bucket = self._cells.get(cell)
+            if not bucket:
+                continue
+            for item_id in bucket:
+                if item_id in found:
+                    continue
+                entry = self._entries[item_id]
+                if rect.colliderect(entry[1]):
+                    found[item_id] = entry[0]
+
+        return list(found.values())
+
+    def query_point(self, x, y):
+        """Returns items whose bounds contain the point."""
+        size = self.cell_size
+        bucket = self._cells.get((int(x) // size, int(y) // size))
+        if not bucket:
+            return []
+
+        return [
+            self._entries[item_id][0]
+            for item_id in bucket
+            if self._entries[item_id][1].collidepoint(x, y)
+        ]
+
+    def any_rect(self, rect):
+        """True if any indexed item overlaps rect (stops at the first hit)."""
+        rect = pygame.Rect(rect)
+
+        for cell in self._cells_for(rect):
+            bucket = self._cells.get(cell)
+            if not bucket:
+                continue
+            for item_id in bucket:
+                if rect.colliderect(self._entries[item_id][1]):
+                    return True
+
+        return False
@@ -1,15 +1,276 @@
+import csv
+import json
+import math
+import time
+from array import array
+
+PHASES = ("handle_events", "update", "render", "frame")
+
+
+class FrameProfiler:
+    """
+    Records per-state, per-phase timings into fixed-size ring buffers.
+
+    Samples are stored in seconds. The "frame" phase is the sum of the
+    phases recorded since the previous render.
+    """
+
+    def __init__(self, capacity=600, overlay=False):
+        self.capacity = capacity
+        self.overlay = overlay
+
+        # (state_name, phase) -> [samples, write_index, count]
+        self._buffers = {}
+        self._frame_total = 0.0
+        self._font = None
+
+    def record(self, state_name, phase, seconds):
+        buffer = self._buffers.get((state_name, phase))
+        if buffer is None:
+            buffer = [array("d", [0.0]) * self.capacity, 0, 0]
+            self._buffers[(state_name, phase)] = buffer
+
+        samples, index, count = buffer
+        samples[index] = seconds
+        buffer[1] = (index + 1) % self.capacity
+        if count < self.capacity:
+            buffer[2] = count + 1
+
+        if phase != "frame":
+            self._frame_total += seconds
+
+    def end_frame(self, state_name):
+        self.record(state_name, "frame", self._frame_total)
+        self._frame_total = 0.0
+
+    # ==========================================================
+    # STATS
+    # ==========================================================
+
+    def get_stats(self, state_name=None):
+        """
+        Returns:
+            {state_name: {phase: {p50, p95, p99, worst, samples}}}
+        Values are in milliseconds.
+        """
+        stats = {}
+
+        for (name, phase), (samples, _, count) in self._buffers.items():
+            if state_name is not None and name != state_name:
+                continue
+            if count == 0:
+                continue
+
+            ordered = sorted(samples[:count])
+            stats.setdefault(name, {})[phase] = {
+                "p50": _percentile(ordered, 50) * 1000,
+                "p95": _percentile(ordered, 95) * 1000,
+                "p99": _percentile(ordered, 99) * 1000,
+                "worst": ordered[-1] * 1000,
+                "samples": count,
+            }
+
+        return stats
+
+    def reset(self):
+        self._buffers.clear()
+        self._frame_total = 0.0
+
+    # ==========================================================
+    # OUTPUT
+    # ==========================================================
+
+    def dump(self, path):
+        """Writes the current stats as JSON, or CSV if path ends in .csv."""
+        stats = self.get_stats()
+
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["state", "phase", "p50_ms", "p95_ms",
+                                 "p99_ms", "worst_ms", "samples"])
+                for name, phases in stats.items():
+                    for phase, s in phases.items():
+                        writer.writerow([name, phase, s["p50"], s["p95"],
+                                         s["p99"], s["worst"], s["samples"]])
+        else:
+            with open(path, "w") as f:
+                json.dump(stats, f, indent=4)
+
+    def render_overlay(self, screen, state_name):
+        import pygame
+
+        if self._font is None:
+            self._font = pygame.font.Font(None, 20)
+
+        phases = self.get_stats(state_name).get(state_name, {})
+        drawn = None
+        y = 4
+        for phase in PHASES:
+            s = phases.get(phase)
+            if not s:
+                continue
+            line = (f"{state_name} {phase}: p50 {s['p50']:.2f} "
+                    f"p95 {s['p95']:.2f} p99 {s['p99']:.2f} "
+                    f"max {s['worst']:.2f} ms")
+            text = self._font.render(line, True, (255, 255, 0), (0, 0, 0))
+            rect = screen.blit(text, (screen.get_width() - text.get_width() - 4, y))
+            drawn = rect if drawn is None else drawn.union(rect)
+            y += text.get_height()
+
+        return drawn
+
+
+def _percentile(ordered, pct):
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
 class StateManager:
-    def __init__(self, initial_state):
-        self.current_state = initial_state
+    """
+    Owns the active state stack and a registry of named states.
+
+    Registered states are built lazily on first use and then cached, so
+    switching back to a state resumes the same instance instead of
+    rebuilding it. Lifecycle hooks:
+        enter(**kwargs)  - state becomes active via change_state/push_state
+        exit()           - state is replaced or popped
+        pause()/resume() - another state is pushed on top / popped off
+    """
+
+    def __init__(self, initial_state=None, profiler=None):
+        self._factories = {}
+        self._instances = {}
+        self.stack = []
+
+        # None keeps the hot path to a single attribute check
+        self.profiler = profiler
+
+        if initial_state is not None:
+            self.change_state(initial_state)
+
+    @property
+    def current_state(self):
+        return self.stack[-1] if self.stack else None
+
+    # ==========================================================
+    # REGISTRY
+    # ==========================================================
+
+    def register(self, name, factory):
+        """
+        :param name: State name used by change_state/push_state
+        :param factory: Zero-argument callable that builds the state
+        """
+        self._factories[name] = factory
+        self._instances.pop(name, None)
+
+    def get_state(self, name):
+        state = self._instances.get(name)
+        if state is None:
+            state = self._factories[name]()
+            self._instances[name] = state
+        return state
+
+    def discard_state(self, name):
+        """Drops a cached instance so the next use rebuilds it."""
+        state = self._instances.get(name)
+        if state is not None and state not in self.stack:
+            del self._instances[name]
+
+    def _resolve(self, state):
+        if isinstance(state, str):
+            return self.get_state(state)
+        return state
+
+    # ==========================================================
+    # TRANSITIONS
+    # ==========================================================
+
+    def change_state(self, new_state, **kwargs):
+        """
+        Replaces the active state. If the target is already further down
+        the stack (e.g. a battle returning to the overworld beneath it),
+        the stack unwinds to it instead.
+        """
+        new_state = self._resolve(new_state)
 
-    def change_state(self, new_state):
-        self.current_state = new_state
+        if new_state in self.stack:
+            while self.stack[-1] is not new_state:
+                self.stack.pop().exit()
+            new_state.resume()
+            new_state.mark_dirty()
+            return
+
+        if self.stack:
+            self.stack.pop().exit()
+
+        self.stack.append(new_state)
+        new_state.enter(**kwargs)
+        new_state.mark_dirty()
+
+    def push_state(self, new_state, **kwargs):
+        """Activates a state on top of the current one, keeping it alive."""
+        new_state = self._resolve(new_state)
+
+        if self.stack:
+            self.stack[-1].pause()
+
+        self.stack.append(new_state)
+        new_state.enter(**kwargs)
+        new_state.mark_dirty()
+
+    def pop_state(self):
+        if len(self.stack) < 2:
+            return
+
+        self.stack.pop().exit()
+        self.stack[-1].resume()
+        self.stack[-1].mark_dirty()
+
+    # ==========================================================
+    # FRAME
+    # ==========================================================
 
     def handle_events(self, events):
-        self.current_state.handle_events(events)
+        if self.profiler is None:
+            self.current_state.handle_events(events)
+            return
+
+        state = self.current_state
+        start = time.perf_counter()
+        state.handle_events(events)
+        self.profiler.record(type(state).__name__, "handle_events",
+                             time.perf_counter() - start)
 
     def update(self, dt):
-        self.current_state.update(dt)
+        if self.profiler is None:
+            self.current_state.update(dt)
+            return
+
+        state = self.current_state
+        start = time.perf_counter()
+        state.update(dt)
+        self.profiler.record(type(state).__name__, "update",
+                             time.perf_counter() - start)
 
     def render(self, screen):
-        self.current_state.render(screen)
+        if self.profiler is None:
+            self.current_state.render(screen)
+            return
+
+        state = self.current_state
+        name = type(state).__name__
+        start = time.perf_counter()
+        state.render(screen)
+        self.profiler.record(name, "render", time.perf_counter() - start)
+        self.profiler.end_frame(name)
+
+        if self.profiler.overlay:
+            overlay_rect = self.profiler.render_overlay(screen, name)
+            if overlay_rect:
+                state.mark_dirty(overlay_rect)
+
+    def consume_dirty_rects(self):
+        return self.current_state.consume_dirty_rects()
@@ -0,0 +1,138 @@
+"""
+CyberDex - Text Cache
+Shared font cache, rendered-text LRU and glyph atlas for UI text.
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """
+    Caches fonts by (name, size) and rendered text surfaces by
+    (name, size, text, color, antialias) with LRU eviction.
+
+    A font name of None uses pygame's default font; any other name is
+    looked up with pygame.font.SysFont.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+
+        self._fonts = {}
+        self._surfaces = OrderedDict()
+        self._atlases = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_font(self, name, size):
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            if name is None:
+                font = pygame.font.Font(None, size)
+            else:
+                font = pygame.font.SysFont(name, size)
+            self._fonts[key] = font
+        return font
+
+    def render(self, name, size, text, color, antialias=True):
+        key = (name, size, text, tuple(color), antialias)
+
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.get_font(name, size).render(text, antialias, color)
+        self._surfaces[key] = surface
+
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+
+        return surface
+
+    def get_atlas(self, name, size, color):
+        key = (name, size, tuple(color))
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = GlyphAtlas(self.get_font(name, size), color)
+            self._atlases[key] = atlas
+        return atlas
+
+    def clear(self):
+        self._surfaces.clear()
+        self._atlases.clear()
+
+
+class GlyphAtlas:
+    """
+    Pre-rasterizes printable ASCII into a single surface so rapidly
+    changing strings (e.g. a typed command buffer) are drawn as a row of
+    sub-surface blits instead of a fresh font render every frame.
+
+    Characters outside the atlas are rasterized once and kept.
+    """
+
+    FIRST_CHAR = 32
+    LAST_CHAR = 126
+
+    def __init__(self, font, color, antialias=True):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.height = font.get_linesize()
+
+        self._glyphs = {}
+        self._extra = {}
+        self.surface = self._build()
+
+    def _build(self):
+        chars = [chr(c) for c in range(self.FIRST_CHAR, self.LAST_CHAR + 1)]
+        rendered = [self.font.render(ch, self.antialias, self.color) for ch in chars]
+
+        width = sum(glyph.get_width() for glyph in rendered)
+        surface = pygame.Surface((max(1, width), self.height), pygame.SRCALPHA)
+
+        x = 0
+        for ch, glyph in zip(chars, rendered):
+            surface.blit(glyph, (x, 0))
+            self._glyphs[ch] = pygame.Rect(x, 0, glyph.get_width(), glyph.get_height())
+            x += glyph.get_width()
+
+        return surface
+
+    def size(self, text):
+        width = 0
+        for ch in text:
+            rect = self._glyphs.get(ch)
+            width += rect.width if rect else self._extra_glyph(ch).get_width()
+        return width, self.height
+
+    def draw(self, screen, text, pos):
+        """Blits text at pos and returns the covered rect."""
+        x, y = pos
+        start_x = x
+
+        for ch in text:
+            rect = self._glyphs.get(ch)
+            if rect is not None:
+                screen.blit(self.surface, (x, y), rect)
+                x += rect.width
+            else:
+                glyph = self._extra_glyph(ch)
+                screen.blit(glyph, (x, y))
+                x += glyph.get_width()
+
+        return pygame.Rect(start_x, y, x - start_x, self.height)
+
+    def _extra_glyph(self, ch):
+        glyph = self._extra.get(ch)
+        if glyph is None:
+            glyph = self.font.render(ch, self.antialias, self.color)
+            self._extra[ch] = glyph
+        return glyph
@@ -0,0 +1,174 @@
+"""
+CyberDex - Virus Crowd
+Struct-of-arrays engine for large numbers of roaming overworld viruses.
+
+Mirrors OverworldVirus behaviour (patrol between two points, flip the
+target when within 5px, clamp to the spawn zone) but steps every virus
+in one batched NumPy pass per frame. Requires numpy.
+"""
+
+import random
+
+import numpy as np
+import pygame
+
+
+class VirusCrowd:
+
+    def __init__(self, size=32, speed=100, capacity=256):
+        self.size = size
+        self.default_speed = speed
+        self.count = 0
+
+        self._allocate(capacity)
+        self._sprite = None
+
+    def __len__(self):
+        return self.count
+
+    def _allocate(self, capacity):
+        self.pos = np.zeros((capacity, 2))
+        self.point_a = np.zeros((capacity, 2))
+        self.point_b = np.zeros((capacity, 2))
+        self.toward_b = np.zeros(capacity, dtype=bool)
+        self.speed = np.zeros(capacity)
+        # Clamp bounds per virus: min_x, min_y, max_x, max_y
+        self.bounds = np.zeros((capacity, 4))
+
+    def _grow(self, needed):
+        capacity = len(self.speed)
+        if needed <= capacity:
+            return
+
+        old = (self.pos, self.point_a, self.point_b, self.toward_b, self.speed, self.bounds)
+        self._allocate(max(needed, capacity * 2))
+        for new, src in zip(
+            (self.pos, self.point_a, self.point_b, self.toward_b, self.speed, self.bounds),
+            old
+        ):
+            new[:self.count] = src[:self.count]
+
+    # ==========================================================
+    # SPAWNING
+    # ==========================================================
+
+    def add(self, pos, point_b, zone_rect, speed=None):
+        """Adds one virus starting at pos and patrolling towards point_b."""
+        self._grow(self.count + 1)
+        i = self.count
+
+        self.pos[i] = pos
+        self.point_a[i] = pos
+        self.point_b[i] = point_b
+        self.toward_b[i] = True
+        self.speed[i] = self.default_speed if speed is None else speed
+        self.bounds[i] = (zone_rect.left, zone_rect.top,
+                          zone_rect.right - self.size, zone_rect.bottom - self.size)
+
+        self.count += 1
+        return i
+
+    def spawn(self, zone_rect, count=1, rng=random):
+        """Spawns viruses at random points in the zone, like OverworldVirus."""
+        for _ in range(count):
+            pos = (
+                rng.randint(zone_rect.left, zone_rect.right - self.size),
+                rng.randint(zone_rect.top, zone_rect.bottom - self.size)
+            )
+            point_b = (
+                rng.randint(zone_rect.left, zone_rect.right - self.size),
+                rng.randint(zone_rect.top, zone_rect.bottom - self.size)
+            )
+            self.add(pos, point_b, zone_rect)
+
+    @classmethod
+    def from_viruses(cls, viruses):
+        """Builds a crowd with the current state of OverworldVirus objects."""
+        crowd = cls(capacity=max(1, len(viruses)))
+
+        for virus in viruses:
+            i = crowd.add(virus.point_a, virus.point_b, virus.zone, virus.speed)
+            crowd.pos[i] = virus.pos
+            crowd.toward_b[i] = virus.target == virus.point_b
+
+        return crowd
+
+    def remove(self, index):
+        """Swap-removes a virus; the last virus takes its index."""
+        last = self.count - 1
+        if index != last:
+            for column in (self.pos, self.point_a, self.point_b,
+                           self.toward_b, self.speed, self.bounds):
+                column[index] = column[last]
+        self.count -= 1
+
+    # ==========================================================
+    # UPDATE
+    # ==========================================================
+
+    def update(self, dt):
+        n = self.count
+        if n == 0:
+            return
+
+        pos = self.pos[:n]
+        toward_b = self.toward_b[:n]
+        target = np.where(toward_b[:, None], self.point_b[:n], self.point_a[:n])
+
+        direction = target - pos
+        length = np.sqrt(direction[:, 0] * direction[:, 0] + direction[:, 1] * direction[:, 1])
+        moving = length > 0
+        direction[moving] /= length[moving, None]
+
+        pos += direction * self.speed[:n, None] * dt
+
+        delta = target - pos
+        distance = np.sqrt(delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1])
+        np.logical_xor(toward_b, distance < 5, out=toward_b)
+
+        bounds = self.bounds[:n]
+        np.maximum(bounds[:, 0], np.minimum(pos[:, 0], bounds[:, 2]), out=pos[:, 0])
+        np.maximum(bounds[:, 1], np.minimum(pos[:, 1], bounds[:, 3]), out=pos[:, 1])
+
+    # ==========================================================
+    # QUERIES
+    # ==========================================================
+
+    def _int_rects(self):
+        # Same truncation pygame.Rect applies to float positions
+        return self.pos[:self.count].astype(np.int64)
+
+    def overlapping(self, rect):
+        """Returns indices of viruses whose rect collides with rect."""
+        xy = self._int_rects()
+        size = self.size
+        hits = (
+            (xy[:, 0] < rect.right) & (xy[:, 0] + size > rect.left) &
+            (xy[:, 1] < rect.bottom) & (xy[:, 1] + size > rect.top)
+        )
+        return np.flatnonzero(hits)
+
+    def get_rect(self, index):
+        x, y = self.pos[index]
+        return pygame.Rect(x, y, self.size, self.size)
+
+    # ==========================================================
+    # RENDER
+    # ==========================================================
+
+    def draw(self, screen, camera_rect, sprite=None):
+        """
+        :param sprite: (surface, area) to blit per virus, e.g. from the
+                       asset atlas; default is a sprite built here
+        """
+        if sprite is None and self._sprite is None:
+            self._sprite = pygame.Surface((self.size, self.size))
+            self._sprite.fill((150, 0, 150))
+            inner = pygame.Rect(0, 0, self.size, self.size).inflate(-8, -8)
+            pygame.draw.rect(self._sprite, (220, 50, 220), inner)
+
+        xy = self._int_rects()[self.overlapping(camera_rect)]
+        xy -= (camera_rect.x, camera_rect.y)
+
+        surface, area = sprite or (self._sprite, None)
+        screen.blits([(surface, (int(x), int(y)), area) for x, y in xy], doreturn=False)
@@ -1,3 +1,10 @@
+import os
+import sys
+
+# The shared systems/ package lives at the repository root, next to
+# this directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from engine.game import Game
 
 if __name__ == "__main__":
@@ -3,27 +3,51 @@ CyberDex - Battle State
 Turn-based battle system with command bonuses.
 """
 
-import pygame
+import os
 import random
+
+import pygame
 from config import *
 from engine.base_state import BaseState
-from engine.animation import FloatingText, ScreenShake
-from systems.battle_system import BattleSystem
+from engine.effects import EffectSystem
+from systems.battle_ai import BattleAI
+from systems.battle_replay import BattleRecorder
+from systems.battle_simulator import resolve_attack
 from systems.capture_system import CaptureSystem
 from systems.command_bonus_system import CommandBonusSystem
+from systems.command_completer import CommandCompleter
 from systems.save_system import SaveSystem
+from systems.turn_scheduler import TurnScheduler, PLAYER_SIDE, ENEMY_SIDE
 from data.ability import get_ability
+from data.virus_store import VirusStore
 
 
 class BattleState(BaseState):
     """Turn-based battle state."""
 
-    def __init__(self):
-        super().__init__()
+    supports_dirty_rects = True
+
+    # Set to a directory to write a replay log for every battle
+    replay_directory = None
+
+    def __init__(self, game):
+        super().__init__(game)
 
-        self.battle_system = BattleSystem()
         self.capture_system = CaptureSystem()
         self.command_system = CommandBonusSystem()
+        self.command_completer = CommandCompleter(self.command_system)
+
+        # Searches a few ms per frame until it has picked the enemy's move
+        self.enemy_ai = BattleAI()
+
+        # Speed-based turn order, rebuilt every battle
+        self.turn_scheduler = None
+
+        # Every roll in a battle comes from this seeded source so the
+        # recorder can reproduce it
+        self.seed = 0
+        self.rng = random.Random()
+        self.recorder = None
 
         # Battle data
         self.player_virus = None
@@ -32,6 +56,10 @@ class BattleState(BaseState):
         self.virus_entity = None
         self.is_random_encounter = False
 
+        # False when enter() bailed back to the overworld (no team, no
+        # enemy or no healthy virus)
+        self.started = False
+
         # State
         self.phase = "intro"
         self.selected_action = 0
@@ -47,18 +75,35 @@ class BattleState(BaseState):
         self.player_display_hp = 0
         self.enemy_display_hp = 0
 
-        # Effects
-        self.floating_texts = []
-        self.screen_shake = None
+        # Effects (pooled; cleared, not reallocated, between battles)
+        self.effects = EffectSystem()
 
         # Log
         self.battle_messages = []
+        self.message_serial = 0
+
+        # Last rendered view, used to skip redrawing a static screen
+        self._last_view = None
+        self._was_animating = False
+
+        # Events captured in handle_events for the phase handlers
+        self.pending_events = []
 
     # ==========================================================
     # ENTER / EXIT
     # ==========================================================
 
     def enter(self, **kwargs):
+        # The instance is reused across battles; reset per-battle data
+        self.started = False
+        self.player_virus = None
+        self.command_input = ""
+        self.selected_action = 0
+        self.selected_ability = 0
+        self.effects.clear()
+        self.battle_messages.clear()
+        self.enemy_ai.finish()
+
         self.enemy_virus = kwargs.get("enemy_virus")
         self.zone_id = kwargs.get("zone_id")
         self.virus_entity = kwargs.get("virus_entity")
@@ -81,6 +126,20 @@ class BattleState(BaseState):
             self.state_manager.change_state("overworld")
             return
 
+        self.seed = random.getrandbits(64)
+        self.rng.seed(self.seed)
+        self.recorder = BattleRecorder(
+            self.seed,
+            self.player_virus,
+            self.enemy_virus,
+            self.player_virus.abilities,
+            self.enemy_virus.abilities,
+        )
+
+        self.turn_scheduler = TurnScheduler()
+        self.turn_scheduler.add(self.player_virus, PLAYER_SIDE)
+        self.turn_scheduler.add(self.enemy_virus, ENEMY_SIDE)
+
         self.player_display_hp = self.player_virus.current_hp
         self.enemy_display_hp = self.enemy_virus.current_hp
 
@@ -89,13 +148,31 @@ class BattleState(BaseState):
         self.phase = "intro"
 
         self._generate_background()
-        self._add_message(f"Wild {self.enemy_virus.species.name} appeared!")
+        self._add_message(f"Wild {self.enemy_virus.name} appeared!")
+        self.started = True
+
+    def exit(self):
+        self.pending_events = []
+        self._finish_recording("fled")
+
+    def warm(self):
+        """
+        Builds the shared resources enter() and the first frames use, so
+        the overworld can prepare them before an encounter fires.
+        """
+        self._generate_background()
+        self.game.text_cache.get_atlas(None, 28, COLOR_WHITE)
 
     # ==========================================================
     # UPDATE
     # ==========================================================
 
-    def update(self, dt, events):
+    def handle_events(self, events):
+        self.pending_events = events
+
+    def update(self, dt, events=None):
+        if events is None:
+            events = self.pending_events
 
         # Transition phase
         if self.transition_timer > 0:
@@ -105,7 +182,7 @@ class BattleState(BaseState):
         if self.flash_timer > 0:
             self.flash_timer -= dt
             if self.flash_timer <= 0:
-                self.phase = "select_action"
+                self._advance_turn()
             return
 
         self._update_hp_animation(dt)
@@ -145,6 +222,9 @@ class BattleState(BaseState):
 
     def _select_action(self):
         if self.selected_action == 0:
+            if not self.player_virus.abilities:
+                self._add_message(f"{self.player_virus.name} has no abilities!")
+                return
             self.phase = "select_ability"
             self.selected_ability = 0
 
@@ -156,6 +236,7 @@ class BattleState(BaseState):
 
         elif self.selected_action == 3:
             if self.is_random_encounter:
+                self._finish_recording("fled")
                 self.state_manager.change_state("overworld")
             else:
                 self._add_message("Cannot run from contact battle!")
@@ -165,7 +246,7 @@ class BattleState(BaseState):
     # ==========================================================
 
     def _handle_ability_selection(self, events):
-        abilities = self.player_virus.species.abilities
+        abilities = self.player_virus.abilities
 
         for event in events:
             if event.type == pygame.KEYDOWN:
@@ -179,6 +260,7 @@ class BattleState(BaseState):
                 elif event.key in (pygame.K_RETURN, pygame.K_SPACE):
                     self.phase = "command_input"
                     self.command_input = ""
+                    self.command_completer.set_ability(abilities[self.selected_ability])
 
                 elif event.key == pygame.K_ESCAPE:
                     self.phase = "select_action"
@@ -200,9 +282,16 @@ class BattleState(BaseState):
 
                 elif event.key == pygame.K_BACKSPACE:
                     self.command_input = self.command_input[:-1]
+                    self.command_completer.pop()
+
+                elif event.key == pygame.K_TAB:
+                    for ch in self.command_completer.completion():
+                        self.command_input += ch
+                        self.command_completer.push(ch)
 
-                elif event.unicode.isprintable():
+                elif event.unicode and event.unicode.isprintable():
                     self.command_input += event.unicode
+                    self.command_completer.push(event.unicode)
 
     # ==========================================================
     # PLAYER TURN
@@ -210,7 +299,7 @@ class BattleState(BaseState):
 
     def _execute_player_turn(self):
 
-        ability_name = self.player_virus.species.abilities[self.selected_ability]
+        ability_name = self.player_virus.abilities[self.selected_ability]
         ability = get_ability(ability_name)
 
         if not ability:
@@ -223,30 +312,31 @@ class BattleState(BaseState):
                 self.command_input, ability.name
             )
 
-        is_critical = self.battle_system.check_critical_hit()
+        self.recorder.player_turn(self.selected_ability, self.command_input)
 
-        damage = self.battle_system.calculate_damage(
+        damage, is_critical, _ = resolve_attack(
             self.player_virus,
             self.enemy_virus,
             ability,
-            is_critical,
+            self.rng,
+            command_bonus,
         )
 
-        self.enemy_virus.take_damage(damage)
+        self._spawn_hit_effects(damage, is_critical, on_enemy=True)
 
         self._add_message(
-            f"{self.player_virus.get_display_name()} used {ability.name}!"
+            f"{self.player_virus.name} used {ability.name}!"
         )
 
         if is_critical:
-            self.screen_shake = ScreenShake()
             self._add_message("Critical hit!")
 
         if self.enemy_virus.is_fainted():
             self.phase = "victory"
+            self._finish_recording("victory")
             return
 
-        self.phase = "enemy_turn"
+        self._advance_turn()
 
     # ==========================================================
     # ENEMY TURN
@@ -254,43 +344,95 @@ class BattleState(BaseState):
 
     def _execute_enemy_turn(self):
 
-        ability_name = random.choice(self.enemy_virus.species.abilities)
-        ability = get_ability(ability_name)
+        # The AI thinks across frames; the turn resolves once it decides
+        if not self.enemy_ai.thinking:
+            self.enemy_ai.start(
+                self.enemy_virus,
+                self.player_virus,
+                self.enemy_virus.abilities,
+                self.player_virus.abilities,
+            )
+        if not self.enemy_ai.step():
+            return
+
+        ability_name = self.enemy_ai.finish()
+        ability = get_ability(ability_name) if ability_name else None
 
         if not ability:
-            self.phase = "select_action"
+            self._advance_turn()
             return
 
-        damage = self.battle_system.calculate_damage(
+        self.recorder.enemy_turn(ability_name)
+
+        damage, is_critical, _ = resolve_attack(
             self.enemy_virus,
             self.player_virus,
             ability,
-            False,
+            self.rng,
         )
 
-        self.player_virus.take_damage(damage)
+        self._spawn_hit_effects(damage, is_critical, on_enemy=False)
 
         self._add_message(
-            f"Enemy {self.enemy_virus.species.name} used {ability.name}!"
+            f"Enemy {self.enemy_virus.name} used {ability.name}!"
         )
 
         if self.player_virus.is_fainted():
             self.phase = "defeat"
+            self._finish_recording("defeat")
             return
 
-        self.phase = "select_action"
+        self._advance_turn()
+
+    # ==========================================================
+    # TURN ORDER
+    # ==========================================================
+
+    def _advance_turn(self):
+        """Hands the turn to whichever side the scheduler says acts next."""
+        combatant = self.turn_scheduler.next_turn()
+
+        if combatant.side == ENEMY_SIDE:
+            self.phase = "enemy_turn"
+        else:
+            self.phase = "select_action"
 
     # ==========================================================
     # CAPTURE
     # ==========================================================
 
     def _attempt_capture(self):
-        if self.capture_system.attempt_capture(self.enemy_virus):
+        # Rolled on the battle's seeded source so replays reproduce it
+        captured = self.capture_system.attempt_capture(self.enemy_virus, self.rng)
+        self.recorder.capture(captured)
+
+        if captured:
+            # Captures go to the storage box, not straight onto the team
+            game_data = self.get_game_data()
+            game_data.setdefault("virus_storage", VirusStore()).append(self.enemy_virus)
+
             self._add_message("Capture successful!")
             self.phase = "victory"
+            self._finish_recording("captured")
         else:
             self._add_message("Capture failed!")
-            self.phase = "enemy_turn"
+            self._advance_turn()
+
+    # ==========================================================
+    # REPLAY
+    # ==========================================================
+
+    def _finish_recording(self, outcome):
+        """Closes the replay log once; later calls (e.g. exit) are no-ops."""
+        recorder = self.recorder
+        if recorder is None or recorder.finished:
+            return
+
+        recorder.finish(outcome, self.player_virus.current_hp, self.enemy_virus.current_hp)
+
+        if self.replay_directory:
+            os.makedirs(self.replay_directory, exist_ok=True)
+            recorder.save(os.path.join(self.replay_directory, f"battle_{self.seed:016x}.cdxr"))
 
     # ==========================================================
     # VICTORY / DEFEAT
@@ -336,16 +478,24 @@ class BattleState(BaseState):
             )
 
     def _update_effects(self, dt):
-        for ft in self.floating_texts:
-            ft.update(dt)
-        self.floating_texts = [ft for ft in self.floating_texts if ft.alive]
+        self.effects.update(dt)
 
-        if self.screen_shake:
-            self.screen_shake.update(dt)
-            if not self.screen_shake.is_active():
-                self.screen_shake = None
+    def _spawn_hit_effects(self, damage, is_critical, on_enemy):
+        if on_enemy:
+            x, y = SCREEN_WIDTH * 0.7, SCREEN_HEIGHT * 0.3
+        else:
+            x, y = SCREEN_WIDTH * 0.3, SCREEN_HEIGHT * 0.6
+
+        color = (255, 220, 80) if is_critical else COLOR_WHITE
+        text = self.game.text_cache.render(None, 36, str(damage), color)
+        self.effects.spawn_text(text, x - text.get_width() / 2, y)
+        self.effects.burst(x, y, 40 if is_critical else 12, color)
+
+        if is_critical:
+            self.effects.start_shake()
 
     def _add_message(self, message):
+        self.message_serial += 1
         self.battle_messages.append(message)
         if len(self.battle_messages) > 5:
             self.battle_messages.pop(0)
@@ -355,20 +505,71 @@ class BattleState(BaseState):
     # ==========================================================
 
     def render(self, screen):
-        screen.blit(self.background, (0, 0))
+        view = (
+            self.phase,
+            self.command_input,
+            self.message_serial,
+            self.selected_action,
+            self.selected_ability,
+            int(self.player_display_hp),
+            int(self.enemy_display_hp),
+        )
+        animating = (
+            self.effects.active
+            or self.transition_timer > 0
+            or self.flash_timer > 0
+        )
 
-        for ft in self.floating_texts:
-            ft.render(screen)
+        # One more frame after an animation ends, to clear its last image
+        was_animating = self._was_animating
+        self._was_animating = animating
+
+        # Waiting on input with nothing moving: keep the last frame
+        if (not animating and not was_animating
+                and view == self._last_view and not self.needs_redraw()):
+            return
+
+        self._last_view = view
+        self.mark_dirty()
+
+        shake = self.effects.shake
+        if shake.is_active():
+            # Cover the edges the shaken background leaves bare
+            screen.fill((0, 0, 0))
+        screen.blit(self.background, (shake.offset_x, shake.offset_y))
+
+        self.effects.draw(screen)
 
         self._render_log(screen)
 
+        if self.phase == "command_input":
+            self._render_command_input(screen)
+
     def _generate_background(self):
-        self.background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.background.fill((20, 10, 40))
+        # Built once and shared by every battle
+        self.background = self.game.assets.generated(
+            "battle_background", (SCREEN_WIDTH, SCREEN_HEIGHT), self._draw_background
+        )
+
+    def _draw_background(self, surface):
+        surface.fill((20, 10, 40))
 
     def _render_log(self, screen):
+        text_cache = self.game.text_cache
         y = 20
         for msg in self.battle_messages[-3:]:
-            text = pygame.font.Font(None, 28).render(msg, True, COLOR_WHITE)
+            text = text_cache.render(None, 28, msg, COLOR_WHITE)
             screen.blit(text, (20, y))
             y += 30
+
+    def _render_command_input(self, screen):
+        # Typed text changes every keystroke: draw it from the glyph atlas
+        atlas = self.game.text_cache.get_atlas(None, 28, COLOR_WHITE)
+        atlas.draw(screen, "> " + self.command_input, (20, SCREEN_HEIGHT - 50))
+
+        completer = self.command_completer
+        hint_color = COLOR_WHITE if completer.is_valid() else (140, 140, 160)
+        hint = "  ".join(completer.suggestions())
+        if hint:
+            text = self.game.text_cache.render(None, 24, hint, hint_color)
+            screen.blit(text, (20, SCREEN_HEIGHT - 80))
@@ -2,22 +2,27 @@ import pygame
 from engine.base_state import BaseState
 
 class MenuState(BaseState):
+    supports_dirty_rects = True
+
     def __init__(self, game):
         super().__init__(game)
-        self.font = pygame.font.SysFont("arial", 50)
+        self.title = self.game.text_cache.render(
+            "arial", 50, "Press ENTER to Start", (0, 255, 255)
+        )
 
     def handle_events(self, events):
         for event in events:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
-                    # Import here to avoid circular import
-                    from states.overworld_state import OverworldState
-                    self.game.state_manager.change_state(OverworldState(self.game))
+                    self.game.state_manager.change_state("overworld")
 
     def update(self, dt):
         pass
 
     def render(self, screen):
+        # Static screen: only drawn after a transition or expose
+        if not self.needs_redraw():
+            return
+
         screen.fill((15, 15, 25))
-        text = self.font.render("Press ENTER to Start", True, (0, 255, 255))
-        screen.blit(text, (400, 350))
+        screen.blit(self.title, (400, 350))
@@ -1,6 +1,9 @@
 import pygame
 import random
 from engine.base_state import BaseState
+from engine.spatial_hash import SpatialHash
+from engine.chunk_cache import ChunkCache
+from data.encounters import roll_wild_virus
 
 
 class OverworldVirus:
@@ -36,21 +39,34 @@ class OverworldVirus:
         self.pos.x = max(self.zone.left, min(self.pos.x, self.zone.right - self.size))
         self.pos.y = max(self.zone.top, min(self.pos.y, self.zone.bottom - self.size))
 
-    def draw(self, screen, camera):
-        rect = pygame.Rect(
-            self.pos.x - camera.x,
-            self.pos.y - camera.y,
-            self.size,
-            self.size
-        )
-        pygame.draw.rect(screen, (150, 0, 150), rect)
-        pygame.draw.rect(screen, (220, 50, 220), rect.inflate(-8, -8))
+    def draw(self, screen, camera, sprite):
+        """:param sprite: (surface, area) from AssetManager.sprite"""
+        surface, area = sprite
+        screen.blit(surface, (self.pos.x - camera.x, self.pos.y - camera.y), area)
 
     def get_rect(self):
         return pygame.Rect(self.pos.x, self.pos.y, self.size, self.size)
 
 
+def draw_virus_sprite(surface):
+    surface.fill((150, 0, 150))
+    pygame.draw.rect(surface, (220, 50, 220), surface.get_rect().inflate(-8, -8))
+
+
+def draw_player_sprite(surface):
+    surface.fill((0, 0, 255))
+
+
 class OverworldState(BaseState):
+    # Roaming viruses run on the batched NumPy engine instead of one
+    # OverworldVirus object each (needed for very large crowds)
+    use_virus_crowd = False
+    viruses_per_zone = 1
+
+    # Fraction of encounter_threshold walked in a zone before the next
+    # random encounter starts being prepared
+    prepare_encounter_at = 0.5
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -66,6 +82,16 @@ class OverworldState(BaseState):
 
         self.camera = pygame.Vector2(0, 0)
 
+        # Broadphase indexes: static scenery and roaming viruses
+        self.scenery_index = SpatialHash(cell_size=128)
+        self.zone_index = SpatialHash(cell_size=256)
+        self.virus_index = SpatialHash(cell_size=128)
+
+        # Terrain, trees and zones are pre-rendered per chunk
+        self.static_layer = ChunkCache(
+            self.world_width, self.world_height, self.draw_static_chunk
+        )
+
         self.walls = []
         self.trees = []
         self.create_scenery()
@@ -74,31 +100,63 @@ class OverworldState(BaseState):
         self.create_infected_zones()
 
         self.viruses = []
+        self.virus_crowd = None
         self.spawn_viruses()
 
         self.steps_in_zone = 0
         self.encounter_threshold = 200
         self.encounter_cooldown = 0
 
+        # Next random encounter, built a piece per frame before it fires
+        self.encounter_rng = random.Random()
+        self.prepared_enemy = None
+        self._preparation = None
+
     def create_scenery(self):
         for _ in range(20):
-            self.trees.append(
+            self.add_tree(
                 pygame.Rect(random.randint(0, 2800), random.randint(0, 1800), 64, 64)
             )
 
     def create_infected_zones(self):
-        self.infected_zones.append(pygame.Rect(800, 300, 400, 400))
-        self.infected_zones.append(pygame.Rect(1800, 1200, 500, 300))
+        self.add_infected_zone(pygame.Rect(800, 300, 400, 400))
+        self.add_infected_zone(pygame.Rect(1800, 1200, 500, 300))
+
+    def add_tree(self, rect):
+        self.trees.append(rect)
+        self.scenery_index.insert(rect)
+        self.static_layer.invalidate(rect)
+
+    def remove_tree(self, rect):
+        # The index is keyed by identity; an equal Rect must resolve to
+        # the stored object or the tree would stay indexed
+        stored = self.trees.pop(self.trees.index(rect))
+        self.scenery_index.remove(stored)
+        self.static_layer.invalidate(stored)
+
+    def add_infected_zone(self, rect):
+        self.infected_zones.append(rect)
+        self.zone_index.insert(rect)
+        self.static_layer.invalidate(rect)
 
     def spawn_viruses(self):
+        if self.use_virus_crowd:
+            from engine.virus_crowd import VirusCrowd
+            self.virus_crowd = VirusCrowd()
+            for zone in self.infected_zones:
+                self.virus_crowd.spawn(zone, self.viruses_per_zone)
+            return
+
         for zone in self.infected_zones:
-            self.viruses.append(OverworldVirus(zone, self.walls))
+            for _ in range(self.viruses_per_zone):
+                virus = OverworldVirus(zone, self.walls)
+                self.viruses.append(virus)
+                self.virus_index.insert(virus, virus.get_rect())
 
     def handle_events(self, events):
         for event in events:
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                from states.menu_state import MenuState
-                self.game.state_manager.change_state(MenuState(self.game))
+                self.game.state_manager.change_state("menu")
 
     def update(self, dt):
         keys = pygame.key.get_pressed()
@@ -121,33 +179,45 @@ class OverworldState(BaseState):
 
         player_rect = pygame.Rect(self.player_pos.x, self.player_pos.y, self.player_size, self.player_size)
 
-        for tree in self.trees:
-            if player_rect.colliderect(tree):
-                self.player_pos -= movement
+        for _ in self.scenery_index.query_rect(player_rect):
+            self.player_pos -= movement
 
         self.player_pos.x = max(0, min(self.player_pos.x, self.world_width - self.player_size))
         self.player_pos.y = max(0, min(self.player_pos.y, self.world_height - self.player_size))
 
         player_rect = pygame.Rect(self.player_pos.x, self.player_pos.y, self.player_size, self.player_size)
 
-        in_zone = any(player_rect.colliderect(zone) for zone in self.infected_zones)
+        in_zone = self.zone_index.any_rect(player_rect)
 
         if in_zone and movement.length() > 0:
             self.steps_in_zone += movement.length()
             if self.steps_in_zone >= self.encounter_threshold:
                 self.steps_in_zone = 0
-                from states.battle_state import BattleState
-                self.game.state_manager.change_state(BattleState(self.game))
+                self.start_encounter(is_random=True)
+                return
+            if self.steps_in_zone >= self.encounter_threshold * self.prepare_encounter_at:
+                self.prepare_encounter_step()
+
+        if self.virus_crowd is not None:
+            self.virus_crowd.update(dt)
+            hits = self.virus_crowd.overlapping(player_rect)
+            if len(hits):
+                index = int(hits[0])
+                # The roaming virus turns into the battle's enemy, but only
+                # once a battle really started (enter() can bail out)
+                if self.start_encounter():
+                    self.virus_crowd.remove(index)
                 return
 
         for virus in self.viruses:
             virus.update(dt)
+            self.virus_index.update(virus, virus.get_rect())
 
-        for virus in self.viruses:
-            if player_rect.colliderect(virus.get_rect()):
-                from states.battle_state import BattleState
-                self.game.state_manager.change_state(BattleState(self.game))
-                return
+        for virus in self.virus_index.query_rect(player_rect):
+            if self.start_encounter(virus_entity=virus):
+                self.viruses.remove(virus)
+                self.virus_index.remove(virus)
+            return
 
         self.camera.x = self.player_pos.x - self.screen_width // 2
         self.camera.y = self.player_pos.y - self.screen_height // 2
@@ -155,31 +225,91 @@ class OverworldState(BaseState):
         self.camera.x = max(0, min(self.camera.x, self.world_width - self.screen_width))
         self.camera.y = max(0, min(self.camera.y, self.world_height - self.screen_height))
 
+    # ==========================================================
+    # ENCOUNTERS
+    # ==========================================================
+
+    def _prepare_encounter(self):
+        """Rolls the enemy and builds the battle state, one step per frame."""
+        enemy = roll_wild_virus(self.encounter_rng)
+        yield
+
+        # First use imports and constructs BattleState and its systems
+        battle = self.game.state_manager.get_state("battle")
+        yield
+
+        battle.warm()
+        self.prepared_enemy = enemy
+
+    def prepare_encounter_step(self):
+        """Advances the preparation by one step; no-op once it is ready."""
+        if self.prepared_enemy is not None:
+            return
+        if self._preparation is None:
+            self._preparation = self._prepare_encounter()
+        next(self._preparation, None)
+
+    def take_prepared_enemy(self):
+        """The prepared enemy, finishing whatever preparation is left."""
+        if self.prepared_enemy is None:
+            if self._preparation is None:
+                self._preparation = self._prepare_encounter()
+            for _ in self._preparation:
+                pass
+
+        enemy = self.prepared_enemy
+        self.prepared_enemy = None
+        self._preparation = None
+        return enemy
+
+    def start_encounter(self, **kwargs):
+        """
+        Pushes the battle against the next rolled wild virus.
+
+        :return: True if the battle started; False when it bailed straight
+                 back (e.g. no healthy team), in which case the enemy is
+                 kept for the next encounter
+        """
+        battle = self.game.state_manager.get_state("battle")
+        enemy = self.take_prepared_enemy()
+        self.game.state_manager.push_state(battle, enemy_virus=enemy, **kwargs)
+
+        if not battle.started:
+            self.prepared_enemy = enemy
+        return battle.started
+
+    def get_camera_rect(self):
+        return pygame.Rect(self.camera.x, self.camera.y, self.screen_width, self.screen_height)
+
+    def draw_static_chunk(self, surface, world_rect):
+        surface.fill((20, 120, 60))
+
+        for tree in self.scenery_index.query_rect(world_rect):
+            pygame.draw.rect(surface, (0, 80, 0), tree.move(-world_rect.x, -world_rect.y))
+
+        for zone in self.zone_index.query_rect(world_rect):
+            pygame.draw.rect(surface, (100, 0, 100), zone.move(-world_rect.x, -world_rect.y))
+
     def render(self, screen):
-        screen.fill((20, 120, 60))
+        view = self.get_camera_rect()
+        assets = self.game.assets
 
-        for tree in self.trees:
-            pygame.draw.rect(
-                screen,
-                (0, 80, 0),
-                pygame.Rect(tree.x - self.camera.x, tree.y - self.camera.y, tree.width, tree.height)
-            )
+        self.static_layer.render(screen, view)
 
-        for zone in self.infected_zones:
-            pygame.draw.rect(
-                screen,
-                (100, 0, 100),
-                pygame.Rect(zone.x - self.camera.x, zone.y - self.camera.y, zone.width, zone.height)
-            )
+        # Sprites are painted once into the asset atlas
+        virus_sprite = assets.sprite("overworld_virus", (32, 32), draw_virus_sprite)
 
-        for virus in self.viruses:
-            virus.draw(screen, self.camera)
-
-        pygame.draw.rect(
-            screen,
-            (0, 0, 255),
-            pygame.Rect(self.player_pos.x - self.camera.x,
-                        self.player_pos.y - self.camera.y,
-                        self.player_size,
-                        self.player_size)
+        if self.virus_crowd is not None:
+            self.virus_crowd.draw(screen, view, virus_sprite)
+
+        for virus in self.virus_index.query_rect(view):
+            virus.draw(screen, self.camera, virus_sprite)
+
+        surface, area = assets.sprite(
+            "overworld_player", (self.player_size, self.player_size), draw_player_sprite
+        )
+        screen.blit(
+            surface,
+            (self.player_pos.x - self.camera.x, self.player_pos.y - self.camera.y),
+            area
         )
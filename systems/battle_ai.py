@@ -0,0 +1,315 @@
+"""
+CyberDex - Battle AI
+Expectimax enemy AI with a transposition table and a time budget.
+
+The enemy is the max player; the player is modeled as picking each of
+their abilities with equal odds. Every attack is a chance node over
+critical / normal hits and, for abilities with a status, whether the
+status lands. Damage for each outcome comes from Ability.calculate_damage
+with a scripted random source, so the AI never drifts from the real
+formula.
+
+The search is iterative deepening written as generators: step(budget)
+runs it for a slice of wall time and returns, so it can be spread over
+frames. best_ability is always the choice of the deepest completed
+iteration.
+"""
+
+import time
+
+from data.ability import get_ability
+
+ENEMY = 0
+PLAYER = 1
+
+# Terminal score; remaining depth is added so faster wins rank higher
+WIN_SCORE = 100.0
+
+# Score bonus for the other side carrying a status effect
+STATUS_SCORE = 0.05
+
+
+class _ScriptedRandom:
+    """Random source with fixed draws: mean variance, forced crit roll."""
+
+    def __init__(self, critical):
+        self._roll = 0.0 if critical else 1.0
+
+    def uniform(self, a, b):
+        return (a + b) / 2
+
+    def random(self):
+        return self._roll
+
+
+class _Combatant:
+    """Stats calculate_damage reads, with a fixed overclock flag."""
+    __slots__ = ("attack", "defense", "virus_type", "overclocked")
+
+    def __init__(self, virus, overclocked):
+        self.attack = virus.attack
+        self.defense = virus.defense
+        self.virus_type = virus.virus_type
+        self.overclocked = overclocked
+
+    def is_overclocked(self):
+        return self.overclocked
+
+
+def attack_outcomes(attacker, defender, ability, overclocked, command_bonus=None):
+    """
+    Chance outcomes of one attack.
+
+    :return: tuple of (probability, damage, status or None)
+    """
+    attacker = _Combatant(attacker, overclocked)
+    defender = _Combatant(defender, False)
+    bonus = command_bonus or {}
+
+    crit_chance = min(1.0, max(0.0, ability.crit_rate + bonus.get("crit_boost", 0)))
+    status_chance = 0.0
+    if ability.status_effect:
+        status_chance = min(1.0, max(0.0, ability.status_chance + bonus.get("status_boost", 0)))
+
+    outcomes = []
+    for critical, crit_prob in ((True, crit_chance), (False, 1.0 - crit_chance)):
+        if crit_prob <= 0.0:
+            continue
+
+        damage, _ = ability.calculate_damage(
+            attacker, defender, command_bonus, rng=_ScriptedRandom(critical)
+        )
+
+        for status, status_prob in ((ability.status_effect, status_chance),
+                                    (None, 1.0 - status_chance)):
+            if status_prob > 0.0:
+                outcomes.append((crit_prob * status_prob, damage, status))
+
+    return tuple(outcomes)
+
+
+class BattleAI:
+
+    def __init__(self, max_depth=6, frame_budget=0.004, time_limit=0.3,
+                 check_interval=64, max_table_entries=200000):
+        """
+        :param max_depth: Deepest iteration, in plies (one attack each)
+        :param frame_budget: Seconds step() searches when not given a budget
+        :param time_limit: Total seconds of search per decision
+        :param check_interval: Nodes searched between clock checks
+        :param max_table_entries: Transposition table is cleared past this
+        """
+        self.max_depth = max_depth
+        self.frame_budget = frame_budget
+        self.time_limit = time_limit
+        self.check_interval = check_interval
+        self.max_table_entries = max_table_entries
+
+        self.table = {}
+        self._signature = None
+
+        self.thinking = False
+        self.best_ability = None
+        self.scores = {}
+        self.depth_reached = 0
+        self.nodes = 0
+        self.elapsed = 0.0
+
+        self._search = None
+
+    # ==========================================================
+    # SETUP
+    # ==========================================================
+
+    def start(self, enemy, player, enemy_abilities, player_abilities):
+        """
+        Begins choosing the enemy's move for the current position.
+
+        :param enemy_abilities: Ability names the enemy can use
+        :param player_abilities: Ability names the player can use
+        """
+        enemy_names = [name for name in enemy_abilities if get_ability(name)]
+        player_names = [name for name in player_abilities if get_ability(name)]
+
+        # Cached positions stay valid while the combatants are the same
+        signature = (
+            enemy.attack, enemy.defense, enemy.virus_type, enemy.max_hp, tuple(enemy_names),
+            player.attack, player.defense, player.virus_type, player.max_hp, tuple(player_names),
+        )
+        if signature != self._signature:
+            self._signature = signature
+            self.table.clear()
+            self._build_moves(enemy, player, enemy_names, player_names)
+
+        self.max_hp = (enemy.max_hp, player.max_hp)
+        self.max_corruption = (enemy.max_corruption, player.max_corruption)
+        self.root = (
+            enemy.current_hp, player.current_hp,
+            int(enemy.corruption), int(player.corruption),
+            enemy.status, player.status,
+        )
+
+        self.best_ability = enemy_names[0] if enemy_names else None
+        self.scores = {}
+        self.depth_reached = 0
+        self.nodes = 0
+        self.elapsed = 0.0
+        self.thinking = True
+
+        # Nothing to decide; skip the search
+        if len(enemy_names) < 2:
+            self._search = None
+        else:
+            self._search = self._iterative_deepening()
+
+    def _build_moves(self, enemy, player, enemy_names, player_names):
+        """moves[side][overclocked] -> [(ability name, outcomes)]"""
+        self.moves = []
+        for attacker, defender, names in ((enemy, player, enemy_names),
+                                          (player, enemy, player_names)):
+            self.moves.append([
+                [(name, attack_outcomes(attacker, defender, get_ability(name), overclocked))
+                 for name in names]
+                for overclocked in (False, True)
+            ])
+
+    # ==========================================================
+    # TIME SLICING
+    # ==========================================================
+
+    def step(self, budget=None):
+        """
+        Searches for up to budget seconds (default frame_budget).
+
+        :return: True when the decision is final (search complete or
+                 time_limit used up)
+        """
+        if not self.thinking:
+            return True
+        if self._search is None:
+            return True
+
+        if budget is None:
+            budget = self.frame_budget
+        budget = min(budget, self.time_limit - self.elapsed)
+
+        started = time.perf_counter()
+        deadline = started + budget
+        search = self._search
+        finished = False
+
+        try:
+            while time.perf_counter() < deadline:
+                next(search)
+        except StopIteration:
+            finished = True
+
+        self.elapsed += time.perf_counter() - started
+        return finished or self.elapsed >= self.time_limit
+
+    def finish(self):
+        """Ends the search and returns the chosen ability name."""
+        self.thinking = False
+        self._search = None
+
+        if len(self.table) > self.max_table_entries:
+            self.table.clear()
+
+        return self.best_ability
+
+    def think(self, enemy, player, enemy_abilities, player_abilities, budget=None):
+        """Blocking search: start, run for up to budget (default time_limit), finish."""
+        self.start(enemy, player, enemy_abilities, player_abilities)
+        self.step(self.time_limit if budget is None else budget)
+        return self.finish()
+
+    # ==========================================================
+    # SEARCH
+    # ==========================================================
+
+    def _iterative_deepening(self):
+        for depth in range(1, self.max_depth + 1):
+            scores = {}
+            overclocked = self.root[2] >= self.max_corruption[ENEMY]
+
+            for name, outcomes in self.moves[ENEMY][overclocked]:
+                scores[name] = yield from self._expected(self.root, ENEMY, outcomes, depth)
+
+            # Only a completed iteration replaces the previous answer
+            self.scores = scores
+            self.best_ability = max(scores, key=scores.get)
+            self.depth_reached = depth
+
+    def _expected(self, state, side, outcomes, depth):
+        value = 0.0
+        for probability, damage, status in outcomes:
+            child = self._apply(state, side, damage, status)
+            value += probability * (yield from self._value(child, 1 - side, depth - 1))
+        return value
+
+    def _value(self, state, side, depth):
+        self.nodes += 1
+        if self.nodes % self.check_interval == 0:
+            yield
+
+        enemy_hp, player_hp = state[0], state[1]
+        if player_hp <= 0:
+            return WIN_SCORE + depth
+        if enemy_hp <= 0:
+            return -WIN_SCORE - depth
+        if depth == 0:
+            return self._evaluate(state)
+
+        key = (side, depth) + state
+        cached = self.table.get(key)
+        if cached is not None:
+            return cached
+
+        overclocked = state[2 + side] >= self.max_corruption[side]
+        moves = self.moves[side][overclocked]
+
+        if side == ENEMY:
+            value = None
+            for _, outcomes in moves:
+                score = yield from self._expected(state, side, outcomes, depth)
+                if value is None or score > value:
+                    value = score
+        elif moves:
+            # The player is modeled as choosing uniformly
+            value = 0.0
+            for _, outcomes in moves:
+                value += (yield from self._expected(state, side, outcomes, depth))
+            value /= len(moves)
+        else:
+            value = None
+
+        if value is None:
+            value = self._evaluate(state)
+
+        self.table[key] = value
+        return value
+
+    def _apply(self, state, side, damage, status):
+        """State after side attacks for damage (mirrors Virus.take_damage)."""
+        values = list(state)
+        target = 1 - side
+
+        values[target] = max(0, values[target] - damage)
+        values[2 + target] = min(self.max_corruption[target],
+                                 values[2 + target] + int(damage * 0.3))
+        if status:
+            values[4 + target] = status
+
+        return tuple(values)
+
+    def _evaluate(self, state):
+        """Enemy's view: HP fraction lead plus a little for inflicted status."""
+        enemy_hp, player_hp, _, _, enemy_status, player_status = state
+        score = enemy_hp / self.max_hp[ENEMY] - player_hp / self.max_hp[PLAYER]
+
+        if player_status:
+            score += STATUS_SCORE
+        if enemy_status:
+            score -= STATUS_SCORE
+
+        return score
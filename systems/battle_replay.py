@@ -0,0 +1,346 @@
+"""
+CyberDex - Battle Replay
+Compact binary battle logs and a headless replayer.
+
+A log holds the RNG seed, both combatants as they entered the battle,
+and every decision in order: ability picks (with the typed command for
+the player), capture attempts and the end of the battle with final HP.
+All randomness in a battle (attacks through resolve_attack, capture
+rolls through CaptureSystem) comes from random.Random(seed), so
+replaying the decisions reproduces every roll.
+
+Layout (little endian):
+    header   magic "CDXR", version u16, seed u64, combatants length u32,
+             combatants JSON
+    events   tag u8 + payload:
+        1 player turn   ability index u8, command length u16, command utf-8
+        2 enemy turn    ability index u8
+        3 capture       success u8
+        0 end           outcome u8, player hp i32, enemy hp i32
+"""
+
+import json
+import random
+import struct
+
+from data.ability import get_ability
+from data.virus import Virus
+from systems.battle_simulator import resolve_attack
+from systems.capture_system import CaptureSystem
+from systems.command_bonus_system import CommandBonusSystem
+
+MAGIC = b"CDXR"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHQI")
+TAG = struct.Struct("<B")
+PLAYER_TURN = struct.Struct("<BH")
+ENEMY_TURN = struct.Struct("<B")
+CAPTURE = struct.Struct("<B")
+END = struct.Struct("<Bii")
+
+EVENT_END = 0
+EVENT_PLAYER_TURN = 1
+EVENT_ENEMY_TURN = 2
+EVENT_CAPTURE = 3
+
+OUTCOMES = ("unfinished", "victory", "defeat", "captured", "fled")
+
+
+def combatant_record(virus, abilities):
+    """Everything needed to rebuild a combatant at the start of a battle."""
+    return {
+        "name": virus.name,
+        "virus_type": virus.virus_type,
+        "tier": virus.tier,
+        "level": virus.level,
+        "base_max_hp": virus.base_max_hp,
+        "base_attack": virus.base_attack,
+        "base_defense": virus.base_defense,
+        "base_speed": virus.base_speed,
+        "current_hp": virus.current_hp,
+        "corruption": virus.corruption,
+        "status": virus.status,
+        "abilities": list(abilities),
+    }
+
+
+def build_combatant(record):
+    virus = Virus(
+        record["name"], record["virus_type"], record["tier"],
+        level=record["level"],
+        max_hp=record["base_max_hp"],
+        attack=record["base_attack"],
+        defense=record["base_defense"],
+        speed=record["base_speed"],
+    )
+    virus.current_hp = record["current_hp"]
+    virus.corruption = record["corruption"]
+    virus.status = record["status"]
+    virus.abilities = list(record["abilities"])
+    return virus
+
+
+# ==========================================================
+# RECORDING
+# ==========================================================
+
+class BattleRecorder:
+
+    def __init__(self, seed, player, enemy, player_abilities, enemy_abilities):
+        self.seed = seed
+        self.player_abilities = list(player_abilities)
+        self.enemy_abilities = list(enemy_abilities)
+        self.combatants = {
+            "player": combatant_record(player, self.player_abilities),
+            "enemy": combatant_record(enemy, self.enemy_abilities),
+        }
+
+        self._events = []
+        self.finished = False
+
+    def player_turn(self, ability_index, command=""):
+        encoded = command.encode("utf-8")
+        self._events.append(TAG.pack(EVENT_PLAYER_TURN))
+        self._events.append(PLAYER_TURN.pack(ability_index, len(encoded)))
+        self._events.append(encoded)
+
+    def enemy_turn(self, ability_name):
+        self._events.append(TAG.pack(EVENT_ENEMY_TURN))
+        self._events.append(ENEMY_TURN.pack(self.enemy_abilities.index(ability_name)))
+
+    def capture(self, success):
+        self._events.append(TAG.pack(EVENT_CAPTURE))
+        self._events.append(CAPTURE.pack(bool(success)))
+
+    def finish(self, outcome, player_hp, enemy_hp):
+        if self.finished:
+            return
+        self.finished = True
+        self._events.append(TAG.pack(EVENT_END))
+        self._events.append(END.pack(OUTCOMES.index(outcome), player_hp, enemy_hp))
+
+    def to_bytes(self):
+        combatants = json.dumps(self.combatants, separators=(",", ":")).encode("utf-8")
+        return b"".join(
+            [HEADER.pack(MAGIC, VERSION, self.seed, len(combatants)), combatants]
+            + self._events
+        )
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+
+# ==========================================================
+# READING
+# ==========================================================
+
+class BattleLog:
+    """
+    Parsed replay log.
+
+    events: list of ("player", ability index, command) / ("enemy", ability
+    index) / ("capture", success); end: (outcome, player hp, enemy hp) or None.
+    """
+
+    def __init__(self, seed, combatants, events, end):
+        self.seed = seed
+        self.combatants = combatants
+        self.events = events
+        self.end = end
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, length = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a CyberDex battle replay")
+        if version > VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+
+        offset = HEADER.size
+        combatants = json.loads(data[offset:offset + length])
+        offset += length
+
+        events = []
+        end = None
+
+        while offset < len(data):
+            tag = data[offset]
+            offset += TAG.size
+
+            if tag == EVENT_PLAYER_TURN:
+                index, command_length = PLAYER_TURN.unpack_from(data, offset)
+                offset += PLAYER_TURN.size
+                command = data[offset:offset + command_length].decode("utf-8")
+                offset += command_length
+                events.append(("player", index, command))
+            elif tag == EVENT_ENEMY_TURN:
+                events.append(("enemy", ENEMY_TURN.unpack_from(data, offset)[0]))
+                offset += ENEMY_TURN.size
+            elif tag == EVENT_CAPTURE:
+                events.append(("capture", bool(CAPTURE.unpack_from(data, offset)[0])))
+                offset += CAPTURE.size
+            elif tag == EVENT_END:
+                outcome, player_hp, enemy_hp = END.unpack_from(data, offset)
+                offset += END.size
+                end = (OUTCOMES[outcome], player_hp, enemy_hp)
+            else:
+                raise ValueError(f"Unknown replay event {tag}")
+
+        return cls(seed, combatants, events, end)
+
+
+# ==========================================================
+# REPLAYING
+# ==========================================================
+
+class BattleReplayer:
+    """
+    Re-runs a BattleLog headlessly. State is snapshotted every
+    snapshot_every events so seek() only replays from the nearest one.
+    """
+
+    def __init__(self, log, snapshot_every=64, command_system=None, capture_system=None):
+        self.log = log
+        self.snapshot_every = snapshot_every
+        self.command_system = command_system or CommandBonusSystem()
+        self.capture_system = capture_system or CaptureSystem()
+
+        self.player = build_combatant(log.combatants["player"])
+        self.enemy = build_combatant(log.combatants["enemy"])
+        self.player_abilities = [get_ability(n) for n in log.combatants["player"]["abilities"]]
+        self.enemy_abilities = [get_ability(n) for n in log.combatants["enemy"]["abilities"]]
+
+        self.rng = random.Random(log.seed)
+        self.position = 0
+        self.captured = False
+
+        # position -> snapshot; position 0 is the initial state
+        self.snapshots = {0: self._snapshot()}
+
+    # ==========================================================
+    # STATE
+    # ==========================================================
+
+    def _snapshot(self):
+        return (
+            (self.player.current_hp, self.player.corruption, self.player.status),
+            (self.enemy.current_hp, self.enemy.corruption, self.enemy.status),
+            self.rng.getstate(),
+            self.captured,
+        )
+
+    def _restore(self, position):
+        player, enemy, rng_state, captured = self.snapshots[position]
+        self.player.current_hp, self.player.corruption, self.player.status = player
+        self.enemy.current_hp, self.enemy.corruption, self.enemy.status = enemy
+        self.rng.setstate(rng_state)
+        self.captured = captured
+        self.position = position
+
+    def state(self):
+        return {
+            "turn": self.position,
+            "player_hp": self.player.current_hp,
+            "enemy_hp": self.enemy.current_hp,
+            "player_status": self.player.status,
+            "enemy_status": self.enemy.status,
+            "captured": self.captured,
+        }
+
+    # ==========================================================
+    # PLAYBACK
+    # ==========================================================
+
+    def step(self):
+        """
+        Applies the next event.
+
+        :return: (damage, is_critical) for attacks, None otherwise; False
+                 at the end of the log
+        """
+        events = self.log.events
+        if self.position >= len(events):
+            return False
+
+        event = events[self.position]
+        result = None
+
+        if event[0] == "player":
+            ability = self.player_abilities[event[1]]
+            command_bonus = None
+            if event[2]:
+                command_bonus = self.command_system.parse_command(event[2], ability.name)
+            damage, is_critical, _ = resolve_attack(
+                self.player, self.enemy, ability, self.rng, command_bonus
+            )
+            result = (damage, is_critical)
+        elif event[0] == "enemy":
+            damage, is_critical, _ = resolve_attack(
+                self.enemy, self.player, self.enemy_abilities[event[1]], self.rng
+            )
+            result = (damage, is_critical)
+        else:
+            # Re-rolled to keep the RNG in step; the recorded result is
+            # what the battle actually saw
+            self.capture_system.attempt_capture(self.enemy, self.rng)
+            self.captured = self.captured or event[1]
+
+        self.position += 1
+        if self.position % self.snapshot_every == 0 and self.position not in self.snapshots:
+            self.snapshots[self.position] = self._snapshot()
+
+        return result
+
+    def seek(self, turn):
+        """Puts the replay in the state after the first turn events."""
+        turn = max(0, min(turn, len(self.log.events)))
+
+        nearest = turn - turn % self.snapshot_every
+        while nearest not in self.snapshots:
+            nearest -= self.snapshot_every
+
+        # Playing on from the current position is cheaper when possible
+        if not (nearest <= self.position <= turn):
+            self._restore(nearest)
+
+        while self.position < turn:
+            self.step()
+
+        return self.state()
+
+    def outcome(self):
+        if self.captured:
+            return "captured"
+        if self.enemy.is_fainted():
+            return "victory"
+        if self.player.is_fainted():
+            return "defeat"
+        return None
+
+    def run(self):
+        """
+        Replays the whole log and compares with its recorded end.
+
+        :return: {"matches": bool, "expected": end tuple or None,
+                  "actual": (outcome, player hp, enemy hp), "turns": int}
+        """
+        self.seek(len(self.log.events))
+
+        outcome = self.outcome()
+        expected = self.log.end
+        actual = (outcome, self.player.current_hp, self.enemy.current_hp)
+
+        matches = True
+        if expected is not None:
+            expected_outcome = expected[0] if expected[0] in ("victory", "defeat", "captured") else None
+            matches = (outcome, actual[1], actual[2]) == (expected_outcome, expected[1], expected[2])
+
+        return {"matches": matches, "expected": expected, "actual": actual,
+                "turns": len(self.log.events)}
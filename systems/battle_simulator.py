@@ -0,0 +1,245 @@
+"""
+CyberDex - Battle Simulator
+Headless Monte Carlo battles for balance sweeps.
+
+Every battle gets its own random.Random seeded from (seed, battle index),
+so results do not depend on the number of workers and any single battle
+can be reproduced on its own.
+"""
+
+import copy
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data.ability import get_ability
+from systems.command_bonus_system import CommandBonusSystem
+
+
+# ==========================================================
+# SINGLE BATTLE
+# ==========================================================
+
+def battle_rng(seed, index):
+    """Independent, reproducible RNG stream for one battle."""
+    return random.Random(f"{seed}:{index}")
+
+
+def resolve_attack(attacker, defender, ability, rng, command_bonus=None):
+    """
+    One attack: damage, then status roll, applied to defender.
+
+    Returns:
+        (damage, is_critical, status_applied)
+    """
+    damage, is_critical = ability.calculate_damage(
+        attacker, defender, command_bonus, rng=rng
+    )
+    defender.take_damage(damage)
+    status_applied = ability.try_apply_status(defender, command_bonus, rng=rng)
+    return damage, is_critical, status_applied
+
+
+def simulate_battle(virus_a, virus_b, rng, bonuses_a=None, bonuses_b=None,
+                    max_turns=400):
+    """
+    Runs one battle to completion, mutating both viruses. Turns are
+    ordered by speed through TurnScheduler, matching BattleState (side
+    "a" is added first, like the player, so it wins speed ties).
+
+    :param bonuses_a: {ability_name: command_bonus} for side a
+    :param bonuses_b: {ability_name: command_bonus} for side b
+    :param max_turns: Cap on attacks (one turn is one attack)
+    :return: {"winner": "a" | "b" | None, "turns": int,
+              "damage": [int], "crits": int}
+    """
+    # Imported here: turn_scheduler imports resolve_attack from this module
+    from systems.turn_scheduler import TurnScheduler
+
+    scheduler = TurnScheduler()
+    a = scheduler.add(virus_a, "a", bonuses_a)
+    b = scheduler.add(virus_b, "b", bonuses_b)
+    opponent = {a: b, b: a}
+
+    damage_log = []
+    crits = 0
+
+    for turn in range(1, max_turns + 1):
+        attacker = scheduler.next_turn()
+        defender = opponent[attacker].virus
+
+        ability_name = rng.choice(attacker.virus.abilities)
+        ability = get_ability(ability_name)
+
+        damage, is_critical, _ = resolve_attack(
+            attacker.virus, defender, ability, rng, attacker.bonuses.get(ability_name)
+        )
+        damage_log.append(damage)
+        crits += is_critical
+
+        if defender.is_fainted():
+            return {"winner": attacker.side, "turns": turn,
+                    "damage": damage_log, "crits": crits}
+
+    return {"winner": None, "turns": max_turns, "damage": damage_log, "crits": crits}
+
+
+# ==========================================================
+# STREAMING REDUCER
+# ==========================================================
+
+class BattleStats:
+    """Aggregates battle results without keeping them."""
+
+    def __init__(self, damage_bucket=5):
+        self.damage_bucket = damage_bucket
+
+        self.battles = 0
+        self.wins = {"a": 0, "b": 0, None: 0}
+        self.total_turns = 0
+        self.min_turns = None
+        self.max_turns = 0
+
+        self.hits = 0
+        self.crits = 0
+        self.damage_sum = 0
+        self.damage_sq_sum = 0
+        self.damage_histogram = {}
+
+    def add(self, result):
+        self.battles += 1
+        self.wins[result["winner"]] += 1
+
+        turns = result["turns"]
+        self.total_turns += turns
+        self.max_turns = max(self.max_turns, turns)
+        if self.min_turns is None or turns < self.min_turns:
+            self.min_turns = turns
+
+        self.crits += result["crits"]
+        bucket_size = self.damage_bucket
+        histogram = self.damage_histogram
+        for damage in result["damage"]:
+            self.hits += 1
+            self.damage_sum += damage
+            self.damage_sq_sum += damage * damage
+            bucket = damage // bucket_size * bucket_size
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def merge(self, other):
+        self.battles += other.battles
+        for side, count in other.wins.items():
+            self.wins[side] += count
+
+        self.total_turns += other.total_turns
+        self.max_turns = max(self.max_turns, other.max_turns)
+        if other.min_turns is not None and (
+                self.min_turns is None or other.min_turns < self.min_turns):
+            self.min_turns = other.min_turns
+
+        self.hits += other.hits
+        self.crits += other.crits
+        self.damage_sum += other.damage_sum
+        self.damage_sq_sum += other.damage_sq_sum
+        for bucket, count in other.damage_histogram.items():
+            self.damage_histogram[bucket] = self.damage_histogram.get(bucket, 0) + count
+
+    def summary(self):
+        battles = max(1, self.battles)
+        hits = max(1, self.hits)
+        mean = self.damage_sum / hits
+
+        return {
+            "battles": self.battles,
+            "win_rate_a": self.wins["a"] / battles,
+            "win_rate_b": self.wins["b"] / battles,
+            "draw_rate": self.wins[None] / battles,
+            "avg_turns": self.total_turns / battles,
+            "min_turns": self.min_turns,
+            "max_turns": self.max_turns,
+            "avg_damage": mean,
+            "damage_stddev": max(0.0, self.damage_sq_sum / hits - mean * mean) ** 0.5,
+            "crit_rate": self.crits / hits,
+            "damage_histogram": dict(sorted(self.damage_histogram.items())),
+        }
+
+
+# ==========================================================
+# PARALLEL RUNNER
+# ==========================================================
+
+def _run_chunk(virus_a, virus_b, bonuses_a, bonuses_b, seed, start, stop, max_turns):
+    stats = BattleStats()
+
+    for index in range(start, stop):
+        stats.add(simulate_battle(
+            copy.copy(virus_a), copy.copy(virus_b), battle_rng(seed, index),
+            bonuses_a, bonuses_b, max_turns
+        ))
+
+    return stats
+
+
+class BattleSimulator:
+    """
+    Runs N full battles between two Virus templates across a process pool.
+
+    Example:
+        sim = BattleSimulator(a, b, command_a="exec pulse --burst")
+        stats = sim.run(100000, seed=42)
+        print(stats.summary())
+    """
+
+    def __init__(self, virus_a, virus_b, command_a=None, command_b=None,
+                 max_turns=400):
+        for virus in (virus_a, virus_b):
+            if not virus.abilities:
+                raise ValueError(f"{virus.name} has no abilities to battle with")
+
+        self.virus_a = virus_a
+        self.virus_b = virus_b
+        self.max_turns = max_turns
+
+        # Command bonuses only depend on (command, ability): parse once
+        command_system = CommandBonusSystem()
+        self.bonuses_a = self._parse_bonuses(command_system, virus_a, command_a)
+        self.bonuses_b = self._parse_bonuses(command_system, virus_b, command_b)
+
+    @staticmethod
+    def _parse_bonuses(command_system, virus, command):
+        if not command:
+            return {}
+
+        bonuses = {}
+        for ability_name in virus.abilities:
+            ability = get_ability(ability_name)
+            bonus = command_system.parse_command(command, ability.name)
+            if bonus:
+                bonuses[ability_name] = bonus
+        return bonuses
+
+    def run(self, battles, seed=0, workers=None, chunk_size=1000):
+        """
+        :param battles: Number of battles
+        :param seed: Base seed; battle i uses battle_rng(seed, i)
+        :param workers: Process count (None = all cores, 1 = in-process)
+        :param chunk_size: Battles per submitted task
+        :return: BattleStats
+        """
+        chunks = [(start, min(start + chunk_size, battles))
+                  for start in range(0, battles, chunk_size)]
+        args = (self.virus_a, self.virus_b, self.bonuses_a, self.bonuses_b, seed)
+
+        stats = BattleStats()
+
+        if workers == 1:
+            for start, stop in chunks:
+                stats.merge(_run_chunk(*args, start, stop, self.max_turns))
+            return stats
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_chunk, *args, start, stop, self.max_turns)
+                       for start, stop in chunks]
+            for future in as_completed(futures):
+                stats.merge(future.result())
+
+        return stats
@@ -0,0 +1,290 @@
+"""
+CyberDex - Binary Save Format
+Versioned, sectioned save files with struct-packed virus records.
+
+Layout (little endian):
+    header   magic "CDXS", version u16, flags u16, section count u16, pad u16
+    sections tag (4 bytes), payload length u32, payload
+
+Sections, in file order:
+    META  JSON: player_name, playtime, inventory, world_state, ...
+    STRS  JSON: interned values (names, types, tiers) and ability lists
+    TEAM  u32 count + virus records
+    STOR  u32 count + virus records
+
+Virus record: name, type, tier, abilities ids (u32 each), level u16,
+exp i64, current_hp i32, corruption f64. Version 1 files stored exp as
+f64 and still load.
+"""
+
+import json
+import os
+import struct
+import threading
+
+from data.virus import LazyVirus
+from data.virus_store import VirusStore
+
+MAGIC = b"CDXS"
+VERSION = 2
+
+HEADER = struct.Struct("<4sHHHH")
+SECTION = struct.Struct("<4sI")
+COUNT = struct.Struct("<I")
+RECORD = struct.Struct("<4IHqid")
+
+# Record layout by file version
+RECORDS = {1: struct.Struct("<4IHdid"), 2: RECORD}
+
+
+def is_binary_save(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class _Interner:
+    def __init__(self):
+        self.values = []
+        self.ability_sets = []
+        self._value_ids = {}
+        self._ability_ids = {}
+
+    def value(self, value):
+        # Keyed with the type so 1 and "1" stay distinct
+        key = (type(value), value)
+        value_id = self._value_ids.get(key)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self._value_ids[key] = value_id
+        return value_id
+
+    def abilities(self, abilities):
+        key = tuple(abilities)
+        ability_id = self._ability_ids.get(key)
+        if ability_id is None:
+            ability_id = len(self.ability_sets)
+            self.ability_sets.append(list(key))
+            self._ability_ids[key] = ability_id
+        return ability_id
+
+
+# ==========================================================
+# WRITE
+# ==========================================================
+
+def _pack_dicts(interner, rows):
+    pack = RECORD.pack
+    value = interner.value
+    parts = [COUNT.pack(len(rows))]
+
+    for data in rows:
+        parts.append(pack(
+            value(data["name"]),
+            value(data["virus_type"]),
+            value(data["tier"]),
+            interner.abilities(data["abilities"]),
+            data["level"],
+            int(data["exp"]),
+            data["current_hp"],
+            data["corruption"],
+        ))
+
+    return b"".join(parts)
+
+
+def _pack_store(interner, store):
+    """Packs a VirusStore straight from its columns."""
+    names = [interner.value(v) for v in store.names.values]
+    types = [interner.value(v) for v in store.types.values]
+    tiers = [interner.value(v) for v in store.tiers.values]
+    ability_sets = [interner.abilities(v) for v in store.ability_sets.values]
+
+    pack = RECORD.pack
+    parts = [COUNT.pack(len(store))]
+
+    for row in zip(store.name_id, store.type_id, store.tier_id, store.abilities_id,
+                   store.level, store.exp, store.current_hp, store.corruption):
+        parts.append(pack(names[row[0]], types[row[1]], tiers[row[2]],
+                          ability_sets[row[3]], row[4], row[5], row[6], row[7]))
+
+    return b"".join(parts)
+
+
+def encode_binary_save(meta, team, storage):
+    """
+    :param meta: JSON-serializable dict (player_name, inventory, ...)
+    :param team: List of Virus.to_dict() dicts
+    :param storage: VirusStore or list of Virus.to_dict() dicts
+    :return: bytes
+    """
+    interner = _Interner()
+
+    team_payload = _pack_dicts(interner, team)
+    if isinstance(storage, VirusStore):
+        storage_payload = _pack_store(interner, storage)
+    else:
+        storage_payload = _pack_dicts(interner, storage)
+
+    strings_payload = json.dumps({
+        "values": interner.values,
+        "ability_sets": interner.ability_sets,
+    }).encode("utf-8")
+
+    sections = (
+        (b"META", json.dumps(meta).encode("utf-8")),
+        (b"STRS", strings_payload),
+        (b"TEAM", team_payload),
+        (b"STOR", storage_payload),
+    )
+
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(sections), 0)]
+    for tag, payload in sections:
+        parts.append(SECTION.pack(tag, len(payload)))
+        parts.append(payload)
+
+    return b"".join(parts)
+
+
+# ==========================================================
+# READ
+# ==========================================================
+
+class BinarySave:
+    """
+    Reads META, STRS and TEAM on open and decodes them. The storage
+    section is only located: its bytes are read from the file and
+    decoded on first use of the store returned by storage().
+
+    The file must not change before then. SaveSystem calls
+    read_storage_section() before it replaces or deletes a save that
+    still has a reader pending.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._storage = None
+        self._storage_payload = None
+        self._storage_length = 0
+        # (offset, length) of the unread STOR section
+        self._storage_span = None
+        self._read_lock = threading.Lock()
+
+        with open(path, "rb") as f:
+            magic, version, _, section_count, _ = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a CyberDex binary save")
+            if version > VERSION:
+                raise ValueError(f"Unsupported save version {version}")
+
+            self.version = version
+            self._record = RECORDS[version]
+            self._signature = _file_signature(os.fstat(f.fileno()))
+            sections = {}
+
+            for _ in range(section_count):
+                tag, length = SECTION.unpack(f.read(SECTION.size))
+                if tag == b"STOR":
+                    # Only the count now; the records stay on disk
+                    self._storage_span = (f.tell(), length)
+                    self._storage_length = COUNT.unpack(f.read(COUNT.size))[0]
+                    f.seek(length - COUNT.size, os.SEEK_CUR)
+                else:
+                    sections[tag] = f.read(length)
+
+        self.meta = json.loads(sections[b"META"])
+        strings = json.loads(sections[b"STRS"])
+        self._values = strings["values"]
+        self._ability_sets = strings["ability_sets"]
+
+        self.team = [LazyVirus(data) for data in self._decode_dicts(sections[b"TEAM"])]
+
+    def _decode_dicts(self, payload):
+        values = self._values
+        ability_sets = self._ability_sets
+
+        for name, vtype, tier, abilities, level, exp, hp, corruption in \
+                self._record.iter_unpack(payload[COUNT.size:]):
+            yield {
+                "name": values[name],
+                "virus_type": values[vtype],
+                "tier": values[tier],
+                "level": level,
+                # int(): version 1 stored exp as f64
+                "exp": int(exp),
+                "current_hp": hp,
+                "corruption": corruption,
+                "abilities": list(ability_sets[abilities]),
+            }
+
+    # ==========================================================
+    # STORAGE
+    # ==========================================================
+
+    @property
+    def storage_pending(self):
+        """True while the storage section has not been read from disk."""
+        return self._storage_span is not None
+
+    def read_storage_section(self):
+        """
+        Reads the storage section's bytes into memory (still undecoded),
+        so the file can be replaced. No-op once read.
+        """
+        with self._read_lock:
+            span = self._storage_span
+            if span is None:
+                return
+
+            offset, length = span
+            with open(self.path, "rb") as f:
+                if _file_signature(os.fstat(f.fileno())) != self._signature:
+                    raise ValueError(f"{self.path} changed before its storage was read")
+                f.seek(offset)
+                self._storage_payload = f.read(length)
+
+            self._storage_span = None
+
+    def storage(self):
+        if self._storage is None:
+            self._storage = VirusStore.deferred(self._load_storage, self._storage_length)
+        return self._storage
+
+    def _load_storage(self, store):
+        self.read_storage_section()
+
+        payload = self._storage_payload
+        self._storage_payload = None
+        if not payload:
+            return
+
+        rows = list(self._record.iter_unpack(payload[COUNT.size:]))
+        if not rows:
+            return
+
+        names, types, tiers, abilities, levels, exps, hps, corruptions = zip(*rows)
+        values = self._values
+        ability_sets = self._ability_sets
+
+        # One intern per distinct id, then each column in one extend
+        store.name_id.extend(_remap(names, store.names, values.__getitem__))
+        store.type_id.extend(_remap(types, store.types, values.__getitem__))
+        store.tier_id.extend(_remap(tiers, store.tiers, values.__getitem__))
+        store.abilities_id.extend(_remap(
+            abilities, store.ability_sets, lambda i: tuple(ability_sets[i])
+        ))
+        store.level.extend(levels)
+        # Version 1 stored exp as f64
+        store.exp.extend(exps if self.version > 1 else map(int, exps))
+        store.current_hp.extend(hps)
+        store.corruption.extend(corruptions)
+
+
+def _remap(ids, table, value_for):
+    """File-level ids -> ids interned in a VirusStore table, in row order."""
+    mapping = {i: table.intern(value_for(i)) for i in dict.fromkeys(ids)}
+    return [mapping[i] for i in ids]
+
+
+def _file_signature(stat):
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,45 @@
+"""
+CyberDex - Capture System
+Capture odds for wild viruses.
+"""
+
+import random
+
+
+class CaptureSystem:
+    """
+    A capture is one roll against a chance that grows as the target's
+    HP drops and shrinks with its tier. Status effects help a little.
+
+    The defaults are starting values for playtesting, not tuned balance.
+    """
+
+    def __init__(self, base_rate=0.6, full_hp_factor=0.3, status_bonus=0.15,
+                 min_chance=0.05, max_chance=0.95):
+        """
+        :param base_rate: Chance against a tier 1 virus with no HP left
+        :param full_hp_factor: Share of base_rate left at full HP
+        :param status_bonus: Added when the target has a status effect
+        """
+        self.base_rate = base_rate
+        self.full_hp_factor = full_hp_factor
+        self.status_bonus = status_bonus
+        self.min_chance = min_chance
+        self.max_chance = max_chance
+
+    def capture_chance(self, virus):
+        hp_fraction = virus.current_hp / virus.max_hp if virus.max_hp else 0.0
+
+        hp_scale = 1.0 - (1.0 - self.full_hp_factor) * hp_fraction
+        chance = self.base_rate * hp_scale / max(1, virus.tier)
+        if virus.status:
+            chance += self.status_bonus
+
+        return min(self.max_chance, max(self.min_chance, chance))
+
+    def attempt_capture(self, virus, rng=random):
+        """
+        :param rng: random.Random-like source; battles pass their seeded one
+        :return: True if the virus was captured
+        """
+        return rng.random() < self.capture_chance(virus)
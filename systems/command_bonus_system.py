@@ -4,6 +4,9 @@ Parses typed commands for hybrid combat bonuses.
 """
 
 import re
+from collections import OrderedDict
+
+from data.ability import ABILITY_REGISTRY, infer_command_category
 
 
 class CommandBonusSystem:
@@ -16,7 +19,20 @@ class CommandBonusSystem:
         propagate worm --rapid
     """
 
-    def __init__(self):
+    # Modifier flags -> bonus bits
+    MOD_DAMAGE = 1
+    MOD_CRIT = 2
+    MOD_STATUS = 4
+
+    MODIFIER_FLAGS = {
+        "--burst": MOD_DAMAGE,
+        "-fast": MOD_DAMAGE,
+        "--precision": MOD_CRIT,
+        "--infect": MOD_STATUS,
+        "--overload": MOD_STATUS,
+    }
+
+    def __init__(self, cache_size=256):
         # Command keywords mapped by ability type
         self.type_keywords = {
             "ai": ["exec", "compute", "predict"],
@@ -26,6 +42,35 @@ class CommandBonusSystem:
             "spyware": ["scan", "monitor", "trace"]
         }
 
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.compile()
+
+    def compile(self):
+        """
+        Builds the lookup tables from type_keywords. Call again after
+        editing type_keywords.
+        """
+        keyword_categories = {}
+        for category, keywords in self.type_keywords.items():
+            for keyword in keywords:
+                keyword_categories.setdefault(keyword, set()).add(category)
+        self._keyword_categories = {
+            keyword: frozenset(categories)
+            for keyword, categories in keyword_categories.items()
+        }
+
+        # One bonus tuple per modifier bitmask
+        self._bonus_by_mask = []
+        for mask in range(8):
+            self._bonus_by_mask.append((
+                1.25 if mask & self.MOD_DAMAGE else 1.0,
+                0.15 if mask & self.MOD_CRIT else 0.0,
+                0.2 if mask & self.MOD_STATUS else 0.0,
+            ))
+
+        self._cache.clear()
+
     # ==========================================================
     # MAIN PARSER
     # ==========================================================
@@ -47,6 +92,39 @@ class CommandBonusSystem:
 
         command_string = command_string.strip().lower()
 
+        key = (command_string, ability_name)
+        cache = self._cache
+        if key in cache:
+            cache.move_to_end(key)
+            bonus = cache[key]
+        else:
+            bonus = self._parse_normalized(command_string, ability_name)
+            cache[key] = bonus
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+        if bonus is None:
+            return None
+
+        return {
+            "damage_multiplier": bonus[0],
+            "crit_boost": bonus[1],
+            "status_boost": bonus[2]
+        }
+
+    def parse_many(self, commands):
+        """
+        Batch parse for replays and bots.
+
+        :param commands: Iterable of (command_string, ability_name)
+        :return: List of parse_command results
+        """
+        parse = self.parse_command
+        return [parse(command, ability_name) for command, ability_name in commands]
+
+    def _parse_normalized(self, command_string, ability_name):
+        """Returns a (damage, crit, status) bonus tuple or None."""
+
         # Basic syntax rule:
         # Must start with keyword + ability-related word
         words = command_string.split()
@@ -59,31 +137,17 @@ class CommandBonusSystem:
         if ability_type not in self.type_keywords:
             return None
 
-        valid_keywords = self.type_keywords[ability_type]
-
         # Check first word matches ability type category
-        if words[0] not in valid_keywords:
+        if ability_type not in self._keyword_categories.get(words[0], ()):
             return None
 
-        # Optional modifiers
-        damage_bonus = 1.0
-        crit_bonus = 0.0
-        status_bonus = 0.0
-
-        if "--burst" in words or "-fast" in words:
-            damage_bonus += 0.25
+        # Optional modifiers, folded into a bitmask in one pass
+        flags = self.MODIFIER_FLAGS
+        mask = 0
+        for word in words:
+            mask |= flags.get(word, 0)
 
-        if "--precision" in words:
-            crit_bonus += 0.15
-
-        if "--infect" in words or "--overload" in words:
-            status_bonus += 0.2
-
-        return {
-            "damage_multiplier": damage_bonus,
-            "crit_boost": crit_bonus,
-            "status_boost": status_bonus
-        }
+        return self._bonus_by_mask[mask]
 
     # ==========================================================
     # HELPERS
@@ -96,23 +160,16 @@ class CommandBonusSystem:
         data_pulse → ai
         packet_storm → worm
         corrupt_burst → malware
-        """
-
-        name = ability_name.lower()
 
-        if "data" in name or "pulse" in name:
-            return "ai"
-
-        if "packet" in name or "storm" in name:
-            return "worm"
-
-        if "corrupt" in name or "inject" in name:
-            return "malware"
+        Registered abilities use the category precomputed by
+        ABILITY_REGISTRY; other names fall back to the substring rules.
+        """
 
-        if "encrypt" in name or "lock" in name:
-            return "ransomware"
+        record = ABILITY_REGISTRY.lookup(ability_name)
+        if record is not None:
+            return record.command_category
 
-        return None
+        return infer_command_category(ability_name)
 
     # ==========================================================
     # COMMAND HINT
@@ -0,0 +1,167 @@
+"""
+CyberDex - Command Completer
+Incremental autocomplete for the battle command box.
+
+Walks prefix tries of the type keywords and modifier flags one keystroke
+at a time. Every keystroke pushes one small state tuple and backspace
+pops it, so neither ever rescans the typed buffer.
+"""
+
+
+class _TrieNode:
+    __slots__ = ("children", "word", "categories", "flag", "ranked")
+
+    def __init__(self):
+        self.children = {}
+        self.word = None
+        self.categories = frozenset()
+        self.flag = 0
+        # category -> words under this node, best first
+        self.ranked = {}
+
+
+class CommandCompleter:
+
+    def __init__(self, command_system, max_suggestions=5):
+        self.command_system = command_system
+        self.max_suggestions = max_suggestions
+
+        self.keyword_root = _TrieNode()
+        self.flag_root = _TrieNode()
+        self._build()
+
+        self.category = None
+        self.reset()
+
+    # ==========================================================
+    # TRIE CONSTRUCTION
+    # ==========================================================
+
+    def _build(self):
+        keyword_categories = {}
+        for category, keywords in self.command_system.type_keywords.items():
+            for keyword in keywords:
+                keyword_categories.setdefault(keyword, set()).add(category)
+
+        for keyword, categories in keyword_categories.items():
+            node = self._insert(self.keyword_root, keyword)
+            node.categories = frozenset(categories)
+
+        for flag, bit in self.command_system.MODIFIER_FLAGS.items():
+            self._insert(self.flag_root, flag).flag = bit
+
+        categories = list(self.command_system.type_keywords) + [None]
+        self._rank(self.keyword_root, categories)
+        self._rank(self.flag_root, categories)
+
+    @staticmethod
+    def _insert(root, word):
+        node = root
+        for ch in word:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.word = word
+        return node
+
+    def _rank(self, node, categories):
+        """Fills node.ranked bottom-up; returns the words under node."""
+        words = [node] if node.word else []
+        for child in node.children.values():
+            words.extend(self._rank(child, categories))
+
+        for category in categories:
+            ordered = sorted(
+                words,
+                key=lambda n: (category not in n.categories and not n.flag,
+                               len(n.word), n.word)
+            )
+            node.ranked[category] = [n.word for n in ordered[:self.max_suggestions]]
+
+        return words
+
+    # ==========================================================
+    # INPUT
+    # ==========================================================
+
+    def set_ability(self, ability_name):
+        """Keywords for this ability's command category rank first."""
+        self.category = self.command_system._infer_ability_type(ability_name)
+        self.reset()
+
+    def reset(self):
+        # (node, token_index, token_len, first_categories, modifier_mask)
+        self._states = [(None, 0, 0, frozenset(), 0)]
+
+    def push(self, ch):
+        """Advances the cursor by one typed character."""
+        node, token_index, token_len, first, mask = self._states[-1]
+
+        if ch.isspace():
+            if token_len:
+                if token_index == 0:
+                    first = node.categories if node else frozenset()
+                elif node:
+                    mask |= node.flag
+                token_index += 1
+                token_len = 0
+                node = None
+            self._states.append((node, token_index, token_len, first, mask))
+            return
+
+        for lower in ch.lower():
+            if token_len == 0:
+                node = self.keyword_root if token_index == 0 else self.flag_root
+            if node is not None:
+                node = node.children.get(lower)
+            token_len += 1
+
+        self._states.append((node, token_index, token_len, first, mask))
+
+    def pop(self):
+        """Undoes the last push (backspace)."""
+        if len(self._states) > 1:
+            self._states.pop()
+
+    def set_text(self, text):
+        self.reset()
+        for ch in text:
+            self.push(ch)
+
+    # ==========================================================
+    # QUERIES
+    # ==========================================================
+
+    def suggestions(self):
+        """Ranked completions for the token under the cursor."""
+        node, token_index, token_len, _, _ = self._states[-1]
+
+        if token_len == 0:
+            node = self.keyword_root if token_index == 0 else self.flag_root
+        if node is None:
+            return []
+
+        return node.ranked[self.category]
+
+    def completion(self):
+        """Characters that would complete the best suggestion."""
+        suggestions = self.suggestions()
+        if not suggestions:
+            return ""
+
+        token_len = self._states[-1][2]
+        return suggestions[0][token_len:]
+
+    def modifier_mask(self):
+        node, token_index, token_len, _, mask = self._states[-1]
+        if node is not None and token_len and token_index:
+            mask |= node.flag
+        return mask
+
+    def is_valid(self):
+        """True when parse_command would accept the buffer for this ability."""
+        node, token_index, token_len, first, _ = self._states[-1]
+
+        words = token_index + (1 if token_len else 0)
+        if words < 2:
+            return False
+
+        return self.category in self.command_system.type_keywords and self.category in first
@@ -0,0 +1,337 @@
+"""
+CyberDex - Save Journal
+Append-only delta log that sits next to a full save snapshot.
+
+Each line is one JSON record. The first line is a header carrying the
+generation of the snapshot the journal applies to; a journal whose
+generation does not match is stale and ignored. Records:
+
+    {"op": "meta", "key": ..., "data": ...}        player_name / playtime / inventory / world_state
+    {"op": "team", "data": [virus dicts]}           whole team (it is small)
+    {"op": "storage", "data": [virus dicts]}        whole storage box
+    {"op": "store_append", "data": virus dict}
+    {"op": "store_set", "index": i, "data": virus dict}
+    {"op": "store_pop", "index": i}
+    {"op": "store_clear"}
+
+A torn last line (crash mid-write) ends replay at the previous record,
+and is truncated away before the journal is next appended to (not when
+it is read, so loading a save never writes).
+"""
+
+import json
+import os
+
+from data.virus import LazyVirus
+from data.virus_store import VirusStore
+
+META_KEYS = ("player_name", "playtime", "inventory", "world_state")
+
+
+def virus_record(virus):
+    """virus.to_dict() with its own abilities list (to_dict shares it)."""
+    data = virus.to_dict()
+    return dict(data, abilities=list(data["abilities"]))
+
+
+def abilities_snapshot(viruses):
+    """
+    Ability lists per virus. They can be edited in place, which no dirty
+    flag sees, so collect() compares against this instead.
+    """
+    return tuple(tuple(virus.abilities) for virus in viruses)
+
+
+# ==========================================================
+# READ / REPLAY
+# ==========================================================
+
+def _parse_lines(data):
+    """
+    Parses journal bytes up to the first torn line. A line counts only
+    once its newline is on disk and it decodes.
+
+    :return: (decoded lines, byte length of the intact prefix)
+    """
+    lines = []
+    end = 0
+
+    while True:
+        newline = data.find(b"\n", end)
+        if newline < 0:
+            break
+        line = data[end:newline]
+        if line:
+            try:
+                lines.append(json.loads(line))
+            except ValueError:
+                break
+        end = newline + 1
+
+    return lines, end
+
+
+def read_journal(path):
+    """
+    :return: (generation, records); (None, []) when the file is missing
+             or has no valid header
+    """
+    if not os.path.exists(path):
+        return None, []
+
+    with open(path, "rb") as f:
+        lines, _ = _parse_lines(f.read())
+
+    try:
+        generation = lines[0]["generation"]
+    except (IndexError, KeyError, TypeError):
+        return None, []
+
+    return generation, lines[1:]
+
+
+def apply_records(game_data, records):
+    """Replays journal records onto loaded game_data in place."""
+    for record in records:
+        op = record["op"]
+
+        if op == "meta":
+            game_data[record["key"]] = record["data"]
+        elif op == "team":
+            game_data["virus_team"] = [LazyVirus(v) for v in record["data"]]
+        elif op == "storage":
+            game_data["virus_storage"] = VirusStore.from_dicts(record["data"])
+        elif op == "store_append":
+            game_data["virus_storage"].append_dict(record["data"])
+        elif op == "store_set":
+            store = game_data["virus_storage"]
+            store.set(record["index"], LazyVirus(record["data"]))
+        elif op == "store_pop":
+            game_data["virus_storage"].take(record["index"])
+        elif op == "store_clear":
+            game_data["virus_storage"].clear()
+
+    return game_data
+
+
+# ==========================================================
+# WRITE
+# ==========================================================
+
+class SaveJournal:
+    """
+    Tracks what one game_data dict looked like at the last snapshot or
+    journal write, and appends only what changed since.
+    """
+
+    def __init__(self, path, generation, durable=False):
+        """
+        :param generation: Generation of the snapshot this journal extends
+        :param durable: fsync after every append (slower, survives power loss)
+        """
+        self.path = path
+        self.generation = generation
+        self.durable = durable
+
+        self.game_data = None
+        self.size = 0
+        self._file = None
+        # Intact length of a replayed journal, until the first append
+        self._resume_at = None
+
+        self._team_ids = ()
+        self._team_abilities = ()
+        self._storage = None
+        self._storage_ids = ()
+        self._storage_abilities = ()
+        self._meta = {}
+
+    # ==========================================================
+    # FILE
+    # ==========================================================
+
+    def open_new(self):
+        """Starts an empty journal for the current generation."""
+        self.close()
+        self._resume_at = None
+
+        header = json.dumps({"generation": self.generation}) + "\n"
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(header)
+        os.replace(temp_path, self.path)
+
+        self._file = open(self.path, "a")
+        self.size = len(header)
+
+    def open_existing(self):
+        """
+        Continues a journal that was just replayed. Nothing is written
+        until the next append, which first cuts off a torn tail; records
+        appended after it would never be replayed.
+        """
+        self.close()
+
+        with open(self.path, "rb") as f:
+            _, end = _parse_lines(f.read())
+
+        self._resume_at = end
+        self.size = end
+
+    def _open_for_append(self):
+        end = self._resume_at
+        if end is None:
+            self.open_new()
+            return
+
+        self._resume_at = None
+        with open(self.path, "r+b") as f:
+            f.truncate(end)
+        self._file = open(self.path, "a")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rotate(self, new_path):
+        """Closes the journal and moves it aside (for compaction)."""
+        self.close()
+        os.replace(self.path, new_path)
+        self.size = 0
+
+    # ==========================================================
+    # BASELINE
+    # ==========================================================
+
+    def track(self, game_data):
+        """
+        Records game_data as saved: clears dirty flags and starts change
+        tracking on a VirusStore box.
+        """
+        self.game_data = game_data
+
+        team = game_data.get("virus_team", [])
+        for virus in team:
+            virus.clear_dirty()
+        self._team_ids = tuple(map(id, team))
+        self._team_abilities = abilities_snapshot(team)
+
+        storage = game_data.get("virus_storage", [])
+        self._storage = storage
+        if isinstance(storage, VirusStore):
+            storage.track_changes()
+            self._storage_ids = ()
+            self._storage_abilities = ()
+        else:
+            for virus in storage:
+                virus.clear_dirty()
+            self._storage_ids = tuple(map(id, storage))
+            self._storage_abilities = abilities_snapshot(storage)
+
+        self._meta = {
+            key: json.dumps(game_data.get(key), sort_keys=True) for key in META_KEYS
+        }
+
+    # ==========================================================
+    # APPEND
+    # ==========================================================
+
+    def collect(self, game_data):
+        """Builds the records for everything changed since the last call."""
+        records = []
+
+        for key in META_KEYS:
+            encoded = json.dumps(game_data.get(key), sort_keys=True)
+            if encoded != self._meta.get(key):
+                self._meta[key] = encoded
+                # Decoded copy, so later edits to the live dict are not picked up
+                records.append({"op": "meta", "key": key, "data": json.loads(encoded)})
+
+        team = game_data.get("virus_team", [])
+        team_ids = tuple(map(id, team))
+        team_abilities = abilities_snapshot(team)
+        if (team_ids != self._team_ids or team_abilities != self._team_abilities
+                or any(v.is_dirty() for v in team)):
+            self._team_ids = team_ids
+            self._team_abilities = team_abilities
+            records.append({"op": "team", "data": [virus_record(v) for v in team]})
+            for virus in team:
+                virus.clear_dirty()
+
+        records.extend(self._collect_storage(game_data.get("virus_storage", [])))
+        return records
+
+    def _collect_storage(self, storage):
+        if storage is not self._storage:
+            # A different box object; write it whole and track the new one
+            self._storage = storage
+            if isinstance(storage, VirusStore):
+                storage.track_changes()
+                self._storage_ids = ()
+                self._storage_abilities = ()
+                return [{"op": "storage", "data": storage.to_dicts()}]
+
+            for virus in storage:
+                virus.clear_dirty()
+            self._storage_ids = tuple(map(id, storage))
+            self._storage_abilities = abilities_snapshot(storage)
+            return [{"op": "storage", "data": [virus_record(v) for v in storage]}]
+
+        if isinstance(storage, VirusStore):
+            return [self._store_record(change) for change in storage.drain_changes()]
+
+        # Plain list box: rewrite it if membership changed, else dirty rows
+        storage_ids = tuple(map(id, storage))
+        storage_abilities = abilities_snapshot(storage)
+        if storage_ids != self._storage_ids:
+            self._storage_ids = storage_ids
+            self._storage_abilities = storage_abilities
+            for virus in storage:
+                virus.clear_dirty()
+            return [{"op": "storage", "data": [virus_record(v) for v in storage]}]
+
+        records = []
+        saved_abilities = self._storage_abilities
+        for index, virus in enumerate(storage):
+            if virus.is_dirty() or storage_abilities[index] != saved_abilities[index]:
+                records.append({"op": "store_set", "index": index, "data": virus_record(virus)})
+                virus.clear_dirty()
+        self._storage_abilities = storage_abilities
+        return records
+
+    @staticmethod
+    def _store_record(change):
+        kind = change[0]
+        if kind == "append":
+            return {"op": "store_append", "data": change[1]}
+        if kind == "set":
+            return {"op": "store_set", "index": change[1], "data": change[2]}
+        if kind == "pop":
+            return {"op": "store_pop", "index": change[1]}
+        return {"op": "store_clear"}
+
+    def append(self, game_data):
+        """
+        Writes the records for game_data's changes.
+
+        :return: Bytes appended
+        """
+        return self.write(self.collect(game_data))
+
+    def write(self, records):
+        """Appends records from collect(); returns bytes appended."""
+        if not records:
+            return 0
+
+        if self._file is None:
+            self._open_for_append()
+
+        payload = "".join(json.dumps(record) + "\n" for record in records)
+        self._file.write(payload)
+        self._file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
+
+        self.size += len(payload)
+        return len(payload)
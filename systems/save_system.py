@@ -1,19 +1,87 @@
 """
 CyberDex - Save System
 Handles saving and loading game data.
+
+save_game writes a full snapshot. save_incremental appends only what
+changed since the last save of the same game_data to the slot's journal
+(see systems.save_journal); once the journal grows past
+compact_threshold it is folded into a new snapshot on a background
+thread. Snapshots are written to a temp file and renamed into place.
+
+Every write also refreshes a small metadata sidecar (save_slot_N.meta)
+so slot pickers can list saves without reading their bodies. Loaded
+team members are LazyVirus proxies and the box is a VirusStore, so no
+Virus is built until the game actually touches one.
+
+Loaded "virus_storage" is a VirusStore, not a list of Virus objects.
+It has no indexing or iteration. Read a row with row(i) (a dict) or
+get(i), which returns a detached Virus; write a changed Virus back
+with set(i, virus). Use append() and take(i) to add and remove rows.
 """
 
 import os
+import re
 import json
-from data.virus import Virus
+import threading
+import time
+import weakref
+from data.virus import LazyVirus
+from data.virus_store import VirusStore
+from systems.binary_save import BinarySave, encode_binary_save, is_binary_save
+from systems.save_journal import SaveJournal, read_journal, apply_records
+
+SAVE_FORMATS = ("json", "binary")
+
+_SAVE_FILE = re.compile(r"^save_slot_(.+)\.(json|sav)$")
+
+
+def build_slot_metadata(game_data, save_format):
+    """Summary shown by slot pickers; never builds a Virus."""
+    team = [v.to_dict() for v in game_data.get("virus_team", [])]
+    storage = game_data.get("virus_storage", [])
+
+    return {
+        "player_name": game_data.get("player_name", "Player"),
+        "playtime": game_data.get("playtime", 0),
+        "team": [
+            {"name": v["name"], "virus_type": v["virus_type"], "level": v["level"]}
+            for v in team
+        ],
+        "team_count": len(team),
+        "storage_count": len(storage),
+        "saved_at": time.time(),
+        "format": save_format,
+    }
 
 
 class SaveSystem:
 
-    def __init__(self, save_directory="saves"):
+    def __init__(self, save_directory="saves", save_format="json",
+                 compact_threshold=256 * 1024):
+        """
+        :param save_format: "json" or "binary" for new saves. Loading
+                            detects the format of whatever file exists.
+        :param compact_threshold: Journal size in bytes that triggers
+                                  background compaction
+        """
+        if save_format not in SAVE_FORMATS:
+            raise ValueError(f"Unknown save format: {save_format}")
+
         self.save_directory = save_directory
+        self.save_format = save_format
+        self.compact_threshold = compact_threshold
         self._ensure_save_directory()
 
+        self._journals = {}
+        self._retired_journals = []
+        self._slot_locks = {}
+        self._slot_locks_guard = threading.Lock()
+        self._compactions = {}
+
+        # Binary save path -> loaded BinarySaves whose storage section is
+        # still on disk (read before that file is replaced or deleted)
+        self._binary_readers = {}
+
     # ==========================================================
     # DIRECTORY HANDLING
     # ==========================================================
@@ -25,6 +93,46 @@ class SaveSystem:
     def _get_save_path(self, slot):
         return os.path.join(self.save_directory, f"save_slot_{slot}.json")
 
+    def _get_binary_save_path(self, slot):
+        return os.path.join(self.save_directory, f"save_slot_{slot}.sav")
+
+    def _get_journal_path(self, slot):
+        return os.path.join(self.save_directory, f"save_slot_{slot}.journal")
+
+    def _get_compacting_path(self, slot):
+        return os.path.join(self.save_directory, f"save_slot_{slot}.journal.compacting")
+
+    def _get_metadata_path(self, slot):
+        return os.path.join(self.save_directory, f"save_slot_{slot}.meta")
+
+    def _find_save_path(self, slot):
+        for path in (self._get_binary_save_path(slot), self._get_save_path(slot)):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _slot_lock(self, slot):
+        # Called from the game, save-worker and compaction threads; the
+        # guard makes sure they all get the same lock for a slot
+        with self._slot_locks_guard:
+            return self._slot_locks.setdefault(slot, threading.Lock())
+
+    @staticmethod
+    def _atomic_write(path, payload, sync=True):
+        # Per-thread temp name: the worker and compaction may both write
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def _write_metadata(self, slot, metadata):
+        # Only a cache of the save body, so it skips the fsync
+        self._atomic_write(self._get_metadata_path(slot),
+                           json.dumps(metadata).encode("utf-8"), sync=False)
+
     # ==========================================================
     # SAVE
     # ==========================================================
@@ -34,56 +142,404 @@ class SaveSystem:
         game_data structure expected:
         {
             "player_name": str,
+            "playtime": float (seconds),
             "virus_team": [Virus objects],
-            "virus_storage": [Virus objects],
+            "virus_storage": VirusStore (what load_game returns) or
+                             [Virus objects],
             "inventory": dict,
             "world_state": dict
         }
         """
+        self.write_snapshot(game_data, slot, self.begin_snapshot(game_data, slot))
+
+    def save_incremental(self, game_data, slot=1):
+        """
+        Appends the changes since the last save of this same game_data
+        to the slot's journal. Falls back to save_game when there is no
+        baseline (first save, or a different game_data dict).
+
+        :return: Bytes written to the journal (0 for a full save or no changes)
+        """
+        changes = self.collect_changes(game_data, slot)
+        if changes is None:
+            self.save_game(game_data, slot)
+            return 0
+
+        return self.write_changes(changes, slot)
+
+    # ==========================================================
+    # SAVE PHASES
+    # ==========================================================
+    # save_game and save_incremental are each split into a part that
+    # reads the live game_data (call it on the game thread) and a part
+    # that only does serialization and file I/O (safe on a worker
+    # thread, see systems.save_worker). Writes for one slot must run
+    # in the order their first halves were called.
+
+    def begin_snapshot(self, game_data, slot=1):
+        """
+        Makes game_data the slot's journal baseline.
+
+        :return: Generation to pass to write_snapshot
+        """
+        journal = self._journals.pop(slot, None)
+        if journal is not None:
+            self._retired_journals.append(journal)
+
+        generation = time.time_ns()
+        journal = SaveJournal(self._get_journal_path(slot), generation)
+        journal.track(game_data)
+        self._journals[slot] = journal
+
+        return generation
+
+    def write_snapshot(self, game_data, slot, generation):
+        """
+        Writes a full snapshot and drops the slot's older journals.
+
+        :param game_data: Live game_data or a snapshot copy of it
+        """
+        self.wait_for_compaction(slot)
+
+        with self._slot_lock(slot):
+            self._write_snapshot(game_data, slot, generation)
+
+            retired = [j for j in self._retired_journals if j.path == self._get_journal_path(slot)]
+            for journal in retired:
+                journal.close()
+                self._retired_journals.remove(journal)
+            self._remove_journals(slot)
+
+    def collect_changes(self, game_data, slot=1):
+        """
+        :return: (journal, records, metadata) changed since the last save
+                 of game_data, or None when game_data has no baseline
+        """
+        journal = self._journals.get(slot)
+        if journal is None or journal.game_data is not game_data:
+            return None
+
+        records = journal.collect(game_data)
+        metadata = build_slot_metadata(game_data, self.save_format) if records else None
+        return journal, records, metadata
+
+    def write_changes(self, changes, slot=1):
+        """
+        Appends records from collect_changes. Records whose journal has
+        since been replaced by a snapshot are dropped; that snapshot
+        already contains them.
+
+        :return: Bytes written
+        """
+        journal, records, metadata = changes
+        if journal is not self._journals.get(slot):
+            return 0
+
+        written = journal.write(records)
+        if metadata is not None:
+            self._write_metadata(slot, metadata)
+
+        # A leftover .compacting journal (a compaction that failed) still
+        # holds records; rotating over it would lose them
+        if (journal.size > self.compact_threshold and slot not in self._compactions
+                and not os.path.exists(self._get_compacting_path(slot))):
+            self._start_compaction(slot, journal)
+
+        return written
+
+    def _write_snapshot(self, game_data, slot, generation, metadata=True):
+        # Both formats replace or move the slot's binary file
+        self._release_binary_readers(self._get_binary_save_path(slot))
+
+        if self.save_format == "binary":
+            self._write_binary(game_data, self._get_binary_save_path(slot), generation)
+            stale_path = self._get_save_path(slot)
+        else:
+            self._write_json(game_data, self._get_save_path(slot), generation)
+            stale_path = self._get_binary_save_path(slot)
+
+        # Only one format per slot, so detection on load is unambiguous.
+        # The file in the old format is kept as a backup, not deleted.
+        if os.path.exists(stale_path):
+            os.replace(stale_path, stale_path + ".bak")
+
+        if metadata:
+            self._write_metadata(slot, build_slot_metadata(game_data, self.save_format))
+
+    def _remove_journals(self, slot):
+        for path in (self._get_journal_path(slot), self._get_compacting_path(slot)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _write_json(self, game_data, save_path, generation=None):
+        storage = game_data.get("virus_storage", [])
+        if isinstance(storage, VirusStore):
+            storage_data = storage.to_dicts()
+        else:
+            storage_data = [v.to_dict() for v in storage]
 
         serializable_data = {
             "player_name": game_data.get("player_name", "Player"),
+            "playtime": game_data.get("playtime", 0),
             "virus_team": [v.to_dict() for v in game_data.get("virus_team", [])],
-            "virus_storage": [v.to_dict() for v in game_data.get("virus_storage", [])],
+            "virus_storage": storage_data,
             "inventory": game_data.get("inventory", {}),
             "world_state": game_data.get("world_state", {})
         }
+        if generation is not None:
+            serializable_data["journal_generation"] = generation
 
-        save_path = self._get_save_path(slot)
+        self._atomic_write(save_path, json.dumps(serializable_data, indent=4).encode("utf-8"))
 
-        with open(save_path, "w") as f:
-            json.dump(serializable_data, f, indent=4)
+    def _write_binary(self, game_data, save_path, generation=None):
+        storage = game_data.get("virus_storage", [])
+        if not isinstance(storage, VirusStore):
+            storage = [v.to_dict() for v in storage]
+
+        meta = {
+            "player_name": game_data.get("player_name", "Player"),
+            "playtime": game_data.get("playtime", 0),
+            "inventory": game_data.get("inventory", {}),
+            "world_state": game_data.get("world_state", {})
+        }
+        if generation is not None:
+            meta["journal_generation"] = generation
+        team = [v.to_dict() for v in game_data.get("virus_team", [])]
+
+        self._atomic_write(save_path, encode_binary_save(meta, team, storage))
+
+    # ==========================================================
+    # COMPACTION
+    # ==========================================================
+
+    def _start_compaction(self, slot, journal):
+        """
+        Moves the journal aside and starts a fresh one for the next
+        generation, then folds snapshot + old journal into a new snapshot
+        on a worker thread. The live game_data is never read off-thread.
+        """
+        compacting_path = self._get_compacting_path(slot)
+        journal.rotate(compacting_path)
+        journal.generation += 1
+        journal.open_new()
+
+        thread = threading.Thread(
+            target=self._compact, args=(slot, compacting_path, journal.generation),
+            name=f"save-compact-{slot}", daemon=True
+        )
+        self._compactions[slot] = thread
+        thread.start()
+
+    def _compact(self, slot, compacting_path, generation):
+        try:
+            with self._slot_lock(slot):
+                loaded = self._load_snapshot(slot)
+                journal_generation, records = read_journal(compacting_path)
+
+                if loaded is not None and journal_generation == loaded[1]:
+                    game_data = loaded[0]
+                    apply_records(game_data, records)
+                    # Same contents as before, so the metadata stays
+                    self._write_snapshot(game_data, slot, generation, metadata=False)
+                    os.remove(compacting_path)
+        finally:
+            self._compactions.pop(slot, None)
+
+    def wait_for_compaction(self, slot=None):
+        """Blocks until background compaction (of one slot or all) ends."""
+        slots = list(self._compactions) if slot is None else [slot]
+        for key in slots:
+            thread = self._compactions.get(key)
+            if thread is not None:
+                thread.join()
 
     # ==========================================================
     # LOAD
     # ==========================================================
 
     def load_game(self, slot=1):
-        save_path = self._get_save_path(slot)
+        """
+        Loads the slot's snapshot and replays its journal. Later
+        save_incremental calls with the returned dict append to that
+        journal.
 
-        if not os.path.exists(save_path):
+        Loading never writes. A save from before journals, or one with an
+        unfinished compaction, gets no journal attached, so its first
+        save_incremental falls back to a full save_game.
+        """
+        loaded = self._load_replayed(slot)
+        if loaded is None:
             return None
 
+        game_data, generation, recovered, replayed = loaded
+
+        old_journal = self._journals.pop(slot, None)
+        if old_journal is not None:
+            old_journal.close()
+
+        if recovered or generation is None:
+            return game_data
+
+        journal = SaveJournal(self._get_journal_path(slot), generation)
+        if replayed:
+            journal.open_existing()
+        journal.track(game_data)
+        self._journals[slot] = journal
+
+        return game_data
+
+    def _load_replayed(self, slot):
+        """
+        :return: (game_data, generation, recovered, replayed) or None.
+                 recovered is True when an unfinished compaction's
+                 journal had to be replayed too.
+        """
+        self.wait_for_compaction(slot)
+
+        with self._slot_lock(slot):
+            loaded = self._load_snapshot(slot)
+            if loaded is None:
+                return None
+
+            game_data, generation = loaded
+
+            # A compaction that never finished: its journal still applies
+            # to this snapshot, and the current journal comes after it
+            compacting_generation, records = read_journal(self._get_compacting_path(slot))
+            recovered = generation is not None and compacting_generation == generation
+            if recovered:
+                apply_records(game_data, records)
+                generation += 1
+
+            journal_generation, records = read_journal(self._get_journal_path(slot))
+            replayed = generation is not None and journal_generation == generation
+            if replayed:
+                apply_records(game_data, records)
+
+        return game_data, generation, recovered, replayed
+
+    def _load_snapshot(self, slot):
+        """:return: (game_data, journal generation or None), or None"""
+        save_path = self._find_save_path(slot)
+
+        if save_path is None:
+            return None
+
+        if is_binary_save(save_path):
+            return self._read_binary(save_path)
+
+        return self._read_json(save_path)
+
+    def _release_binary_readers(self, path):
+        """Pulls unread storage sections of path into memory."""
+        readers = self._binary_readers.pop(path, None)
+        if readers:
+            for save in list(readers):
+                save.read_storage_section()
+
+    def _read_json(self, save_path):
         with open(save_path, "r") as f:
             data = json.load(f)
 
-        # Rebuild Virus objects
-        team = [Virus.from_dict(v) for v in data.get("virus_team", [])]
-        storage = [Virus.from_dict(v) for v in data.get("virus_storage", [])]
+        # Team members build their Virus on first use; the storage box
+        # stays columnar and builds one only when a row is taken out
+        team = [LazyVirus(v) for v in data.get("virus_team", [])]
+        storage = VirusStore.from_dicts(data.get("virus_storage", []))
 
         return {
             "player_name": data.get("player_name", "Player"),
+            "playtime": data.get("playtime", 0),
             "virus_team": team,
             "virus_storage": storage,
             "inventory": data.get("inventory", {}),
             "world_state": data.get("world_state", {})
-        }
+        }, data.get("journal_generation")
+
+    def _read_binary(self, save_path):
+        save = BinarySave(save_path)
+        if save.storage_pending:
+            self._binary_readers.setdefault(save_path, weakref.WeakSet()).add(save)
+
+        # Team is decoded now; storage records on first use
+        return {
+            "player_name": save.meta.get("player_name", "Player"),
+            "playtime": save.meta.get("playtime", 0),
+            "virus_team": save.team,
+            "virus_storage": save.storage(),
+            "inventory": save.meta.get("inventory", {}),
+            "world_state": save.meta.get("world_state", {})
+        }, save.meta.get("journal_generation")
+
+    # ==========================================================
+    # SLOT METADATA
+    # ==========================================================
+
+    def read_slot_metadata(self, slot=1):
+        """
+        Reads the slot's metadata sidecar, or None for an empty slot.
+        Saves written before sidecars existed get one built (once).
+        """
+        try:
+            with open(self._get_metadata_path(slot), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        loaded = self._load_replayed(slot)
+        if loaded is None:
+            return None
+
+        save_path = self._find_save_path(slot)
+        save_format = "binary" if is_binary_save(save_path) else "json"
+        metadata = build_slot_metadata(loaded[0], save_format)
+        metadata["saved_at"] = os.path.getmtime(save_path)
+        self._write_metadata(slot, metadata)
+        return metadata
+
+    def list_slots(self):
+        """:return: [(slot, metadata)] for every saved slot, by slot"""
+        slots = set()
+        for filename in os.listdir(self.save_directory):
+            match = _SAVE_FILE.match(filename)
+            if match:
+                slot = match.group(1)
+                slots.add(int(slot) if slot.isdigit() else slot)
+
+        ordered = sorted(slots, key=lambda slot: (isinstance(slot, str), str(slot).zfill(8)))
+        return [(slot, self.read_slot_metadata(slot)) for slot in ordered]
+
+    # ==========================================================
+    # IMPORT / EXPORT
+    # ==========================================================
+
+    def export_json(self, slot, path):
+        """Writes a slot (either format) as a JSON save file."""
+        loaded = self._load_replayed(slot)
+        if loaded is None:
+            return False
+
+        self._write_json(loaded[0], path)
+        return True
+
+    def import_json(self, path, slot=1):
+        """Loads a JSON save file into a slot using the current format."""
+        game_data, _ = self._read_json(path)
+        self.save_game(game_data, slot)
 
     # ==========================================================
     # DELETE SAVE
     # ==========================================================
 
     def delete_save(self, slot=1):
-        save_path = self._get_save_path(slot)
-        if os.path.exists(save_path):
-            os.remove(save_path)
+        self.wait_for_compaction(slot)
+        self._release_binary_readers(self._get_binary_save_path(slot))
+
+        journal = self._journals.pop(slot, None)
+        if journal is not None:
+            journal.close()
+        self._remove_journals(slot)
+
+        for save_path in (self._get_save_path(slot), self._get_binary_save_path(slot),
+                          self._get_metadata_path(slot)):
+            if os.path.exists(save_path):
+                os.remove(save_path)
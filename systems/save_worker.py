@@ -0,0 +1,213 @@
+"""
+CyberDex - Save Worker
+Runs SaveSystem writes on a background thread so saving never stalls
+the game loop.
+
+The game thread only takes a snapshot: the team and a plain-list box
+become plain dicts, a VirusStore box is copied column by column, and
+inventory/world_state are deep-copied. Serialization and file I/O
+happen on the worker. Saves queued for a slot that has not been written
+yet are coalesced: a newer full save replaces the pending one, and
+incremental changes are appended to it.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from data.virus_store import VirusStore
+from systems.save_journal import virus_record
+
+
+class _SavedVirus:
+    """Frozen stand-in for a Virus inside a snapshot (only to_dict is used)."""
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+def snapshot_game_data(game_data):
+    """Copy of game_data that stays valid while the game keeps running."""
+    storage = game_data.get("virus_storage", [])
+    if isinstance(storage, VirusStore):
+        storage = storage.copy()
+    else:
+        storage = [_SavedVirus(virus_record(v)) for v in storage]
+
+    return {
+        "player_name": game_data.get("player_name", "Player"),
+        "playtime": game_data.get("playtime", 0),
+        "virus_team": [_SavedVirus(virus_record(v)) for v in game_data.get("virus_team", [])],
+        "virus_storage": storage,
+        "inventory": copy.deepcopy(game_data.get("inventory", {})),
+        "world_state": copy.deepcopy(game_data.get("world_state", {})),
+    }
+
+
+class _SlotJob:
+    __slots__ = ("snapshot", "changes", "futures")
+
+    def __init__(self):
+        # (game_data copy, generation) or None
+        self.snapshot = None
+        # [(journal, records)] written after the snapshot, in order
+        self.changes = []
+        # [(future, callback)]
+        self.futures = []
+
+
+class SaveWorker:
+
+    def __init__(self, save_system):
+        self.save_system = save_system
+
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = None
+
+        # Finished (future, callback) pairs waiting for poll()
+        self._completed = []
+        self._completed_lock = threading.Lock()
+
+    # ==========================================================
+    # QUEUE
+    # ==========================================================
+
+    def save(self, game_data, slot=1, callback=None):
+        """
+        Queues a full save. Call from the game thread.
+
+        :param callback: Called as callback(future) from poll() once the
+                         save is on disk (or failed)
+        :return: concurrent.futures.Future resolved on the worker thread
+        """
+        generation = self.save_system.begin_snapshot(game_data, slot)
+        snapshot = (snapshot_game_data(game_data), generation)
+
+        with self._condition:
+            job = self._job(slot)
+            # Everything queued before is contained in this snapshot
+            job.snapshot = snapshot
+            job.changes = []
+            return self._enqueue(job, callback)
+
+    def save_incremental(self, game_data, slot=1, callback=None):
+        """Queues a journal append; a full save when there is no baseline."""
+        changes = self.save_system.collect_changes(game_data, slot)
+        if changes is None:
+            return self.save(game_data, slot, callback)
+
+        with self._condition:
+            job = self._job(slot)
+            job.changes.append(changes)
+            return self._enqueue(job, callback)
+
+    def _job(self, slot):
+        if self._closed:
+            raise RuntimeError("SaveWorker is closed")
+
+        job = self._pending.get(slot)
+        if job is None:
+            job = self._pending[slot] = _SlotJob()
+        return job
+
+    def _enqueue(self, job, callback):
+        future = Future()
+        job.futures.append((future, callback))
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="save-worker", daemon=True)
+            self._thread.start()
+
+        self._condition.notify()
+        return future
+
+    # ==========================================================
+    # WORKER THREAD
+    # ==========================================================
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+
+                slot, job = self._pending.popitem(last=False)
+                self._busy = True
+
+            try:
+                written = 0
+                if job.snapshot is not None:
+                    game_data, generation = job.snapshot
+                    self.save_system.write_snapshot(game_data, slot, generation)
+                for changes in job.changes:
+                    written += self.save_system.write_changes(changes, slot)
+            except Exception as error:
+                for future, _ in job.futures:
+                    future.set_exception(error)
+            else:
+                for future, _ in job.futures:
+                    future.set_result(written)
+
+            with self._completed_lock:
+                self._completed.extend(pair for pair in job.futures if pair[1] is not None)
+
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    # ==========================================================
+    # GAME THREAD
+    # ==========================================================
+
+    def poll(self):
+        """Runs callbacks of finished saves. Call once per frame."""
+        if not self._completed:
+            return
+
+        with self._completed_lock:
+            completed, self._completed = self._completed, []
+
+        for future, callback in completed:
+            callback(future)
+
+    @property
+    def pending(self):
+        return len(self._pending) + (1 if self._busy else 0)
+
+    def flush(self, timeout=None):
+        """
+        Blocks until every queued save is written.
+
+        :return: False if the timeout ran out first
+        """
+        with self._condition:
+            done = self._condition.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+
+        self.poll()
+        return done
+
+    def close(self, timeout=None):
+        """Flushes, then stops the worker thread."""
+        done = self.flush(timeout)
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        self.save_system.wait_for_compaction()
+        return done
@@ -0,0 +1,265 @@
+"""
+CyberDex - Turn Scheduler
+Speed-ordered turn order for battles with any number of combatants.
+
+Each combatant waits action_cost / speed time units between turns, so a
+virus twice as fast acts twice as often. Pending turns sit in a binary
+heap keyed by (action time, -speed, insertion order); scheduling is
+O(log n) and cancelling marks the entry dead in O(1), to be skipped
+when it reaches the top.
+"""
+
+import heapq
+import random
+
+from data.ability import get_ability
+from systems.battle_simulator import resolve_attack
+
+PLAYER_SIDE = "player"
+ENEMY_SIDE = "enemy"
+
+# Index of the cancelled flag in a heap entry
+_CANCELLED = 3
+
+
+class Combatant:
+    __slots__ = ("virus", "side", "bonuses", "entry", "_alive_index")
+
+    def __init__(self, virus, side, bonuses=None):
+        """
+        :param bonuses: {ability_name: command_bonus} used when headless
+        """
+        self.virus = virus
+        self.side = side
+        self.bonuses = bonuses or {}
+
+        # Pending heap entry, or None
+        self.entry = None
+        self._alive_index = -1
+
+    @property
+    def speed(self):
+        return max(1, self.virus.speed)
+
+
+class TurnScheduler:
+
+    def __init__(self, action_cost=100.0):
+        """
+        :param action_cost: Time units a speed-1 combatant waits per turn
+        """
+        self.action_cost = action_cost
+        self.time = 0.0
+
+        self._heap = []
+        self._counter = 0
+        self._pending = 0
+
+        # side -> combatants still able to act (swap-removed on faint)
+        self.sides = {}
+
+    # ==========================================================
+    # COMBATANTS
+    # ==========================================================
+
+    def add(self, virus, side, bonuses=None, delay=None):
+        """
+        Adds a combatant and schedules its first turn.
+
+        :param delay: Time until its first turn (default: one full wait)
+        :return: Combatant
+        """
+        combatant = Combatant(virus, side, bonuses)
+
+        alive = self.sides.setdefault(side, [])
+        combatant._alive_index = len(alive)
+        alive.append(combatant)
+
+        self.schedule(combatant, delay)
+        return combatant
+
+    def remove(self, combatant):
+        """Takes a combatant out of the battle (fainted, captured, fled)."""
+        self.cancel(combatant)
+
+        index = combatant._alive_index
+        if index < 0:
+            return
+
+        alive = self.sides[combatant.side]
+        last = alive.pop()
+        if last is not combatant:
+            alive[index] = last
+            last._alive_index = index
+        combatant._alive_index = -1
+
+    def alive(self, side):
+        return self.sides.get(side, [])
+
+    def opponents(self, combatant):
+        """Living combatants on every other side."""
+        return [other for side, members in self.sides.items()
+                if side != combatant.side for other in members]
+
+    def random_opponent(self, combatant, rng):
+        """Uniformly random living opponent, in O(number of sides)."""
+        sides = [members for side, members in self.sides.items()
+                 if side != combatant.side and members]
+        pick = rng.randrange(sum(len(members) for members in sides))
+        for members in sides:
+            if pick < len(members):
+                return members[pick]
+            pick -= len(members)
+
+    def winner(self):
+        """The only side with combatants left, or None while undecided."""
+        standing = [side for side, members in self.sides.items() if members]
+        if len(standing) == 1:
+            return standing[0]
+        return None
+
+    # ==========================================================
+    # SCHEDULING
+    # ==========================================================
+
+    def wait_time(self, combatant):
+        return self.action_cost / combatant.speed
+
+    def schedule(self, combatant, delay=None):
+        """(Re)schedules a combatant's next turn, replacing any pending one."""
+        self.cancel(combatant)
+
+        if delay is None:
+            delay = self.wait_time(combatant)
+
+        entry = [self.time + delay, -combatant.speed, self._counter, False, combatant]
+        self._counter += 1
+        self._pending += 1
+        combatant.entry = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, combatant):
+        entry = combatant.entry
+        if entry is None:
+            return
+
+        entry[_CANCELLED] = True
+        combatant.entry = None
+        self._pending -= 1
+
+        # Mostly dead entries (e.g. a swarm wiped out): rebuild the heap
+        if len(self._heap) > 2 * self._pending + 32:
+            self._heap = [e for e in self._heap if not e[_CANCELLED]]
+            heapq.heapify(self._heap)
+
+    def peek(self):
+        """:return: (time, combatant) of the next turn, or None"""
+        heap = self._heap
+        while heap and heap[0][_CANCELLED]:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return heap[0][0], heap[0][4]
+
+    def next_turn(self):
+        """
+        Advances time to the next turn and schedules that combatant's
+        following turn.
+
+        :return: Combatant whose turn it is, or None if nobody can act
+        """
+        upcoming = self.peek()
+        if upcoming is None:
+            return None
+
+        entry = heapq.heappop(self._heap)
+        self._pending -= 1
+        combatant = entry[4]
+        combatant.entry = None
+
+        self.time = entry[0]
+        self.schedule(combatant)
+        return combatant
+
+    def __len__(self):
+        return self._pending
+
+
+# ==========================================================
+# HEADLESS BATTLES
+# ==========================================================
+
+def random_policy(combatant, scheduler, rng):
+    """Random ability at a random living opponent."""
+    return rng.choice(combatant.virus.abilities), scheduler.random_opponent(combatant, rng)
+
+
+def run_round(scheduler, rng, policy=random_policy, round_time=None, log=None):
+    """
+    Plays every turn that falls in the next round_time time units.
+
+    :param policy: policy(combatant, scheduler, rng) -> (ability name, target)
+    :param round_time: Default: one wait of a speed-10 combatant
+    :param log: Optional list; (attacker, target, damage, is_critical) appended
+    :return: Winning side once the battle is decided, else None
+    """
+    if round_time is None:
+        round_time = scheduler.action_cost / 10
+    round_end = scheduler.time + round_time
+
+    while True:
+        upcoming = scheduler.peek()
+        if upcoming is None or upcoming[0] >= round_end:
+            break
+
+        attacker = scheduler.next_turn()
+        ability_name, target = policy(attacker, scheduler, rng)
+
+        damage, is_critical, _ = resolve_attack(
+            attacker.virus, target.virus, get_ability(ability_name), rng,
+            attacker.bonuses.get(ability_name)
+        )
+        if log is not None:
+            log.append((attacker, target, damage, is_critical))
+
+        if target.virus.is_fainted():
+            scheduler.remove(target)
+            winner = scheduler.winner()
+            if winner is not None:
+                return winner
+
+    scheduler.time = max(scheduler.time, round_end)
+    return scheduler.winner()
+
+
+def run_battle(sides, rng=None, policy=random_policy, max_rounds=500, action_cost=100.0):
+    """
+    Runs a multi-combatant battle to completion, mutating the viruses.
+
+    :param sides: {side: [Virus]} (any number of sides and combatants)
+    :return: {"winner": side or None, "rounds": int, "turns": int,
+              "damage": [int], "crits": int}
+    """
+    rng = rng or random.Random()
+    scheduler = TurnScheduler(action_cost)
+
+    for side, viruses in sides.items():
+        for virus in viruses:
+            if not virus.is_fainted():
+                scheduler.add(virus, side)
+
+    log = []
+    winner = scheduler.winner()
+    rounds = 0
+
+    while winner is None and rounds < max_rounds:
+        rounds += 1
+        winner = run_round(scheduler, rng, policy, log=log)
+
+    return {
+        "winner": winner,
+        "rounds": rounds,
+        "turns": len(log),
+        "damage": [entry[2] for entry in log],
+        "crits": sum(entry[3] for entry in log),
+    }
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The game modules import each other as top-level packages ("data",
+# "engine", "systems"), so both roots go on the path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "cyberdex"), ROOT]
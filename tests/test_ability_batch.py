@@ -0,0 +1,162 @@
+"""
+CyberDex - Batched ability math tests
+The batch path must reproduce Ability.calculate_damage exactly when fed
+the same uniform draws.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from data import ability_batch
+from data.ability import ABILITY_REGISTRY, Ability, get_ability
+from data.ability_batch import (
+    ABILITY_IDS,
+    ABILITY_KEYS,
+    TYPE_IDS,
+    TYPE_NAMES,
+    calculate_damage_batch,
+    try_apply_status_batch,
+)
+
+
+class _ReplayRandom:
+    """Feeds pre-drawn uniforms to the scalar path in call order."""
+
+    def __init__(self, values):
+        self._values = iter(values)
+
+    def random(self):
+        return next(self._values)
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+
+def _random_hits(count, seed):
+    setup = np.random.default_rng(seed)
+    return {
+        "ability_ids": setup.integers(0, len(ABILITY_KEYS), count),
+        "attack": setup.integers(10, 300, count),
+        "defense": setup.integers(10, 300, count),
+        "attacker_types": setup.integers(0, len(TYPE_NAMES), count),
+        "overclocked": setup.random(count) < 0.2,
+        "damage_multiplier": np.where(setup.random(count) < 0.5, 1.25, 1.0),
+        "crit_boost": np.where(setup.random(count) < 0.5, 0.15, 0.0),
+    }
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_damage_matches_scalar(seed):
+    count = 2000
+    hits = _random_hits(count, seed)
+
+    damage, is_critical = calculate_damage_batch(
+        hits["ability_ids"], hits["attack"], hits["defense"], hits["attacker_types"],
+        hits["overclocked"], hits["damage_multiplier"], hits["crit_boost"],
+        rng=np.random.default_rng(seed + 100),
+    )
+
+    # Same generator, same order: one variance roll then one crit roll per hit
+    draws = np.random.default_rng(seed + 100)
+    variance_u = draws.random(count)
+    crit_u = draws.random(count)
+
+    for i in range(count):
+        ability = ABILITY_REGISTRY.by_id(hits["ability_ids"][i]).ability
+        attacker = SimpleNamespace(
+            attack=int(hits["attack"][i]),
+            virus_type=TYPE_NAMES[hits["attacker_types"][i]],
+            is_overclocked=lambda flag=bool(hits["overclocked"][i]): flag,
+        )
+        defender = SimpleNamespace(defense=int(hits["defense"][i]))
+        bonus = {
+            "damage_multiplier": float(hits["damage_multiplier"][i]),
+            "crit_boost": float(hits["crit_boost"][i]),
+            "status_boost": 0.0,
+        }
+
+        expected = ability.calculate_damage(
+            attacker, defender, bonus, rng=_ReplayRandom((variance_u[i], crit_u[i]))
+        )
+        assert (int(damage[i]), bool(is_critical[i])) == expected, i
+
+
+def test_status_batch_only_applies_existing_statuses():
+    ids = np.arange(len(ABILITY_KEYS)).repeat(200)
+    applied, statuses = try_apply_status_batch(ids, rng=np.random.default_rng(3))
+
+    for ability_id, was_applied, status in zip(ids, applied, statuses):
+        ability = ABILITY_REGISTRY.by_id(ability_id).ability
+        if was_applied:
+            assert status == ability.status_effect
+        else:
+            assert status == ""
+        if not ability.status_effect:
+            assert not was_applied
+
+
+@pytest.fixture
+def restore_registry():
+    """Puts ABILITY_REGISTRY and its database back after the test."""
+    registry = ABILITY_REGISTRY
+    database = dict(registry.database)
+    records = list(registry.records)
+    aliases = dict(registry._aliases)
+    by_key = dict(registry._by_key)
+
+    yield registry
+
+    registry.database.clear()
+    registry.database.update(database)
+    registry.records[:] = records
+    registry._aliases = aliases
+    registry._by_key = by_key
+    registry.version += 1
+
+
+def _one_hit(ability_id):
+    # No variance spread worth checking: compare against the table value
+    return calculate_damage_batch(
+        [ability_id], [100], [100], [TYPE_IDS["spyware"]],
+        rng=np.random.default_rng(0),
+    )
+
+
+def test_registered_ability_extends_batch_tables(restore_registry):
+    record = restore_registry.register(
+        "zero_day", Ability(name="Zero Day", power=90, ability_type="spyware",
+                            status_effect="exposed", status_chance=1.0)
+    )
+
+    ability_batch.refresh_tables()
+    assert ABILITY_IDS["zero_day"] == record.id
+    assert ABILITY_KEYS[record.id] == "zero_day"
+
+    damage, _ = _one_hit(record.id)
+    # attack / defense = 1, same-type bonus 1.2, variance 0.9 - 1.1
+    assert 90 * 1.2 * 0.9 <= damage[0] <= 90 * 1.2 * 1.1 * 1.5
+
+    applied, statuses = try_apply_status_batch([record.id])
+    assert applied[0] and statuses[0] == "exposed"
+
+
+def test_replaced_ability_updates_lookup_and_tables(restore_registry):
+    old = restore_registry.lookup("data_pulse")
+    replacement = Ability(name="Data Surge", power=250, ability_type="ai")
+
+    with pytest.raises(ValueError):
+        restore_registry.register("data_pulse", replacement)
+
+    record = restore_registry.register("data_pulse", replacement, replace=True)
+
+    assert record.id == old.id
+    assert get_ability("data_pulse") is replacement
+    assert get_ability("Data Surge") is replacement
+    # The old display name still normalizes to the key
+    assert get_ability("Data Pulse") is replacement
+    assert old.ability not in [r.ability for r in restore_registry.records]
+
+    ability_batch.refresh_tables()
+    assert ability_batch.POWER[record.id] == 250
@@ -0,0 +1,89 @@
+"""
+CyberDex - Binary save format tests
+Lazy storage section reads and older format versions.
+"""
+
+import os
+
+import pytest
+
+import systems.binary_save as binary_save
+from data.virus import Virus
+from data.virus_store import VirusStore
+from systems.binary_save import BinarySave, encode_binary_save
+from systems.save_system import SaveSystem
+
+
+def _virus(name, level=5, exp=0):
+    virus = Virus(name, "worm", 1, level=level)
+    virus.abilities = ["lag_spike", "packet_storm"]
+    virus.exp = exp
+    return virus
+
+
+def _storage(count):
+    store = VirusStore()
+    for i in range(count):
+        store.append(_virus(f"Stored{i % 7}", level=1 + i % 30, exp=i))
+    return store
+
+
+def _write(path, team, storage):
+    meta = {"player_name": "Ada"}
+    with open(path, "wb") as f:
+        f.write(encode_binary_save(meta, [v.to_dict() for v in team], storage))
+
+
+def test_storage_section_is_read_on_first_use(tmp_path):
+    path = str(tmp_path / "save.sav")
+    storage = _storage(500)
+    _write(path, [_virus("Lead", exp=7)], storage)
+
+    save = BinarySave(path)
+    assert save.storage_pending
+    assert save.team[0].exp == 7
+
+    store = save.storage()
+    assert len(store) == 500
+    assert not store.is_loaded and save.storage_pending
+
+    assert store.to_dicts() == storage.to_dicts()
+    assert not save.storage_pending
+
+
+def test_changed_file_is_not_read_as_storage(tmp_path):
+    path = str(tmp_path / "save.sav")
+    _write(path, [], _storage(3))
+    save = BinarySave(path)
+
+    _write(path, [], _storage(40))
+
+    with pytest.raises(ValueError):
+        len(save.storage().level)
+
+
+def test_replacing_a_slot_keeps_pending_storage_of_earlier_load(tmp_path):
+    saves = SaveSystem(str(tmp_path), save_format="binary")
+    saves.save_game({"virus_team": [], "virus_storage": _storage(5)}, 1)
+
+    first = saves.load_game(1)
+    assert not first["virus_storage"].is_loaded
+
+    saves.save_game({"virus_team": [], "virus_storage": _storage(2)}, 1)
+    assert [row["exp"] for row in first["virus_storage"].to_dicts()] == [0, 1, 2, 3, 4]
+
+    saves.delete_save(1)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_version_1_files_load_with_integer_exp(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.sav")
+    monkeypatch.setattr(binary_save, "VERSION", 1)
+    monkeypatch.setattr(binary_save, "RECORD", binary_save.RECORDS[1])
+    _write(path, [_virus("Lead", exp=7)], _storage(3))
+    monkeypatch.undo()
+
+    save = BinarySave(path)
+    assert save.version == 1
+    assert repr(save.team[0].exp) == "7"
+    assert [row["exp"] for row in save.storage().to_dicts()] == [0, 1, 2]
@@ -0,0 +1,54 @@
+"""
+CyberDex - Headless run tests
+run_headless closes profiler frames without rendering and exits like
+run(): queued saves flushed, profile written.
+"""
+
+import json
+
+import pygame
+import pytest
+
+from engine.game import Game
+from systems.save_system import SaveSystem
+from systems.save_worker import SaveWorker
+
+
+@pytest.fixture
+def game(tmp_path):
+    game = Game(headless=True, profile_dump=str(tmp_path / "profile.json"))
+    yield game
+    pygame.quit()
+
+
+def test_every_tick_is_a_frame_without_rendering(game):
+    profiler = game.state_manager.profiler
+
+    game.run_headless(25, shutdown=False)
+
+    stats = profiler.get_stats()["MenuState"]
+    assert stats["frame"]["samples"] == 25
+    assert "render" not in stats
+    assert profiler._frame_total == 0.0
+
+
+def test_rendered_ticks_are_not_closed_twice(game):
+    game.run_headless(12, render_every=4, shutdown=False)
+
+    stats = game.state_manager.profiler.get_stats()["MenuState"]
+    assert stats["frame"]["samples"] == 12
+    assert stats["render"]["samples"] == 3
+
+
+def test_shutdown_flushes_saves_and_writes_profile(game, tmp_path):
+    saves_dir = tmp_path / "saves"
+    game.save_worker = SaveWorker(SaveSystem(str(saves_dir)))
+    game.game_data.update(player_name="Ada", virus_team=[], virus_storage=[])
+    game.save_worker.save(game.game_data, 1)
+
+    assert game.run_headless(5) == 5
+
+    assert SaveSystem(str(saves_dir)).load_game(1)["player_name"] == "Ada"
+    with open(game.profile_dump) as f:
+        assert json.load(f)["MenuState"]["frame"]["samples"] == 5
+    assert not pygame.get_init()
@@ -0,0 +1,86 @@
+"""
+CyberDex - Overworld encounter tests
+Touching a roaming virus starts a battle against a rolled wild virus,
+and the roaming virus only disappears once that battle really started.
+"""
+
+import pygame
+import pytest
+
+from data.virus import Virus
+from engine.game import Game
+from states.overworld_state import OverworldState
+
+
+@pytest.fixture
+def game():
+    game = Game(headless=True)
+    yield game
+    pygame.quit()
+
+
+def _hero():
+    hero = Virus("Hero", "ai", 1, level=30)
+    hero.abilities = ["data_pulse"]
+    return hero
+
+
+def _enter_overworld(game):
+    game.state_manager.change_state("overworld")
+    return game.state_manager.current_state
+
+
+def _stand_on_virus(overworld):
+    virus = overworld.viruses[0]
+    virus.speed = 0
+    overworld.player_pos = pygame.Vector2(virus.pos)
+    return virus
+
+
+def test_contact_encounter_starts_battle_and_removes_virus(game):
+    game.game_data["virus_team"] = [_hero()]
+    overworld = _enter_overworld(game)
+    virus = _stand_on_virus(overworld)
+
+    game.run_headless(1)
+
+    battle = game.state_manager.current_state
+    assert battle is game.state_manager.get_state("battle")
+    assert battle.started
+    assert battle.virus_entity is virus
+    assert isinstance(battle.enemy_virus, Virus)
+    assert not battle.is_random_encounter
+    assert virus not in overworld.viruses
+    assert virus not in list(overworld.virus_index.query_rect(virus.get_rect()))
+
+
+def test_contact_encounter_without_team_keeps_virus(game):
+    overworld = _enter_overworld(game)
+    virus = _stand_on_virus(overworld)
+
+    game.run_headless(3)
+
+    assert game.state_manager.current_state is overworld
+    assert not game.state_manager.get_state("battle").started
+    assert virus in overworld.viruses
+    assert virus in list(overworld.virus_index.query_rect(virus.get_rect()))
+    # The rolled enemy waits for the next encounter instead of being lost
+    assert overworld.prepared_enemy is not None
+
+
+def test_crowd_encounter_removes_virus_only_when_battle_starts(game, monkeypatch):
+    monkeypatch.setattr(OverworldState, "use_virus_crowd", True)
+    overworld = _enter_overworld(game)
+    crowd = overworld.virus_crowd
+    crowd.speed[:crowd.count] = 0
+    overworld.player_pos = pygame.Vector2(*crowd.pos[0])
+    count = crowd.count
+
+    game.run_headless(1, shutdown=False)
+    assert game.state_manager.current_state is overworld
+    assert crowd.count == count
+
+    game.game_data["virus_team"] = [_hero()]
+    game.run_headless(1)
+    assert game.state_manager.current_state.started
+    assert crowd.count == count - 1
@@ -0,0 +1,236 @@
+"""
+CyberDex - Save system tests
+Snapshots plus journal: incremental saves, torn journal tails, crash
+recovery mid-compaction and switching save formats.
+"""
+
+import json
+import os
+
+import pytest
+
+from data.virus import Virus
+from data.virus_store import VirusStore
+from systems.save_system import SaveSystem
+
+
+def _virus(name, level=5):
+    virus = Virus(name, "worm", 1, level=level)
+    virus.abilities = ["lag_spike"]
+    return virus
+
+
+def _game_data():
+    storage = VirusStore()
+    storage.append(_virus("Stored"))
+    return {
+        "player_name": "Ada",
+        "playtime": 10.0,
+        "virus_team": [_virus("Lead"), _virus("Second")],
+        "virus_storage": storage,
+        "inventory": {"patch": 1},
+        "world_state": {},
+    }
+
+
+def _files(directory):
+    return sorted(os.listdir(directory))
+
+
+@pytest.fixture(params=["json", "binary"])
+def save_format(request):
+    return request.param
+
+
+# ==========================================================
+# INCREMENTAL SAVES
+# ==========================================================
+
+def test_incremental_changes_survive_reload(tmp_path, save_format):
+    saves = SaveSystem(str(tmp_path), save_format=save_format)
+    game_data = _game_data()
+    saves.save_game(game_data, 1)
+
+    game_data["virus_team"][0].gain_exp(7)
+    game_data["inventory"]["patch"] = 3
+    storage = game_data["virus_storage"]
+    stored = storage.get(0)
+    stored.take_damage(10)
+    storage.set(0, stored)
+    storage.append(_virus("Caught", level=2))
+
+    assert saves.save_incremental(game_data, 1) > 0
+
+    loaded = SaveSystem(str(tmp_path), save_format=save_format).load_game(1)
+    assert loaded["virus_team"][0].exp == 7
+    assert loaded["inventory"] == {"patch": 3}
+    assert loaded["virus_storage"].row(0)["current_hp"] == stored.current_hp
+    assert loaded["virus_storage"].row(1)["name"] == "Caught"
+
+
+def test_in_place_ability_edits_are_journaled(tmp_path):
+    saves = SaveSystem(str(tmp_path))
+    game_data = _game_data()
+    saves.save_game(game_data, 1)
+
+    # A freshly loaded (not yet materialized) team member too
+    game_data = saves.load_game(1)
+    game_data["virus_team"][0].abilities.append("packet_storm")
+
+    assert saves.save_incremental(game_data, 1) > 0
+    assert saves.save_incremental(game_data, 1) == 0
+
+    loaded = SaveSystem(str(tmp_path)).load_game(1)
+    assert loaded["virus_team"][0].abilities == ["lag_spike", "packet_storm"]
+
+
+def test_in_place_ability_edits_in_a_list_box_are_journaled(tmp_path):
+    saves = SaveSystem(str(tmp_path))
+    game_data = _game_data()
+    game_data["virus_storage"] = [_virus("Boxed")]
+    saves.save_game(game_data, 1)
+
+    game_data["virus_storage"][0].abilities.append("data_pulse")
+    assert saves.save_incremental(game_data, 1) > 0
+
+    loaded = SaveSystem(str(tmp_path)).load_game(1)
+    assert loaded["virus_storage"].row(0)["abilities"] == ["lag_spike", "data_pulse"]
+
+
+# ==========================================================
+# TORN JOURNAL
+# ==========================================================
+
+def test_torn_journal_tail_is_ignored_and_truncated(tmp_path):
+    saves = SaveSystem(str(tmp_path))
+    game_data = _game_data()
+    saves.save_game(game_data, 1)
+
+    game_data["inventory"]["patch"] = 2
+    saves.save_incremental(game_data, 1)
+
+    # A crash in the middle of the next append
+    journal_path = os.path.join(str(tmp_path), "save_slot_1.journal")
+    intact_size = os.path.getsize(journal_path)
+    with open(journal_path, "ab") as f:
+        f.write(b'{"op": "meta", "key": "inventory", "data": {"pat')
+
+    saves = SaveSystem(str(tmp_path))
+    game_data = saves.load_game(1)
+    assert game_data["inventory"] == {"patch": 2}
+    # Loading alone never writes
+    assert os.path.getsize(journal_path) > intact_size
+
+    game_data["inventory"]["patch"] = 5
+    saves.save_incremental(game_data, 1)
+    with open(journal_path, "rb") as f:
+        # Every line whole: the new record did not land after the torn one
+        assert all(json.loads(line) for line in f)
+
+    loaded = SaveSystem(str(tmp_path)).load_game(1)
+    assert loaded["inventory"] == {"patch": 5}
+
+
+# ==========================================================
+# COMPACTION
+# ==========================================================
+
+def _crash_before_snapshot(self, slot, compacting_path, generation):
+    # The process dies after the journal was moved aside, before the
+    # compacted snapshot replaces the old one. Until then the compaction
+    # counts as running.
+    pass
+
+
+def test_compaction_interrupted_before_replace_recovers(tmp_path, monkeypatch, save_format):
+    monkeypatch.setattr(SaveSystem, "_compact", _crash_before_snapshot)
+
+    saves = SaveSystem(str(tmp_path), save_format=save_format, compact_threshold=1)
+    game_data = _game_data()
+    saves.save_game(game_data, 1)
+
+    game_data["inventory"]["patch"] = 2
+    saves.save_incremental(game_data, 1)
+    assert "save_slot_1.journal.compacting" in _files(str(tmp_path))
+
+    # Lands in the fresh journal that follows the compacting one
+    game_data["virus_team"][0].gain_exp(5)
+    saves.save_incremental(game_data, 1)
+    saves.wait_for_compaction()
+
+    monkeypatch.undo()
+    saves = SaveSystem(str(tmp_path), save_format=save_format)
+    loaded = saves.load_game(1)
+    assert loaded["inventory"] == {"patch": 2}
+    assert loaded["virus_team"][0].exp == 5
+
+    # No journal is attached to a recovered load: the next save is full
+    loaded["inventory"]["patch"] = 9
+    assert saves.save_incremental(loaded, 1) == 0
+    assert not any(name.endswith((".journal", ".compacting")) for name in _files(str(tmp_path)))
+
+    loaded = SaveSystem(str(tmp_path), save_format=save_format).load_game(1)
+    assert loaded["inventory"] == {"patch": 9}
+    assert loaded["virus_team"][0].exp == 5
+
+
+def _failed_compaction(self, slot, compacting_path, generation):
+    # Gave up without writing a snapshot; the .compacting journal stays
+    self._compactions.pop(slot, None)
+
+
+def test_failed_compaction_journal_is_not_rotated_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(SaveSystem, "_compact", _failed_compaction)
+
+    saves = SaveSystem(str(tmp_path), compact_threshold=1)
+    game_data = _game_data()
+    saves.save_game(game_data, 1)
+
+    game_data["inventory"]["patch"] = 2
+    saves.save_incremental(game_data, 1)
+    saves.wait_for_compaction()
+
+    game_data["virus_team"][0].gain_exp(5)
+    saves.save_incremental(game_data, 1)
+    saves.wait_for_compaction()
+
+    monkeypatch.undo()
+    loaded = SaveSystem(str(tmp_path)).load_game(1)
+    assert loaded["inventory"] == {"patch": 2}
+    assert loaded["virus_team"][0].exp == 5
+
+
+def test_finished_compaction_folds_journal_into_snapshot(tmp_path):
+    saves = SaveSystem(str(tmp_path), compact_threshold=1)
+    game_data = _game_data()
+    saves.save_game(game_data, 1)
+
+    game_data["inventory"]["patch"] = 4
+    saves.save_incremental(game_data, 1)
+    saves.wait_for_compaction()
+
+    assert "save_slot_1.journal.compacting" not in _files(str(tmp_path))
+    assert SaveSystem(str(tmp_path)).load_game(1)["inventory"] == {"patch": 4}
+
+
+# ==========================================================
+# FORMAT SWITCHING
+# ==========================================================
+
+def test_switching_format_keeps_old_file_as_backup(tmp_path):
+    game_data = _game_data()
+    SaveSystem(str(tmp_path), save_format="json").save_game(game_data, 1)
+
+    binary = SaveSystem(str(tmp_path), save_format="binary")
+    loaded = binary.load_game(1)
+    # Loading a JSON slot with the binary format set writes nothing
+    assert _files(str(tmp_path)) == ["save_slot_1.json", "save_slot_1.meta"]
+
+    binary.save_game(loaded, 1)
+    assert _files(str(tmp_path)) == [
+        "save_slot_1.json.bak", "save_slot_1.meta", "save_slot_1.sav",
+    ]
+
+    reloaded = SaveSystem(str(tmp_path), save_format="json").load_game(1)
+    assert reloaded["player_name"] == "Ada"
+    assert reloaded["virus_storage"].row(0)["name"] == "Stored"
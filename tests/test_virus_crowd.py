@@ -0,0 +1,58 @@
+"""
+CyberDex - Virus crowd tests
+The batched crowd engine against OverworldVirus, step for step.
+"""
+
+import random
+
+import pygame
+import pytest
+
+from states.overworld_state import OverworldVirus
+
+np = pytest.importorskip("numpy")
+
+from engine.virus_crowd import VirusCrowd  # noqa: E402 (needs numpy)
+
+
+ZONES = [
+    pygame.Rect(100, 100, 400, 300),
+    pygame.Rect(900, 200, 250, 600),
+    pygame.Rect(1500, 1200, 800, 500),
+]
+
+# Frame times from a fast monitor up to a MAX_FRAME_TIME hitch
+FRAME_TIMES = (1 / 240, 1 / 144, 1 / 60, 1 / 30, 0.1, 0.25)
+
+
+def _viruses(count, seed=8):
+    random.seed(seed)
+    return [OverworldVirus(ZONES[i % len(ZONES)], []) for i in range(count)]
+
+
+def test_crowd_matches_overworld_virus_updates():
+    viruses = _viruses(300)
+    crowd = VirusCrowd.from_viruses(viruses)
+    rng = random.Random(21)
+    probes = [pygame.Rect(zone.centerx - 60, zone.centery - 60, 120, 120) for zone in ZONES]
+
+    for frame in range(3000):
+        dt = rng.choice(FRAME_TIMES) if frame % 3 else rng.uniform(0.001, 0.05)
+        for virus in viruses:
+            virus.update(dt)
+        crowd.update(dt)
+
+        expected = np.array([(virus.pos.x, virus.pos.y) for virus in viruses])
+        np.testing.assert_allclose(crowd.pos[:crowd.count], expected, rtol=0, atol=1e-9)
+        assert crowd.toward_b[:crowd.count].tolist() == [
+            virus.target == virus.point_b for virus in viruses
+        ]
+
+        if frame % 50 == 0:
+            assert [crowd.get_rect(i) for i in range(crowd.count)] == [
+                virus.get_rect() for virus in viruses
+            ]
+            for probe in probes:
+                assert crowd.overlapping(probe).tolist() == [
+                    i for i, virus in enumerate(viruses) if virus.get_rect().colliderect(probe)
+                ]
@@ -0,0 +1,63 @@
+"""
+CyberDex - Virus store tests
+Column-wide EXP gains against the per-virus Virus.gain_exp.
+"""
+
+import random
+
+import pytest
+
+from data.virus import Virus
+from data.virus_store import VirusStore
+
+pytest.importorskip("numpy")
+
+
+def _boxed(count, seed=3):
+    rng = random.Random(seed)
+    store = VirusStore()
+    for i in range(count):
+        virus = Virus(f"Stored{i % 5}", "worm", 1, level=rng.randint(1, 60))
+        virus.take_damage(rng.randint(0, 20))
+        store.append(virus)
+    return store
+
+
+def _gain_one_by_one(store, amounts):
+    rows = []
+    for index, amount in enumerate(amounts):
+        virus = store.get(index)
+        virus.gain_exp(amount)
+        rows.append(virus.to_dict())
+    return rows
+
+
+def test_column_gain_matches_virus_gain_exp():
+    store = _boxed(400)
+    rng = random.Random(5)
+    # Mostly small gains, some that skip several levels at once
+    amounts = [rng.choice((0, 1, 40, 700, 25000)) for _ in range(len(store))]
+
+    before = list(store.level)
+    expected = _gain_one_by_one(store, amounts)
+    leveled = store.gain_exp(amounts)
+
+    assert store.to_dicts() == expected
+    assert leveled == sum(row["level"] != level for row, level in zip(expected, before))
+    assert all(type(row["exp"]) is int for row in store.to_dicts())
+
+
+def test_generator_indices_with_a_single_amount():
+    store = _boxed(10)
+    expected = store.to_dicts()
+    for index in (1, 4, 4):
+        virus = store.get(index)
+        virus.gain_exp(300)
+        expected[index] = virus.to_dict()
+        store.set(index, virus)
+
+    store = _boxed(10)
+    store.gain_exp(300, indices=(i for i in (1, 4, 4)))
+
+    assert store.to_dicts() == expected
+    assert store.gain_exp(5, indices=iter(())) == 0